@@ -13,16 +13,17 @@ def G():
     4 5   6   # 2
          7 8  # 3
     """
-    sample_graph = nx.DiGraph()
+    sample_graph = nx.MultiDiGraph()
     for n in range(1, 9):
         sample_graph.add_node(n, {'uid': n})
+    parent = graph.EdgeTypes.parent.name
     sample_graph.add_edges_from([
-        (1, 2),
-        (1, 3),
-        (2, 4),
-        (2, 5),
-        (3, 6),
-        (6, 7),
-        (6, 8)
-    ], type=graph.EdgeTypes.parent.name)
+        (1, 2, parent, {}),
+        (1, 3, parent, {}),
+        (2, 4, parent, {}),
+        (2, 5, parent, {}),
+        (3, 6, parent, {}),
+        (6, 7, parent, {}),
+        (6, 8, parent, {})
+    ], type=parent)
     yield sample_graph
@@ -6,9 +6,34 @@ class GraphAPISpec(metaclass=ABCMeta):
 
     /graph
     /graph/algorithms/{name}
-    /graph/paths/{type=shortest,longest,maxflow,etc.}
+    /graph/paths/{kind=shortest,longest,maxflow,etc.}
     """
-    pass
+
+    @abstractmethod
+    def algorithm(self, name, **kwargs):
+        """Run a named algorithm over the Graph.
+
+        Arguments:
+            name (str): Name of the algorithm.
+            kwargs (dict): Algorithm-specific parameters.
+
+        Returns:
+            A JSON-serializable result.
+        """
+        pass
+
+    @abstractmethod
+    def path(self, kind, **kwargs):
+        """Find a path through the Graph.
+
+        Arguments:
+            kind (str): Kind of path; shortest, longest, maxflow, etc.
+            kwargs (dict): Path-specific parameters, like its end nodes.
+
+        Returns:
+            A JSON-serializable result.
+        """
+        pass
 
 
 class NodeAPISpec(metaclass=ABCMeta):
@@ -19,8 +44,14 @@ class NodeAPISpec(metaclass=ABCMeta):
     """
 
     @abstractmethod
-    def get(self, idx):
-        """Retrieve a node by index, or many nodes."""
+    def get(self, idx=None, fields=None):
+        """Retrieve a node by index, or many nodes.
+
+        Arguments:
+            idx (int): Node id. If None, all nodes are retrieved.
+            fields (list[str]): Attributes to return; the uid is always
+                included. If None, all attributes are returned.
+        """
         pass
 
     @abstractmethod
@@ -28,6 +59,20 @@ class NodeAPISpec(metaclass=ABCMeta):
         """Add a node to the Graph."""
         pass
 
+    def create_many(self, items):
+        """Add many nodes to the Graph.
+
+        Implementations should persist once, rather than per node; this
+        default simply creates each node in turn.
+
+        Arguments:
+            items (iterable[dict]): Attributes of each node.
+
+        Returns:
+            list[int]: The new nodes' ids, in order.
+        """
+        return [self.create(**attrs) for attrs in items]
+
     @abstractmethod
     def update(self, uid, **kwargs):
         """Update a node in-place."""
@@ -52,18 +97,33 @@ class NodeAPISpec(metaclass=ABCMeta):
         """
         pass
 
+    def patch_many(self, uids, *args, **kwargs):
+        """Apply the same patch to many nodes.
+
+        Implementations should apply the patch atomically and persist once;
+        this default simply patches each node in turn.
+
+        Returns:
+            dict: Mapping of uid to the changes reported by :meth:`patch`.
+        """
+        return {uid: self.patch(uid, *args, **kwargs) for uid in uids}
+
 
 class EdgeAPISpec(metaclass=ABCMeta):
     """API Specification for interacting with Edge resources.
 
+    A pair of nodes may be linked by one edge of each type; ``type``
+    arguments pick one of them.
+
     /edges
     /edges/{id}
     /edges/{src}[/{dest}]
     """
 
     @abstractmethod
-    def get(self, src, dest):
-        """Retrieve an edge by id or source & destination."""
+    def get(self, src, dest, type=None):
+        """Retrieve an edge by id or source & destination; if ``type`` is
+        None, whichever was added first."""
         pass
 
     @abstractmethod
@@ -74,12 +134,88 @@ class EdgeAPISpec(metaclass=ABCMeta):
         """
         pass
 
+    def create_many(self, edges):
+        """Add many edges to the Graph.
+
+        Implementations should persist once, rather than per edge; this
+        default simply creates each edge in turn.
+
+        Arguments:
+            edges (iterable[tuple]): (src, dest, attributes) triples; the
+                attributes may include a ``type``.
+
+        Returns:
+            list[dict]: The created edges, in order.
+        """
+        return [self.create(src, dest, **attrs) for src, dest, attrs in edges]
+
+    @abstractmethod
+    def update(self, src, dest, type=None, **kwargs):
+        """Update an edge's attributes; if ``type`` is None, every edge's
+        between the nodes."""
+        pass
+
+    @abstractmethod
+    def delete(self, src, dest, type=None):
+        """Delete an edge from the graph; if ``type`` is None, every edge
+        between the nodes."""
+        pass
+
+
+class AsyncNodeAPISpec(metaclass=ABCMeta):
+    """Asynchronous counterpart of :class:`NodeAPISpec`.
+
+    Every method is a coroutine, allowing remote backends to be queried
+    concurrently instead of blocking per call.
+    """
+
+    @abstractmethod
+    async def get(self, idx=None, fields=None):
+        """Retrieve a node by index, or many nodes."""
+        pass
+
+    @abstractmethod
+    async def create(self, parent=None, **kwargs):
+        """Add a node to the Graph."""
+        pass
+
+    @abstractmethod
+    async def update(self, uid, **kwargs):
+        """Update a node in-place."""
+        pass
+
+    @abstractmethod
+    async def delete(self, uid):
+        """Delete a node from the graph."""
+        pass
+
+    async def patch(self, uid, *args, **kwargs):
+        """Modify properties of a node.
+
+        See :meth:`NodeAPISpec.patch` for the argument format.
+        """
+        pass
+
+
+class AsyncEdgeAPISpec(metaclass=ABCMeta):
+    """Asynchronous counterpart of :class:`EdgeAPISpec`."""
+
+    @abstractmethod
+    async def get(self, src, dest, type=None):
+        """Retrieve an edge by id or source & destination."""
+        pass
+
+    @abstractmethod
+    async def create(self, src, dest, type_=None, **kwargs):
+        """Add an edge to the Graph."""
+        pass
+
     @abstractmethod
-    def update(self, src, dest, **kwargs):
+    async def update(self, src, dest, type=None, **kwargs):
         """Update an edge's attributes."""
         pass
 
     @abstractmethod
-    def delete(self, src, dest):
+    async def delete(self, src, dest, type=None):
         """Delete an edge from the graph."""
         pass
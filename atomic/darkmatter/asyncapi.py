@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+asyncapi
+========
+Asynchronous adapters over the synchronous API implementations.
+
+Synchronous backends, like :class:`~.fileapi.FileAPI`, are wrapped so their
+calls run inside an executor, keeping the event loop free while disk or
+network I/O completes. The ``gather_*`` helpers fan many calls out at once.
+"""
+import asyncio
+import functools
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+from atomic.darkmatter import api, fileapi
+from atomic.utils import log
+
+
+def _drain(fn, *args, **kwargs):
+    """Invoke ``fn``, materializing generator results.
+
+    Listing calls, like ``FileNodeAPI.get()``, return lazy generators over the
+    graph. Consuming them inside the executor keeps the graph from being walked
+    on the event loop's thread while other calls mutate it.
+    """
+    result = fn(*args, **kwargs)
+    if isinstance(result, types.GeneratorType):
+        return list(result)
+    return result
+
+
+class _ExecutorAdapter:
+    """Runs the methods of a synchronous API object in an executor."""
+
+    def __init__(self, sync, executor, loop=None):
+        """Initialize the instance.
+
+        Args:
+            sync: Synchronous API object, such as a
+                :class:`~.fileapi.FileNodeAPI`.
+            executor (:class:`concurrent.futures.Executor`): Executor to run
+                calls in.
+            loop (:class:`asyncio.AbstractEventLoop`): Event loop; defaults to
+                the loop running at call time.
+        """
+        self.sync = sync
+        self.executor = executor
+        self.loop = loop
+
+    async def _call(self, method, *args, **kwargs):
+        loop = self.loop or asyncio.get_event_loop()
+        fn = functools.partial(_drain, method, *args, **kwargs)
+        return await loop.run_in_executor(self.executor, fn)
+
+
+class AsyncNodeAPI(_ExecutorAdapter, api.AsyncNodeAPISpec):
+    """Asynchronous Node API backed by a synchronous implementation."""
+
+    async def get(self, idx=None, fields=None, **kwargs):
+        """Retrieve an item by index, or all items if ``idx`` is None."""
+        return await self._call(self.sync.get, idx, fields=fields, **kwargs)
+
+    async def create(self, parent=None, **kwargs):
+        """Add a node to the graph, under ``parent`` if given, returning its
+        uid."""
+        return await self._call(self.sync.create, parent, **kwargs)
+
+    async def update(self, idx, **kwargs):
+        """Update an item in-place."""
+        return await self._call(self.sync.update, idx, **kwargs)
+
+    async def patch(self, idx, *args, **kwargs):
+        """Modify item attributes."""
+        return await self._call(self.sync.patch, idx, *args, **kwargs)
+
+    async def delete(self, idx):
+        """Remove a node from the graph."""
+        return await self._call(self.sync.delete, idx)
+
+
+class AsyncEdgeAPI(_ExecutorAdapter, api.AsyncEdgeAPISpec):
+    """Asynchronous Edge API backed by a synchronous implementation."""
+
+    async def get(self, src, dst, **kwargs):
+        """Retrieve an edge by source & destination."""
+        return await self._call(self.sync.get, src, dst, **kwargs)
+
+    async def create(self, src, dst, **kwargs):
+        """Add an edge to the graph."""
+        return await self._call(self.sync.create, src, dst, **kwargs)
+
+    async def update(self, src, dst, **kwargs):
+        """Update an edge's attributes."""
+        return await self._call(self.sync.update, src, dst, **kwargs)
+
+    async def delete(self, src, dst, **kwargs):
+        """Delete an edge from the graph."""
+        return await self._call(self.sync.delete, src, dst, **kwargs)
+
+
+class AsyncFileAPI:
+    """Asynchronous adapter over the file-system backed API.
+
+    Disk I/O and graph access happen in an executor. The default executor has
+    a single worker, since the in-memory graph isn't safe to mutate from
+    multiple threads; calls are serialized, but the event loop stays free.
+    """
+
+    def __init__(self, sync_api=None, executor=None, **kwargs):
+        """Initialize the instance.
+
+        Args:
+            sync_api: Synchronous API exposing ``Node`` and ``Edge``
+                attributes. If ``None``, a :class:`~.fileapi.FileAPI` is
+                created from ``kwargs``.
+            executor (:class:`concurrent.futures.Executor`): Executor to run
+                calls in. Backends that tolerate concurrent access, such as
+                remote services, benefit from more than one worker.
+            **kwargs: Passed to :class:`~.fileapi.FileAPI`.
+        """
+        self.logger = log.get_logger("api")
+        if sync_api is None:
+            sync_api = fileapi.FileAPI(**kwargs)
+        self.sync = sync_api
+        self.executor = executor or ThreadPoolExecutor(max_workers=1)
+        self.Node = AsyncNodeAPI(self.sync.Node, self.executor)
+        self.Edge = AsyncEdgeAPI(self.sync.Edge, self.executor)
+
+    def close(self):
+        """Shut down the executor, waiting for pending calls."""
+        self.executor.shutdown(wait=True)
+
+
+async def gather(calls, limit=None):
+    """Await many coroutines concurrently, preserving their order.
+
+    Args:
+        calls (iterable): Coroutines to run.
+        limit (int): Maximum number of coroutines in flight at once. If
+            ``None``, all are started immediately.
+
+    Returns:
+        list: Results, in the same order as ``calls``.
+    """
+    if limit is None:
+        return await asyncio.gather(*calls)
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(coro):
+        async with semaphore:
+            return await coro
+    return await asyncio.gather(*(bounded(c) for c in calls))
+
+
+async def gather_get(node_api, uids, limit=None, **kwargs):
+    """Retrieve many nodes concurrently.
+
+    Args:
+        node_api (:class:`~.api.AsyncNodeAPISpec`): Node API.
+        uids (iterable[int]): Node ids to retrieve.
+        limit (int): Maximum number of requests in flight.
+        **kwargs: Passed to each ``get`` call.
+
+    Returns:
+        list[dict]: Nodes in the order of ``uids``; ``None`` for misses.
+    """
+    return await gather((node_api.get(uid, **kwargs) for uid in uids),
+                        limit=limit)
+
+
+async def gather_create(node_api, items, limit=None):
+    """Create many nodes concurrently.
+
+    Args:
+        node_api (:class:`~.api.AsyncNodeAPISpec`): Node API.
+        items (iterable[dict]): Attributes of each node to create.
+        limit (int): Maximum number of requests in flight.
+
+    Returns:
+        list[int]: Ids of the created nodes, in the order of ``items``.
+    """
+    return await gather((node_api.create(**attrs) for attrs in items),
+                        limit=limit)
@@ -3,18 +3,25 @@
 API implementation for using a local file as the data store.
 """
 import atexit
+import contextlib
 import enum
+import functools
 import json
 import os
 
-import networkx as nx
 from colorama import Fore, Style
 from networkx.readwrite import json_graph
 
-from atomic.darkmatter import api
-from atomic.errors import AtomicError
-from atomic.graph import graph, serial
-from atomic.utils import log
+from atomic.darkmatter import api, history, shards
+from atomic.errors import NotFoundError
+from atomic.graph import (adjacency, graph, intervals, lca, merkle, names,
+                          patch, paths, schema, serial, store)
+from atomic.utils import log, parse
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # Leases aren't shared between processes
 
 
 DEFAULT_FILENAME = os.path.expanduser("~/atomic.json")
@@ -23,33 +30,114 @@ _logger = log.get_logger("atomic")
 
 
 def _load(filename=DEFAULT_FILENAME):
-    """Load the persisted :class:`networkx.MultiDiGraph`."""
+    """Load the persisted :class:`~atomic.graph.store.Graph`."""
     try:
         with open(filename) as f:
             data = json.load(f)
             _logger.debug("Loaded %s", filename)
-            return json_graph.node_link_graph(data, directed=True,
-                                              multigraph=False)
+            G = store.Graph.from_node_link(data)
     except FileNotFoundError:
         _logger.debug("No graph file found; instantiating")
-        return nx.DiGraph()
+        return store.Graph()
+    # Typed values are stored as JSON; restore them
+    for attrs in G.node.values():
+        attrs.update(schema.coerce(attrs))
+    return G
 
 
-def _save(G, filename=DEFAULT_FILENAME):
-    """Save the persisted :class:`networkx.MultiDiGraph`.
+def _save(G, filename=DEFAULT_FILENAME, indexes=()):
+    """Save the persisted graph.
 
     Arguments:
-        G (:class:`~networkx.classes.digraph.DiGraph`): Graph to save.
+        G (:class:`~atomic.graph.store.Graph`): Graph to save; a networkx
+            MultiDiGraph works, too.
         filename (str): Name of file to save graph to. If None, this is a
             no-op, which is useful for testing and any other time the graph is
-            only required to be in-memory.
+            only required to be in-memory. A sharded graph saves to its own
+            directory; see :meth:`~atomic.darkmatter.shards.ShardedGraph.
+            save`.
+        indexes (list[:class:`~atomic.graph.index.Index`]): Told once the
+            graph is saved.
     """
     if filename is None:
         return
-    with open(filename, "w") as f:
-        data = json_graph.node_link_data(G)
-        json.dump(data, f, indent=2)
-    _logger.debug("Saved graph")
+    if isinstance(G, shards.ShardedGraph):
+        G.save()
+    else:
+        with open(filename, "w") as f:
+            data = json_graph.node_link_data(G)
+            json.dump(data, f, indent=2, default=schema.encode)
+        _logger.debug("Saved graph")
+    _notify(indexes, "saved")
+
+
+@contextlib.contextmanager
+def _locked(path):
+    """Open a file for reading and writing, locked against other
+    processes."""
+    with open(path, 'a+') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        yield f
+
+
+def _reserve(G, filename, size):
+    """Reserve a block of uids, recording it in the graph's header and, for
+    a saved graph, in a lease file beside it that every process sharing the
+    graph reserves from; returns the first."""
+    start = serial.next_uid(G)
+    if filename is not None:
+        with _locked(filename + '.lease') as f:
+            start = max(start, int(f.read() or 0))
+            f.seek(0)
+            f.truncate()
+            f.write(str(start + size))
+    G.graph[serial.KEY] = {'next': start + size}
+    _logger.debug("Reserved uids %d-%d", start, start + size - 1)
+    return start
+
+
+def _release(G, filename, start, end):
+    """Give back the unused uids from ``start`` up to ``end``, unless more
+    have been reserved since."""
+    if filename is not None:
+        with _locked(filename + '.lease') as f:
+            if int(f.read() or 0) != end:
+                return
+            f.seek(0)
+            f.truncate()
+            f.write(str(start))
+    if serial.next_uid(G) == end:
+        G.graph[serial.KEY] = {'next': start}
+
+
+def _touch(G, *uids, linked=False):
+    """Load the shards holding ``uids``, or every shard if none are given,
+    when ``G`` is a :class:`~atomic.darkmatter.shards.ShardedGraph`."""
+    if isinstance(G, shards.ShardedGraph):
+        G.touch(uids or None, linked=linked)
+
+
+def _notify(indexes, hook, *args):
+    """Invoke ``hook`` on every :class:`~atomic.graph.index.Index`."""
+    for index in indexes:
+        getattr(index, hook)(*args)
+
+
+def _add_edge(G, indexes, src, dst, data):
+    """Add or replace an edge, notifying indexes; returns the edge's data.
+
+    A pair of nodes may have one edge of each type, which is its key.
+    """
+    # Add essential fields
+    data["src"] = src
+    data["dst"] = dst
+    key = data["type"] = graph.key_of(data["type"])
+    hook = "edge_updated" if G.has_edge(src, dst, key) else "edge_added"
+    G.add_edge(src, dst, key, **data)
+    _notify(indexes, hook, src, dst, G.edge[src][dst][key])
+    return data
 
 
 class FileAPI:
@@ -59,8 +147,9 @@ class FileAPI:
         """Initialize the instance.
 
         Args:
-            G (:class:`~.networkx.DiGraph`): Graph instance. If ``None``, the
-                graph will attempt to be loaded using ``persist``.
+            G (:class:`~atomic.graph.store.Graph`): Graph instance, or a
+                networkx MultiDiGraph. If ``None``, the graph will attempt to
+                be loaded using ``persist``.
             persist (str or bool): Leveraged by :meth:`~.FileAPI.load_graph` to
                 load (or not load) the in-memory Graph.
         """
@@ -70,12 +159,36 @@ class FileAPI:
         else:
             self.G, self.filename = self.load_graph(persist)
 
-        self.Node = FileNodeAPI(self.G, self.logger, filename=self.filename)
-        self.Edge = FileEdgeAPI(self.G, self.logger, filename=self.filename)
-
-        # Save the graph before closing
+        # Shared by the Node and Edge APIs, which keep them in sync
+        self.indexes = []
+        self._columns = None
+        self._importance = None
+        self._merkle = None
+        self.adjacency = self.add_index(adjacency.TypeIndex())
+        self.intervals = self.add_index(intervals.IntervalIndex())
+        self.lca = self.add_index(lca.LCAIndex())  # Built when first queried
+
+        self.Node = FileNodeAPI(self.G, self.logger, filename=self.filename,
+                                indexes=self.indexes,
+                                adjacency=self.adjacency)
+        self.Edge = FileEdgeAPI(self.G, self.logger, filename=self.filename,
+                                indexes=self.indexes)
+        self.Graph = FileGraphAPI(self.G, self.logger, filename=self.filename,
+                                  adjacency=self.adjacency,
+                                  intervals=self.intervals, lca=self.lca)
+        self.names = self.add_index(names.NameIndex())
+        # Only graphs saved to a file have a history; a sharded graph's
+        # checkpoints would capture whichever shards were loaded
+        self.history = None
+        if isinstance(self.G, shards.ShardedGraph):
+            self.G.indexes = self.indexes  # Rebuilt as shards are loaded
+        elif self.filename is not None:
+            self.history = self.add_index(history.History(self.filename))
+
+        # Save the graph before closing, giving back unused uids first
         if persist:
-            atexit.register(_save, self.G, self.filename)
+            atexit.register(_save, self.G, self.filename, self.indexes)
+            atexit.register(self.Node.serial.release)
 
     def load_graph(self, persist):
         """Controls instantiation of the in-memory Graph.
@@ -84,89 +197,276 @@ class FileAPI:
             persist (:obj:bool or :obj:str): If False, a blank in-memory graph
                 is created. If True, the Graph is loaded from using the
                 :attr:`~.DEFAULT_FILENAME`. If a :obj:str, it is interpreted to
-                be a filepath to a file containing the graph.
+                be a filepath to a file containing the graph, or to a
+                directory of shards if it's one or ends in ``.shards``;
+                shards are loaded as they're needed.
         Returns:
-            :class:`~.networkx.digraph.DiGraph`: A directed graph.
+            :class:`~atomic.graph.store.Graph`: A directed graph.
 
         Raises:
             ValueError: If ``persist`` isn't a :obj:str or :obj:bool.
         """
         if not persist:
-            return nx.DiGraph(), None
+            return store.Graph(), None
         elif isinstance(persist, bool):
             return _load(DEFAULT_FILENAME), DEFAULT_FILENAME
         elif isinstance(persist, str):
+            if shards.is_sharded(persist):
+                return shards.ShardedGraph(persist), persist
             return _load(persist), persist
         else:
             raise ValueError("persist must be a bool or str")
 
+    def add_index(self, index):
+        """Build an :class:`~atomic.graph.index.Index` from the graph and keep
+        it in sync with subsequent mutations.
+
+        Returns:
+            The index.
+        """
+        index.rebuild(self.G)
+        self.indexes.append(index)
+        return index
+
+    def touch(self, *uids):
+        """Make sure nodes are in memory, loading the shards holding them,
+        or every shard if none are given. Only sharded graphs are partly
+        loaded; see :mod:`~atomic.darkmatter.shards`."""
+        _touch(self.G, *uids)
+
+    def reset(self, G):
+        """Replace the graph's contents with another graph's, in place.
+
+        Indexes are rebuilt, new uids continue past any used or reserved,
+        and the graph is saved.
+        """
+        _touch(self.G)  # Every shard is rewritten
+        self.Node.serial.release()
+        reserved = serial.next_uid(self.G)
+        self.G.clear()
+        self.G.graph.update(G.graph)
+        self.G.add_nodes_from(G.nodes_iter(data=True))
+        self.G.add_edges_from(G.edges_iter(data=True, keys=True))
+        self.G.graph[serial.KEY] = {
+            'next': max(reserved, serial.next_uid(self.G),
+                        max(self.G, default=0) + 1)}
+        for index in self.indexes:
+            index.rebuild(self.G)
+        _save(self.G, self.filename, self.indexes)
+
+    @property
+    def merkle(self):
+        """Subtree hashes, for telling whether parts of the graph changed.
+
+        Built on first access, then kept in sync.
+
+        Returns:
+            :class:`~atomic.graph.merkle.MerkleIndex`
+        """
+        if self._merkle is None:
+            _touch(self.G)
+            self._merkle = self.add_index(merkle.MerkleIndex())
+        return self._merkle
+
+    @property
+    def columns(self):
+        """Columnar mirror of common node attributes.
+
+        Built on first access, then kept in sync. Requires numpy.
+
+        Returns:
+            :class:`~atomic.graph.columnar.ColumnStore`
+        """
+        if self._columns is None:
+            _touch(self.G)
+            from atomic.graph import columnar  # numpy is optional
+            self._columns = self.add_index(columnar.ColumnStore())
+        return self._columns
+
+    @property
+    def importance(self):
+        """Importance scores, for ranking the work that unblocks the most.
+
+        Built on first access, then kept in sync. Requires numpy and scipy.
+
+        Returns:
+            :class:`~atomic.graph.rank.RankIndex`
+        """
+        if self._importance is None:
+            _touch(self.G)
+            from atomic.graph import rank  # numpy and scipy are optional
+            self._importance = self.add_index(rank.RankIndex())
+        return self._importance
+
 
 class FileNodeAPI(api.NodeAPISpec):
     """File-system backed implementation of the Node API."""
 
-    def __init__(self, G, logger, filename=None):
+    def __init__(self, G, logger, filename=None, indexes=None,
+                 adjacency=None):
         """Initialize the instance.
 
         Args:
-            G (:class:`~.networkx.DiGraph`): Graph instance.
+            G (:class:`~.networkx.MultiDiGraph`): Graph instance.
             logger (:class:`~.logging.Logger`): Python logger.
             filename (str): Filepath to save the Graph to.
+            indexes (list[:class:`~atomic.graph.index.Index`]): Indexes to
+                notify of mutations.
+            adjacency (:class:`~atomic.graph.adjacency.TypeIndex`): Edges by
+                type, for walking the hierarchy; one of ``indexes``.
         """
         self.logger = logger
         self.G = G
         self.filename = filename
-        # Find the highest valued node
-        serial_idx = max(self.G.nodes_iter()) + 1 if len(self.G) > 1 else 1
-        self.serial = serial.Serial(serial_idx)
+        self.indexes = indexes if indexes is not None else []
+        self.adjacency = adjacency
+        # Uids come in blocks, reserved in the graph's header
+        self.serial = serial.Lease(
+            functools.partial(_reserve, self.G, self.filename),
+            functools.partial(_release, self.G, self.filename))
+
+    def create(self, parent=None, **kwargs):
+        """Add a node, returning its uid.
+
+        Args:
+            parent (int): If given, a parent edge is added from this node to
+                the new one.
+            **kwargs: Node attributes.
 
-    def create(self, **kwargs):
+        Raises:
+            NotFoundError: If the parent doesn't exist; no node is added.
+            ValidationError: If the attributes don't fit the node's schema.
+        """
+        if parent is not None:
+            _touch(self.G, parent)
+            if parent not in self.G:
+                raise NotFoundError("Parent node %d not found" % int(parent))
+        idx = self._add(kwargs)
+        if parent is not None:
+            _add_edge(self.G, self.indexes, parent, idx,
+                      {"type": graph.EdgeTypes.parent.name})
+        _save(self.G, self.filename, self.indexes)
+        return idx
+
+    def create_many(self, items):
+        """Add many nodes, saving the graph once.
+
+        Every item is validated first, so either all nodes are added, or none.
+
+        Returns:
+            list[int]: The new nodes' uids, in order.
+        """
+        items = [schema.coerce(attrs) for attrs in items]
+        uids = [self._add(attrs, coerce=False) for attrs in items]
+        self.logger.debug("Added %d nodes", len(uids))
+        _save(self.G, self.filename, self.indexes)
+        return uids
+
+    def _add(self, kwargs, coerce=True):
+        if coerce:
+            kwargs = schema.coerce(kwargs)  # Before the uid is consumed
+        kwargs = dict(kwargs)
         idx = self.serial.index
         kwargs["uid"] = idx
         self.logger.debug("Node.add: idx=%d kwargs=%s", idx, kwargs)
         self.G.add_node(idx, attr_dict=kwargs)
+        _notify(self.indexes, "node_added", idx, self.G.node[idx])
         return idx
-        _save(self.G, self.filename)
 
-    def get(self, idx=None, **kwargs):
-        """Retrieve an item by index (uuid)."""
+    def get(self, idx=None, fields=None, **kwargs):
+        """Retrieve an item by index (uuid).
+
+        Args:
+            idx (int): Node id. If None, all nodes are produced as (node,
+                depth) tuples, in hierarchical order.
+            fields (list[str]): Attributes to project; the uid is always kept.
+                If None, the stored attribute dict is returned uncopied.
+        """
         if idx is None:
             self.logger.debug("Retrieve all nodes")
-            return graph.hierarchy(self.G)
+            _touch(self.G)
+            nodes = graph.hierarchy(self.G, adjacency=self.adjacency)
+            if fields is None:
+                return nodes
+            return ((graph.project(n, fields), depth) for n, depth in nodes)
         self.logger.debug("Retrieve node id=%d", idx)
-        return self.G.node.get(idx)
+        _touch(self.G, idx)
+        return graph.project(self.G.node.get(idx), fields)
 
     def update(self, idx: int, **kwargs):
         """Update an item in-place."""
         self.logger.debug("Update node %d", idx)
         if self.get(idx) is None:
-            raise AtomicError("Node %d not found" % int(idx))
+            raise NotFoundError("Node %d not found" % int(idx))
+        kwargs = schema.coerce(kwargs)
         kwargs["uid"] = idx
         self.G.node[idx] = kwargs
-        _save(self.G, self.filename)
+        _notify(self.indexes, "node_updated", idx, kwargs)
+        _save(self.G, self.filename, self.indexes)
 
     def patch(self, idx, *args, **kwargs):
-        """Modify item attributes."""
-        self.logger.debug("Patch node %d", idx)
-        node = self.get(idx)
-        if node is None:
-            raise AtomicError("Node %d not found" % int(idx))
-        for k, v in kwargs.items():
-            if v is None:
-                del node[k]
-            else:
-                node[k] = v
-        kwargs["uid"] = idx
-        self.G.node[idx] = kwargs
-        _save(self.G, self.filename)
+        """Modify item attributes.
+
+        Args:
+            idx (int): Node id.
+            *args (dict): RFC 6902 operations.
+            **kwargs: RFC 7386 merge patch; ``None`` values remove keys.
+
+        Returns:
+            list[dict]: RFC 6902 operations describing the changes made.
+
+        Raises:
+            NotFoundError: If the node doesn't exist.
+            PatchError: If the patch can't be applied; the node is unchanged.
+        """
+        return self.patch_many((idx,), *args, **kwargs)[idx]
+
+    def patch_many(self, uids, *args, **kwargs):
+        """Apply one patch to many nodes, saving the graph once.
+
+        The patch is compiled once. Either every node is patched, or, if the
+        patch fails against any of them, none are.
+
+        Returns:
+            dict: Mapping of uid to the changes made; see :meth:`patch`.
+        """
+        p = patch.Patch(args, kwargs)
+        _touch(self.G, *uids)
+        results = []
+        for idx in uids:
+            self.logger.debug("Patch node %d", idx)
+            node = self.G.node.get(idx)
+            if node is None:
+                raise NotFoundError("Node %d not found" % int(idx))
+            # A patch that changes nothing returns the node itself
+            new = dict(schema.coerce(p.apply(node)))
+            new["uid"] = idx
+            # A new type may coerce keys the patch didn't touch
+            keys = p.keys if new.get("type") == node.get("type") else None
+            changes = patch.diff(node, new, keys=keys)
+            results.append((node, new, changes))
+        diffs = {}
+        for node, new, changes in results:
+            node.clear()  # Update in-place, keeping references valid
+            node.update(new)
+            diffs[node["uid"]] = changes
+            self.logger.debug("Patched node %d: %s", node["uid"], changes)
+            _notify(self.indexes, "node_updated", node["uid"], node)
+        _save(self.G, self.filename, self.indexes)
+        return diffs
 
     def delete(self, idx):
         """Remove a node from the graph."""
         self.logger.debug("Delete node %d", idx)
-        try:
-            self.G.remove_node(idx)
-        except nx.exception.NetworkXError as e:
-            raise AtomicError("Node {:d} not found".format(idx)) from e
-        _save(self.G, self.filename)
+        _touch(self.G, idx, linked=True)
+        if idx not in self.G:
+            raise NotFoundError("Node {:d} not found".format(idx))
+        for src, dst, key in (self.G.in_edges(idx, keys=True) +
+                              self.G.out_edges(idx, keys=True)):
+            _notify(self.indexes, "edge_removed", src, dst, key)
+        self.G.remove_node(idx)
+        _notify(self.indexes, "node_removed", idx)
+        _save(self.G, self.filename, self.indexes)
 
     def binary_add(self, item):
         """Insert an item after using a binary-search comparison."""
@@ -217,78 +517,309 @@ class FileNodeAPI(api.NodeAPISpec):
 
 class FileEdgeAPI(api.EdgeAPISpec):
 
-    def __init__(self, G, logger, filename=None):
+    def __init__(self, G, logger, filename=None, indexes=None):
         """Initialize the instance.
 
         Args:
-            G (:class:`~.networkx.DiGraph`): Graph instance.
+            G (:class:`~.networkx.MultiDiGraph`): Graph instance.
             logger (:class:`~.logging.Logger`): Python logger.
             filename (str): Filepath to save the Graph to.
+            indexes (list[:class:`~atomic.graph.index.Index`]): Indexes to
+                notify of mutations.
         """
         self.G = G
         self.logger = logger
         self.filename = filename
+        self.indexes = indexes if indexes is not None else []
+
+    def get(self, src: int, dst: int, type=None, **kwargs):
+        """Retrieve an edge by source & dstination.
 
-    def get(self, src: int, dst: int, **kwargs):
-        """Retrieve an edge by id or source & dstination."""
+        Args:
+            type (str): The edge's type. If None, the first edge added
+                between the nodes is returned, whatever its type.
+        """
         if kwargs == {}:  # Single item retrieval
-            try:
-                self.logger.info("Retrieving edge (%d, %d)", src, dst)
-                return self.G.edge[src][dst]
-            except KeyError:
-                return None
+            self.logger.info("Retrieving edge (%d, %d)", src, dst)
+            edges = self._edges(src, dst, type)
+            return edges[0][1] if edges else None
 
     def create(self, src: int, dst: int,
                type="related", **kwargs):
-        """Add an edge to the Graph."""
+        """Add an edge to the Graph, or replace the one of its type between
+        the nodes; edges of other types are kept."""
         self.logger.debug("Create edge (%d, %d)", src, dst)
-        try:
-            self.G.node[src]
-            self.G.node[dst]
-        except KeyError:
-            raise AtomicError(
-                "Cannot create Edge (%d, %d); node(s) not found" % (src, dst))
-        self.logger.debug("Adding edge between %d => %d", src, dst)
-        data = dict(kwargs)
-        # Add essential fields
-        data["src"] = src
-        data["dst"] = dst
-        data["type"] = type
-        self.G.add_edge(src, dst, **data)
-        _save(self.G, self.filename)
+        self._check(src, dst)
+        data = _add_edge(self.G, self.indexes, src, dst,
+                         dict(kwargs, type=type))
+        _save(self.G, self.filename, self.indexes)
         return data
 
-    def update(self, src, dst, **kwargs):
-        """Update an edge's attributes."""
-        self.logger.info("Update edge (%d, %d)", src, dst)
-        self.G.edge[src][dst] = {**self.G.edge[src][dst], **kwargs}
-        _save(self.G, self.filename)
+    def create_many(self, edges):
+        """Add many edges, saving the graph once.
+
+        Every edge's nodes are checked first, so either all edges are added,
+        or none.
 
-    def delete(self, src, dst, **kwargs):
-        """Delete an edge from the graph."""
+        Args:
+            edges (iterable[tuple]): (src, dst, attributes) triples. The type
+                defaults to 'related', as with :meth:`create`.
+
+        Returns:
+            list[dict]: The created edges' data, in order.
+        """
+        edges = list(edges)
+        for src, dst, _ in edges:
+            self._check(src, dst)
+        created = [_add_edge(self.G, self.indexes, src, dst,
+                             dict({"type": "related"}, **attrs))
+                   for src, dst, attrs in edges]
+        self.logger.debug("Added %d edges", len(created))
+        _save(self.G, self.filename, self.indexes)
+        return created
+
+    def _check(self, src, dst):
+        _touch(self.G, src, dst)
+        if src not in self.G or dst not in self.G:
+            raise NotFoundError(
+                "Cannot create Edge (%d, %d); node(s) not found" % (src, dst))
+
+    def _edges(self, src, dst, type=None):
+        """Return the (key, attributes) pairs of the edges between two
+        nodes; only the one of ``type``, unless it's None."""
+        _touch(self.G, src, dst)
+        edges = self.G.get_edge_data(src, dst) or {}
+        if type is None:
+            return list(edges.items())
+        key = graph.key_of(type)
+        return [(key, edges[key])] if key in edges else []
+
+    def _found(self, src, dst, type=None):
+        edges = self._edges(src, dst, type)
+        if not edges:
+            raise NotFoundError("Edge (%d, %d%s) not found" % (
+                src, dst, '' if type is None else ', %s' % type))
+        return edges
+
+    def update(self, src, dst, type=None, **kwargs):
+        """Update an edge's attributes; those of every edge between the
+        nodes if ``type`` is None."""
+        self.logger.info("Update edge (%d, %d)", src, dst)
+        for key, attrs in self._found(src, dst, type):
+            # In-place, as the predecessor adjacency shares the dict
+            attrs.update(kwargs)
+            _notify(self.indexes, "edge_updated", src, dst, attrs)
+        _save(self.G, self.filename, self.indexes)
+
+    def delete(self, src, dst, type=None, **kwargs):
+        """Delete an edge from the graph; every edge between the nodes if
+        ``type`` is None."""
         self.logger.info("Delete edge (%d, %d)", src, dst)
-        try:
-            self.G.edge[src][dst]
-        except KeyError as e:
-            raise AtomicError("Edge (%d, %d) not found", src, dst)
-        self.G.remove_edge(src, dst)
-        _save(self.G, self.filename)
+        for key, _ in self._found(src, dst, type):
+            self.G.remove_edge(src, dst, key)
+            _notify(self.indexes, "edge_removed", src, dst, key)
+        _save(self.G, self.filename, self.indexes)
+
+
+def _csv(values):
+    """Split a comma-separated query parameter; lists pass as-is."""
+    if isinstance(values, str):
+        return parse.parse_csv(values)
+    return list(values)
+
+
+def _types(edge_types):
+    return None if edge_types is None else _csv(edge_types)
 
 
 class FileGraphAPI(api.GraphAPISpec):
     """File-system backed implementation of the Graph API."""
 
-    def __init__(self, G, logger, filename=None):
+    #: Methods exposed through :meth:`algorithm`.
+    algorithms = ('toplevel', 'hierarchy', 'children', 'parents',
+                  'descendants', 'is_ancestor', 'common_ancestor',
+                  'neighborhood')
+    #: Methods exposed through :meth:`path`.
+    paths = ('shortest', 'longest', 'maxflow')
+
+    def __init__(self, G, logger, filename=None, adjacency=None,
+                 intervals=None, lca=None):
         """Initialize the instance.
 
         Args:
-            G (:class:`~.networkx.DiGraph`): Graph instance.
+            G (:class:`~.networkx.MultiDiGraph`): Graph instance.
             logger (:class:`~.logging.Logger`): Python logger.
             filename (str): Filepath to save the Graph to.
+            adjacency (:class:`~atomic.graph.adjacency.TypeIndex`): Edges by
+                type, kept in sync by the Node and Edge APIs. If None, edges
+                are found by checking every edge of the nodes involved.
+            intervals (:class:`~atomic.graph.intervals.IntervalIndex`):
+                Labels of the parent hierarchy, likewise kept in sync. If
+                None, ancestry is found by walking down from the ancestor.
+            lca (:class:`~atomic.graph.lca.LCAIndex`): Common ancestors of
+                the parent hierarchy, likewise. If None, one is built for
+                each query.
         """
         self.G = G
         self.logger = logger
         self.filename = filename
+        self.adjacency = adjacency
+        self.intervals = intervals
+        self.lca = lca
+
+    def algorithm(self, name, **kwargs):
+        """Run one of the named :attr:`algorithms`.
+
+        Raises:
+            NotFoundError: If no algorithm is registered under ``name``.
+        """
+        if name not in self.algorithms:
+            raise NotFoundError("Algorithm '%s' not found" % name)
+        self.logger.debug("Run algorithm %s: %s", name, kwargs)
+        return getattr(self, name)(**kwargs)
+
+    def path(self, kind, **kwargs):
+        """Find one of the named :attr:`paths`.
+
+        Raises:
+            NotFoundError: If no kind of path is registered under ``kind``.
+        """
+        if kind not in self.paths:
+            raise NotFoundError("Path '%s' not found" % kind)
+        self.logger.debug("Find %s path: %s", kind, kwargs)
+        return getattr(self, kind)(**kwargs)
+
+    def shortest(self, src, dst, type=None):
+        """Return the ids along a path from ``src`` to ``dst`` with the
+        fewest edges, of any of the comma-separated types if given.
+
+        Raises:
+            NotFoundError: If there's no such path.
+        """
+        src, dst = self._node(src), self._node(dst)
+        found = paths.shortest(self.G, src, dst, _types(type))
+        if found is None:
+            raise NotFoundError("No path from %d to %d" % (src, dst))
+        return found
+
+    def longest(self, src=None, dst=None, type='precedes',
+                weight='time_estd'):
+        """Return the critical path: the one whose nodes' ``weight`` adds up
+        to the most, along edges of the comma-separated types.
+
+        Returns:
+            dict: The path's node ids, and its ``length`` in seconds.
+
+        Raises:
+            NotFoundError: If ``dst`` can't be reached from ``src``.
+            ValueError: If the edges form a cycle.
+        """
+        _touch(self.G)
+        src = None if src is None else self._node(src)
+        dst = None if dst is None else self._node(dst)
+        found, length = paths.longest(self.G, src, dst, _types(type),
+                                      weight)
+        if found is None:
+            raise NotFoundError("No path from %d to %d" % (src, dst))
+        return {'path': found, 'length': length}
+
+    def maxflow(self, src, dst, type=None, capacity='capacity'):
+        """Return the most that can flow from ``src`` to ``dst`` along
+        edges of the comma-separated types, limited by their ``capacity``
+        attributes.
+
+        Returns:
+            dict: The flow's ``value``, its ``flows`` as (src, dst, amount)
+                triples, and the edges of a minimum ``cut``, which limit it.
+        """
+        flow = paths.max_flow(self.G, self._node(src), self._node(dst),
+                              _types(type), capacity)
+        return {'value': flow.value,
+                'flows': sorted(k + (v,) for k, v in flow.flows.items()),
+                'cut': flow.cut}
+
+    def toplevel(self):
+        """Return the ids of nodes without predecessors."""
+        _touch(self.G)
+        return sorted(graph.toplevel(self.G))
+
+    def hierarchy(self, type='parent'):
+        """Return all nodes as (node, depth) pairs, in depth-first order."""
+        _touch(self.G)
+        return list(graph.hierarchy(self.G, type, adjacency=self.adjacency))
+
+    def children(self, node, type='parent'):
+        """Return the ids of a node's successors along edges of a type."""
+        node = self._node(node)
+        if self.adjacency is None:
+            return graph.children(self.G, node, type)
+        return self.adjacency.children(node, type)
+
+    def parents(self, node, type='parent'):
+        """Return the ids of a node's predecessors along edges of a type."""
+        node = self._node(node)
+        if self.adjacency is None:
+            return graph.parents(self.G, node, type)
+        return self.adjacency.parents(node, type)
+
+    def descendants(self, node):
+        """Return the ids of the nodes below a node along parent edges, in
+        uid order."""
+        node = self._node(node)
+        if self.intervals is None:
+            return graph.descendants(self.G, node)
+        return sorted(self.intervals.descendants(node))
+
+    def is_ancestor(self, node, descendant):
+        """Whether ``descendant`` is below ``node`` along parent edges."""
+        node, descendant = self._node(node), self._node(descendant)
+        if self.intervals is None:
+            return descendant in graph.descendants(self.G, node)
+        return self.intervals.is_ancestor(node, descendant)
+
+    def common_ancestor(self, nodes):
+        """Return the id of the lowest node that each of the nodes is, or is
+        below, along parent edges; None if there's none.
+
+        Args:
+            nodes (list[int] or str): Node ids; comma-separated in a string.
+        """
+        nodes = [self._node(n) for n in _csv(nodes)]
+        if not nodes:
+            raise ValueError("At least one node is required")
+        index = self.lca
+        if index is None:
+            index = lca.LCAIndex()
+            index.rebuild(self.G)
+        return index.lca(*nodes)
+
+    def neighborhood(self, node, hops=1, type=None, direction='both'):
+        """Return the nodes within a number of edges of a node.
+
+        Args:
+            node (int): Node to start from.
+            hops (int): Most edges to follow.
+            type (list[str] or str): Edge types to follow, comma-separated in
+                a string; any if None.
+            direction (str): 'out', 'in' or 'both'; see
+                :func:`~atomic.graph.graph.neighborhood`.
+
+        Returns:
+            list[(int, int)]: (Node id, edges away) pairs, nearest first,
+                then by id; the node itself isn't included.
+        """
+        node = self._node(node)
+        found = graph.neighborhood(self.G, node, int(hops), _types(type),
+                                   direction)
+        del found[node]
+        return sorted(found.items(), key=lambda item: (item[1], item[0]))
+
+    def _node(self, node):
+        node = int(node)  # Query parameters are strings
+        _touch(self.G)  # Algorithms run over the whole graph
+        if node not in self.G:
+            raise NotFoundError("Node %d not found" % node)
+        return node
 
     def search(self, type="depth", node=None):
         """Search within a Graph.
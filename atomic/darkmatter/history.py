@@ -0,0 +1,242 @@
+"""
+history
+=======
+Versioned storage: a journal of every mutation, with periodic checkpoints,
+so the graph can be reconstructed as it was at any earlier time.
+
+History lives in a directory beside the graph file::
+
+    atomic.json.history/
+        checkpoint-000000-1476608400000.json
+        journal-000000.jsonl
+        checkpoint-001000-1477213200000.json
+        journal-001000.jsonl
+
+Each checkpoint is a full snapshot, named by the number of journal entries
+before it and the time of the last one, in milliseconds. Its journal holds
+the entries that follow, up to the next checkpoint. Reconstructing the graph
+at a time loads the latest checkpoint before it and replays its journal.
+
+Entries are written as changes are made, and flushed as the graph is saved.
+A save checkpoints the graph once the journal has grown to
+:attr:`History.ratio` times the size of the last checkpoint, so replay stays
+about as costly as loading the checkpoint, and the time spent checkpointing
+stays in proportion to the changes journaled, however large the graph gets.
+"""
+import glob
+import json
+import os
+import re
+import tempfile
+import time
+from datetime import datetime
+
+from networkx.readwrite import json_graph
+
+from atomic.errors import NotFoundError
+from atomic.graph import index, schema, store
+from atomic.utils import log
+
+
+CHECKPOINT_RE = re.compile(r'checkpoint-(\d+)-(\d+)\.json$')
+
+
+def _timestamp(when):
+    if isinstance(when, datetime):
+        return when.timestamp()
+    return float(when)
+
+
+class History(index.Index):
+    """Journals mutations and checkpoints the graph.
+
+    Args:
+        filename (str): The graph's file; history is kept in a directory
+            named after it.
+        ratio (float): Size of the journal, relative to the last
+            checkpoint, past which the next save checkpoints the graph; it
+            bounds the replay needed to reconstruct any point in time.
+        clock (callable): Returns the current POSIX time.
+    """
+
+    def __init__(self, filename, ratio=1.0, clock=time.time):
+        self.logger = log.get_logger('history')
+        self.directory = filename + '.history'
+        self.ratio = ratio
+        self.clock = clock
+        self.G = None
+        self.seq = 0  # Entries journaled, ever
+        self._since = 0  # Entries since the last checkpoint
+        self._written = 0  # Bytes journaled since the last checkpoint
+        self._size = 0  # Bytes in the last checkpoint
+        self._journal = None
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def checkpoints(self):
+        """Return the checkpoints, oldest first.
+
+        Returns:
+            list[(int, float, str)]: Each one's sequence number, time, and
+                file path.
+        """
+        found = []
+        for path in glob.glob(os.path.join(self.directory, 'checkpoint-*')):
+            m = CHECKPOINT_RE.search(path)
+            if m is not None:
+                found.append((int(m.group(1)), int(m.group(2)) / 1000, path))
+        return sorted(found)
+
+    def as_of(self, when):
+        """Reconstruct the graph as it was at a point in time.
+
+        Args:
+            when (:class:`~datetime.datetime` or float): Local time, or POSIX
+                time.
+
+        Returns:
+            :class:`~atomic.graph.store.Graph`: A new graph.
+
+        Raises:
+            NotFoundError: If ``when`` precedes the history.
+        """
+        t = _timestamp(when)
+        if self._journal is not None:
+            self._journal.flush()
+        candidates = [c for c in self.checkpoints() if c[1] <= t]
+        if not candidates:
+            raise NotFoundError("No history before %s" %
+                                datetime.fromtimestamp(t))
+        seq, _, path = candidates[-1]
+        with open(path) as f:
+            G = store.Graph.from_node_link(json.load(f))
+        replayed = 0
+        try:
+            with open(self._journal_path(seq)) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if entry[0] > t:
+                        break
+                    _replay(G, entry[1], *entry[2:])
+                    replayed += 1
+        except FileNotFoundError:
+            pass
+        for attrs in G.node.values():
+            attrs.update(schema.coerce(attrs))
+        self.logger.debug("Reconstructed graph at %s from checkpoint %d and "
+                          "%d entries", datetime.fromtimestamp(t), seq,
+                          replayed)
+        return G
+
+    # Index hooks
+
+    def rebuild(self, G):
+        """Start recording changes to ``G``.
+
+        History is picked up where it left off; if there is none yet, or
+        the graph was replaced since, the graph is checkpointed.
+        """
+        first, self.G = self.G is None, G
+        self.close()
+        checkpoints = self.checkpoints()
+        if first and checkpoints:
+            self.seq, _, path = checkpoints[-1]
+            self._size = os.path.getsize(path)
+            self._since = self._written = 0
+            try:
+                with open(self._journal_path(self.seq), 'rb') as f:
+                    for line in f:
+                        self._since += 1
+                        self._written += len(line)
+            except FileNotFoundError:
+                pass
+            self.seq += self._since
+        else:
+            self._checkpoint()
+
+    def node_added(self, uid, attrs):
+        self._record('node_added', uid, attrs)
+
+    def node_updated(self, uid, attrs):
+        self._record('node_updated', uid, attrs)
+
+    def node_removed(self, uid):
+        self._record('node_removed', uid)
+
+    def edge_added(self, src, dst, attrs):
+        self._record('edge_added', src, dst, attrs)
+
+    def edge_updated(self, src, dst, attrs):
+        self._record('edge_updated', src, dst, attrs)
+
+    def edge_removed(self, src, dst, key):
+        self._record('edge_removed', src, dst, key)
+
+    def saved(self):
+        """Flush the journal, and checkpoint the graph if it has grown past
+        :attr:`ratio` times the last checkpoint."""
+        if self._written > self.ratio * self._size:
+            self._checkpoint()
+        elif self._journal is not None:
+            self._journal.flush()
+
+    # Storage
+
+    def _journal_path(self, seq):
+        return os.path.join(self.directory, 'journal-%06d.jsonl' % seq)
+
+    def _record(self, hook, *args):
+        if self._journal is None:
+            self._journal = open(self._journal_path(self.seq - self._since),
+                                 'a')
+        line = json.dumps([self.clock(), hook] + list(args),
+                          default=schema.encode) + '\n'
+        self._journal.write(line)
+        self.seq += 1
+        self._since += 1
+        self._written += len(line)
+
+    def _checkpoint(self):
+        """Snapshot the graph, and start a new journal after it."""
+        self.close()
+        os.makedirs(self.directory, exist_ok=True)
+        data = json_graph.node_link_data(self.G)
+        data['graph'] = {}  # Indexes' state isn't history
+        name = 'checkpoint-%06d-%d.json' % (self.seq,
+                                            int(self.clock() * 1000))
+        with tempfile.NamedTemporaryFile('w', dir=self.directory,
+                                         delete=False) as f:
+            f.write(json.dumps(data, default=schema.encode))
+        path = os.path.join(self.directory, name)
+        os.replace(f.name, path)
+        self._size = os.path.getsize(path)
+        self._since = self._written = 0
+        self.logger.debug("Checkpointed %s", name)
+
+
+def _replay(G, hook, *args):
+    """Apply a journaled mutation to a graph."""
+    if hook in ('node_added', 'node_updated'):
+        uid, attrs = args
+        G.add_node(uid)
+        G.node[uid] = attrs
+    elif hook == 'node_removed':
+        if args[0] in G:
+            G.remove_node(args[0])
+    elif hook in ('edge_added', 'edge_updated'):
+        src, dst, attrs = args
+        key = attrs.get('type')
+        if G.has_edge(src, dst, key):
+            G.edge[src][dst][key].clear()  # Shared with the predecessors
+            G.edge[src][dst][key].update(attrs)
+        else:
+            G.add_edge(src, dst, key, attr_dict=attrs)
+    elif hook == 'edge_removed':
+        src, dst, key = (args + (None,))[:3]  # Older entries have no key
+        while G.has_edge(src, dst, key):
+            G.remove_edge(src, dst, key)
+    else:
+        raise ValueError("Unknown journal entry '%s'" % hook)
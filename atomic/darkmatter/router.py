@@ -0,0 +1,311 @@
+"""
+router
+======
+One API over several backends, each holding a share of the nodes.
+
+Every backend numbers its own nodes; the router maps those local uids into
+one uid space, so a node's uid says which backend holds it:
+
+* by ``range``, backend ``i`` holds uids ``i * span + 1`` through
+  ``(i + 1) * span``;
+* by ``hash``, it holds the uids that leave ``i`` when divided by the
+  number of backends, spreading consecutive uids across all of them.
+
+New nodes are created with their parent, or, without one, on each backend
+in turn. Edges between nodes of the same backend are that backend's own.
+Edges across backends are kept in a separate, small graph of just the nodes
+they link, each standing in for a node elsewhere by its ``ref``.
+
+Listing all nodes asks every backend at once, and merges their top-level
+subtrees by uid.
+"""
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+
+from atomic.darkmatter import api, fileapi
+from atomic.errors import AtomicError, NotFoundError
+from atomic.utils import log
+
+
+#: Ways of assigning uids to backends.
+LAYOUTS = ('range', 'hash')
+
+
+class RouterAPI:
+    """Routes Node and Edge calls to the backend holding each node.
+
+    Args:
+        backends (list): APIs exposing ``Node`` and ``Edge``, like
+            :class:`~.fileapi.FileAPI`; their order fixes the uids, so it
+            mustn't change once nodes are created.
+        by (str): 'range' or 'hash'; see :mod:`~atomic.darkmatter.router`.
+        span (int): Uids per backend, by range.
+        cross: API holding the edges across backends, like a
+            :class:`~.fileapi.FileAPI`; in memory if None.
+
+    Raises:
+        ValueError: If there are no backends, or ``by`` isn't one of
+            :data:`LAYOUTS`.
+    """
+
+    def __init__(self, backends, by='range', span=1 << 32, cross=None):
+        if not backends:
+            raise ValueError("At least one backend is required")
+        if by not in LAYOUTS:
+            raise ValueError("Backends are by one of: %s" %
+                             ', '.join(LAYOUTS))
+        self.logger = log.get_logger("api")
+        self.backends = list(backends)
+        self.by = by
+        self.span = span
+        self.cross = cross if cross is not None else fileapi.FileAPI()
+        self.executor = ThreadPoolExecutor(max_workers=len(self.backends))
+        self.Node = RouterNodeAPI(self)
+        self.Edge = RouterEdgeAPI(self)
+        # Uid => its stand-in's uid in the cross graph
+        self._refs = {n['ref']: n['uid'] for n, _ in self.cross.Node.get()}
+        self._turn = 0
+
+    def close(self):
+        """Shut down the executor, waiting for pending calls."""
+        self.executor.shutdown(wait=True)
+
+    def locate(self, uid):
+        """Return the position of the backend holding a uid, and the uid it
+        knows the node by.
+
+        Raises:
+            NotFoundError: If no backend can hold the uid.
+        """
+        uid = int(uid)
+        if self.by == 'hash':
+            i, local = uid % len(self.backends), uid // len(self.backends)
+        else:
+            i, local = (uid - 1) // self.span, (uid - 1) % self.span + 1
+        if uid < 1 or local < 1 or i >= len(self.backends):
+            raise NotFoundError("Node %d not found" % uid)
+        return i, local
+
+    def uid(self, i, local):
+        """Return the uid of backend ``i``'s node ``local``.
+
+        Raises:
+            AtomicError: If the backend's range of uids is used up.
+        """
+        if self.by == 'hash':
+            return local * len(self.backends) + i
+        if local > self.span:
+            raise AtomicError("Backend %d is out of uids" % i)
+        return i * self.span + local
+
+    def turn(self):
+        """Return the position of the backend to put the next new top-level
+        node on."""
+        i = self._turn
+        self._turn = (i + 1) % len(self.backends)
+        return i
+
+    def fan_out(self, call):
+        """Call ``call(i, backend)`` for every backend at once.
+
+        Returns:
+            list: Results, in backend order.
+        """
+        futures = [self.executor.submit(call, i, backend)
+                   for i, backend in enumerate(self.backends)]
+        return [f.result() for f in futures]
+
+    def node(self, i, local, node):
+        """Return a backend's node data with its uid in the router's
+        terms."""
+        if node is None:
+            return None
+        return dict(node, uid=self.uid(i, local))
+
+    def edge(self, src, dst, edge):
+        """Return edge data with its ends in the router's terms."""
+        if edge is None:
+            return None
+        return dict(edge, src=src, dst=dst)
+
+    def stand_in(self, uid, create=False):
+        """Return the uid of a node's stand-in in the cross graph; None if
+        it has none, unless it's to be created."""
+        ref = self._refs.get(uid)
+        if ref is None and create:
+            ref = self._refs[uid] = self.cross.Node.create(ref=uid)
+        return ref
+
+    def drop_stand_in(self, uid):
+        """Delete a node's stand-in, and so its edges across backends."""
+        ref = self._refs.pop(uid, None)
+        if ref is not None:
+            self.cross.Node.delete(ref)
+
+
+class RouterNodeAPI(api.NodeAPISpec):
+    """Node API over a :class:`RouterAPI`'s backends."""
+
+    def __init__(self, router):
+        self.router = router
+        self.logger = router.logger
+
+    def get(self, idx=None, fields=None, **kwargs):
+        """Retrieve a node by uid, or all nodes.
+
+        Args:
+            idx (int): Node id. If None, every backend's nodes are produced
+                as (node, depth) tuples; each backend's top-level subtrees
+                stay whole, ordered by their top node's uid.
+            fields (list[str]): Attributes to project; the uid is always
+                kept.
+        """
+        router = self.router
+        if idx is not None:
+            i, local = router.locate(idx)
+            node = router.backends[i].Node.get(local, fields=fields)
+            return router.node(i, local, node)
+
+        def subtrees(i, backend):
+            found = []
+            for node, depth in backend.Node.get(fields=fields):
+                if not depth:
+                    found.append([])
+                found[-1].append(
+                    (router.node(i, node['uid'], node), depth))
+            return found
+        merged = heapq.merge(*router.fan_out(subtrees),
+                             key=lambda tree: tree[0][0]['uid'])
+        return (item for tree in merged for item in tree)
+
+    def create(self, parent=None, **kwargs):
+        """Add a node, on its parent's backend if it has one; returns its
+        uid.
+
+        Raises:
+            NotFoundError: If the parent doesn't exist.
+        """
+        router = self.router
+        if parent is None:
+            i, local_parent = router.turn(), None
+        elif self.get(parent) is None:
+            raise NotFoundError("Parent node %d not found" % int(parent))
+        else:
+            i, local_parent = router.locate(parent)
+        local = router.backends[i].Node.create(local_parent, **kwargs)
+        return router.uid(i, local)
+
+    def create_many(self, items):
+        """Add many nodes together on one backend, saving it once.
+
+        Returns:
+            list[int]: The new nodes' uids, in order.
+        """
+        i = self.router.turn()
+        return [self.router.uid(i, local) for local in
+                self.router.backends[i].Node.create_many(items)]
+
+    def update(self, idx, **kwargs):
+        """Replace a node's attributes."""
+        i, local = self.router.locate(idx)
+        self.router.backends[i].Node.update(local, **kwargs)
+
+    def patch(self, idx, *args, **kwargs):
+        """Modify a node's attributes; see
+        :meth:`~.fileapi.FileNodeAPI.patch`."""
+        i, local = self.router.locate(idx)
+        return self.router.backends[i].Node.patch(local, *args, **kwargs)
+
+    def patch_many(self, uids, *args, **kwargs):
+        """Apply one patch to many nodes, once per backend.
+
+        Each backend patches its nodes atomically, but a failure on one
+        doesn't undo the patches already applied by the others.
+        """
+        shares = {}
+        for uid in uids:
+            i, local = self.router.locate(uid)
+            shares.setdefault(i, {})[local] = uid
+        diffs = {}
+        for i, share in sorted(shares.items()):
+            found = self.router.backends[i].Node.patch_many(
+                list(share), *args, **kwargs)
+            diffs.update((share[local], changes)
+                         for local, changes in found.items())
+        return diffs
+
+    def delete(self, idx):
+        """Remove a node, and its edges to other backends."""
+        router = self.router
+        i, local = router.locate(idx)
+        if router.backends[i].Node.get(local) is None:
+            raise NotFoundError("Node %d not found" % int(idx))
+        router.drop_stand_in(int(idx))
+        router.backends[i].Node.delete(local)
+
+
+class RouterEdgeAPI(api.EdgeAPISpec):
+    """Edge API over a :class:`RouterAPI`'s backends."""
+
+    def __init__(self, router):
+        self.router = router
+        self.logger = router.logger
+
+    def _route(self, src, dst):
+        """Return the API holding edges between two nodes, and the uids it
+        knows them by; for nodes on separate backends, those of their
+        stand-ins, if they have them."""
+        router = self.router
+        (i, local_src), (j, local_dst) = router.locate(src), router.locate(dst)
+        if i == j:
+            return router.backends[i].Edge, local_src, local_dst
+        return (router.cross.Edge, router.stand_in(int(src)),
+                router.stand_in(int(dst)))
+
+    def get(self, src, dst, type=None, **kwargs):
+        """Retrieve an edge; see :meth:`~.fileapi.FileEdgeAPI.get`."""
+        edges, src_in, dst_in = self._route(src, dst)
+        if src_in is None or dst_in is None:
+            return None
+        return self.router.edge(src, dst, edges.get(src_in, dst_in, type))
+
+    def create(self, src, dst, type="related", **kwargs):
+        """Add an edge, or replace the one of its type between the nodes.
+
+        Raises:
+            NotFoundError: If either node doesn't exist.
+        """
+        router = self.router
+        (i, local_src), (j, local_dst) = router.locate(src), router.locate(dst)
+        if i == j:
+            data = router.backends[i].Edge.create(local_src, local_dst,
+                                                  type=type, **kwargs)
+            return router.edge(src, dst, data)
+        for uid in (src, dst):
+            if self.router.Node.get(uid) is None:
+                raise NotFoundError(
+                    "Cannot create Edge (%d, %d); node(s) not found" %
+                    (src, dst))
+        data = router.cross.Edge.create(
+            router.stand_in(int(src), create=True),
+            router.stand_in(int(dst), create=True), type=type, **kwargs)
+        return router.edge(src, dst, data)
+
+    def update(self, src, dst, type=None, **kwargs):
+        """Update an edge's attributes; every edge's between the nodes if
+        ``type`` is None."""
+        edges, src_in, dst_in = self._found(src, dst, type)
+        edges.update(src_in, dst_in, type, **kwargs)
+
+    def delete(self, src, dst, type=None, **kwargs):
+        """Delete an edge; every edge between the nodes if ``type`` is
+        None."""
+        edges, src_in, dst_in = self._found(src, dst, type)
+        edges.delete(src_in, dst_in, type)
+
+    def _found(self, src, dst, type=None):
+        edges, src_in, dst_in = self._route(src, dst)
+        if src_in is None or dst_in is None:
+            raise NotFoundError("Edge (%d, %d%s) not found" % (
+                src, dst, '' if type is None else ', %s' % type))
+        return edges, src_in, dst_in
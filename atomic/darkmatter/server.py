@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+server
+======
+Asyncio HTTP service exposing the routes described by the API specs.
+
+    GET    /nodes?q={query}&fields={csv,}&sort=importance
+    POST   /nodes
+    GET    /nodes/{id}?fields={csv,}
+    PUT    /nodes/{id}
+    PATCH  /nodes/{id}
+    DELETE /nodes/{id}
+    GET    /edges/{src}/{dest}?type={type}
+    POST   /edges/{src}/{dest}
+    PATCH  /edges/{src}/{dest}?type={type}
+    DELETE /edges/{src}/{dest}?type={type}
+    GET    /graph/algorithms/{name}?{param=value&...}
+    GET    /graph/paths/{kind}?{param=value&...}
+
+Connections are kept alive between requests, single resources carry an ETag
+for conditional GETs, and node listings are streamed as chunked JSON.
+
+Socket I/O happens on the event loop, while route handlers run in an
+executor against the synchronous backend. Responses are encoded inside the
+executor too, so they never observe a half-applied mutation. Listings take
+their nodes' uids up front, and encode each chunk's nodes in the executor as
+it's sent, in turn with other handlers: a node deleted in the meantime is
+left out, and one changed is sent as it is by then.
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+from atomic.errors import AtomicError, NotFoundError
+from atomic.graph import graph, query, schema
+from atomic.utils import log
+
+
+REASONS = {
+    200: 'OK',
+    201: 'Created',
+    204: 'No Content',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    411: 'Length Required',
+    500: 'Internal Server Error',
+}
+
+
+class HTTPError(Exception):
+    """Error carrying an HTTP status code."""
+
+    def __init__(self, status, message=None):
+        super().__init__(message or REASONS.get(status, ''))
+        self.status = status
+        self.message = message or REASONS.get(status, '')
+
+
+class Request:
+    """A parsed HTTP request."""
+
+    def __init__(self, method, target, version, headers, body=b''):
+        self.method = method
+        self.version = version
+        self.headers = headers
+        self.body = body
+        url = urlsplit(target)
+        self.path = url.path
+        self.query = dict(parse_qsl(url.query, keep_blank_values=True))
+
+    @property
+    def keep_alive(self):
+        """Whether the connection persists after this request."""
+        conn = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return conn == 'keep-alive'
+        return conn != 'close'
+
+    @property
+    def fields(self):
+        """Requested field projection, or None for every field."""
+        fields = self.query.get('fields')
+        if not fields:
+            return None
+        return [f.strip() for f in fields.split(',') if f.strip()]
+
+    def json(self):
+        """Decode the request body as JSON."""
+        if not self.body:
+            return {}
+        try:
+            return json.loads(self.body.decode('utf-8'))
+        except ValueError as e:
+            raise HTTPError(400, "Invalid JSON body: %s" % e) from e
+
+
+class Response:
+    """An HTTP response.
+
+    Exactly one of ``body`` or ``chunks`` is used. ``body`` is the encoded
+    payload; ``chunks`` is an iterable of encoded pieces, sent with chunked
+    transfer encoding.
+    """
+
+    def __init__(self, status=200, body=b'', chunks=None, headers=None):
+        self.status = status
+        self.body = body
+        self.chunks = chunks
+        self.headers = headers or {}
+
+
+def _dumps(obj):
+    return json.dumps(obj, default=schema.encode)
+
+
+def _encode(obj):
+    return _dumps(obj).encode('utf-8')
+
+
+def _json_array(encoded, batch):
+    """Join pre-encoded JSON values into an array, in ``batch`` sized pieces.
+    """
+    buf, sep = [], '['
+    for item in encoded:
+        buf.append(sep)
+        buf.append(item)
+        sep = ','
+        if len(buf) >= 2 * batch:
+            yield ''.join(buf).encode('utf-8')
+            buf = []
+    buf.append('[]' if sep == '[' else ']')
+    yield ''.join(buf).encode('utf-8')
+
+
+def _json_response(obj, status=200):
+    return Response(status, body=_encode(obj),
+                    headers={'Content-Type': 'application/json'})
+
+
+class Server:
+    """HTTP server over a synchronous API backend.
+
+    Any object exposing ``Node`` and ``Edge`` attributes implementing
+    :class:`~.api.NodeAPISpec` and :class:`~.api.EdgeAPISpec` can be served.
+    The ``/graph`` routes additionally require a ``Graph`` attribute
+    implementing :class:`~.api.GraphAPISpec`.
+    """
+
+    #: (method, path pattern, handler name)
+    routes = (
+        ('GET', r'/nodes/?', 'list_nodes'),
+        ('POST', r'/nodes/?', 'create_node'),
+        ('GET', r'/nodes/(?P<uid>\d+)', 'get_node'),
+        ('PUT', r'/nodes/(?P<uid>\d+)', 'update_node'),
+        ('PATCH', r'/nodes/(?P<uid>\d+)', 'patch_node'),
+        ('DELETE', r'/nodes/(?P<uid>\d+)', 'delete_node'),
+        ('GET', r'/edges/(?P<src>\d+)/(?P<dst>\d+)', 'get_edge'),
+        ('POST', r'/edges/(?P<src>\d+)/(?P<dst>\d+)', 'create_edge'),
+        ('PATCH', r'/edges/(?P<src>\d+)/(?P<dst>\d+)', 'update_edge'),
+        ('DELETE', r'/edges/(?P<src>\d+)/(?P<dst>\d+)', 'delete_edge'),
+        ('GET', r'/graph/algorithms/(?P<name>\w+)', 'run_algorithm'),
+        ('GET', r'/graph/paths/(?P<kind>\w+)', 'find_path'),
+    )
+
+    def __init__(self, api, host='127.0.0.1', port=8080, executor=None,
+                 idle_timeout=15.0, batch=256):
+        """Initialize the instance.
+
+        Args:
+            api: Synchronous API backend, such as :class:`~.fileapi.FileAPI`.
+            host (str): Interface to bind.
+            port (int): Port to bind; 0 picks a free port.
+            executor (:class:`concurrent.futures.Executor`): Executor running
+                route handlers. Defaults to a single worker, since the
+                in-memory graph isn't safe to mutate from multiple threads.
+            idle_timeout (float): Seconds a kept-alive connection may sit idle.
+            batch (int): Number of items per chunk in streamed listings.
+        """
+        self.api = api
+        self.host = host
+        self.port = port
+        self.executor = executor or ThreadPoolExecutor(max_workers=1)
+        self.idle_timeout = idle_timeout
+        self.batch = batch
+        self.logger = log.get_logger('server')
+        self._routes = [(method, re.compile('^%s$' % pattern), name)
+                        for method, pattern, name in self.routes]
+        self._server = None
+
+    async def start(self):
+        """Start listening; the bound port is stored in :attr:`port`."""
+        self._server = await asyncio.start_server(
+            self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.logger.info("Serving on %s:%d", self.host, self.port)
+
+    async def close(self):
+        """Stop listening and wait for the server to close."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def run(self):
+        """Serve until interrupted."""
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(self.start())
+        try:
+            loop.run_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            loop.run_until_complete(self.close())
+
+    async def _handle(self, reader, writer):
+        """Serve requests on one connection until it closes."""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(
+                        self._read_request(reader), self.idle_timeout)
+                except HTTPError as e:
+                    await self._write(writer, None, Response(
+                        e.status, body=_encode({'error': e.message})))
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+                        asyncio.LimitOverrunError, ConnectionError):
+                    break
+                if request is None:
+                    break
+                response = await self._dispatch(request)
+                if not await self._write(writer, request, response):
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        """Read one request, or None if the client closed the connection."""
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError as e:
+            if not e.partial.strip():
+                return None
+            raise
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        body = b''
+        if 'transfer-encoding' in headers:
+            raise HTTPError(411)
+        length = headers.get('content-length')
+        if length:
+            try:
+                body = await reader.readexactly(int(length))
+            except ValueError:
+                raise HTTPError(400, "Invalid Content-Length")
+        return Request(method.upper(), target, version, headers, body)
+
+    async def _dispatch(self, request):
+        """Route a request to its handler, run in the executor."""
+        allowed = []
+        for method, pattern, name in self._routes:
+            match = pattern.match(request.path)
+            if match is None:
+                continue
+            if method != request.method:
+                allowed.append(method)
+                continue
+            handler = functools.partial(getattr(self, name), request,
+                                        **match.groupdict())
+            loop = asyncio.get_event_loop()
+            try:
+                return await loop.run_in_executor(self.executor, handler)
+            except HTTPError as e:
+                return _json_response({'error': e.message}, e.status)
+            except NotFoundError as e:
+                return _json_response({'error': str(e)}, 404)
+            except (AtomicError, ValueError, TypeError) as e:
+                return _json_response({'error': str(e)}, 400)
+            except Exception:  # pylint: disable=broad-except
+                self.logger.exception("Failed handling %s %s",
+                                      request.method, request.path)
+                return _json_response({'error': REASONS[500]}, 500)
+        if allowed:
+            return Response(405, headers={'Allow': ', '.join(allowed)})
+        return _json_response({'error': REASONS[404]}, 404)
+
+    async def _write(self, writer, request, response):
+        """Write a response, honoring conditional GETs and streaming.
+
+        Returns:
+            bool: Whether the connection should be kept alive.
+        """
+        headers = dict(response.headers)
+        keep_alive = request is not None and request.keep_alive
+        status, body = response.status, response.body
+        chunked = response.chunks is not None
+        if chunked and request.version == 'HTTP/1.0':
+            # No chunked encoding; delimit the body by closing instead
+            keep_alive = False
+        if request is not None and request.method == 'GET' and \
+                status == 200 and not chunked:
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()
+            headers['ETag'] = etag
+            if _etag_matches(request.headers.get('if-none-match'), etag):
+                status, body = 304, b''
+        headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        if chunked and keep_alive:
+            headers['Transfer-Encoding'] = 'chunked'
+        elif not chunked and status not in (204, 304):
+            headers['Content-Length'] = str(len(body))
+        head = ['HTTP/1.1 %d %s' % (status, REASONS.get(status, ''))]
+        head.extend('%s: %s' % kv for kv in headers.items())
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+        if not chunked:
+            writer.write(body)
+        else:
+            # Chunks may read nodes from the graph, so they're produced in
+            # the executor, in turn with other handlers
+            loop = asyncio.get_event_loop()
+            chunks = iter(response.chunks)
+            while True:
+                try:
+                    chunk = await loop.run_in_executor(self.executor, next,
+                                                       chunks, None)
+                except Exception:  # pylint: disable=broad-except
+                    # Too late for an error status; cut the response short
+                    self.logger.exception("Failed streaming %s %s",
+                                          request.method, request.path)
+                    return False
+                if chunk is None:
+                    break
+                if headers.get('Transfer-Encoding') == 'chunked':
+                    writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                else:
+                    writer.write(chunk)
+                await writer.drain()
+            if headers.get('Transfer-Encoding') == 'chunked':
+                writer.write(b'0\r\n\r\n')
+        await writer.drain()
+        return keep_alive
+
+    # Route handlers; run in the executor against the synchronous backend.
+
+    def list_nodes(self, request):
+        match = query.compile_query(request.query.get('q'))
+        fields = request.fields
+        sort = request.query.get('sort')
+        if sort is not None:
+            if sort != 'importance' or not hasattr(self.api, 'importance'):
+                raise HTTPError(400, "Unable to sort by '%s'" % sort)
+            scores = self.api.importance.scores()
+            nodes = sorted((node for node, _ in self.api.Node.get()
+                            if match(node)),
+                           key=lambda node: -scores[node['uid']])
+            items = [_dumps(dict(graph.project(node, fields),
+                                 importance=scores[node['uid']]))
+                     for node in nodes]
+        else:
+            # Only the uids are taken up front, since other handlers may
+            # change the graph while it's sent. Queries may reference
+            # attributes outside the projection, so nodes are fetched whole.
+            uids = [node['uid'] for node, _ in self.api.Node.get()]
+            items = (_dumps(graph.project(node, fields))
+                     for node in map(self.api.Node.get, uids)
+                     if node is not None and match(node))
+        return Response(200, chunks=_json_array(items, self.batch),
+                        headers={'Content-Type': 'application/json'})
+
+    def create_node(self, request):
+        uid = self.api.Node.create(**request.json())
+        return _json_response(self.api.Node.get(uid), 201)
+
+    def get_node(self, request, uid):
+        node = self.api.Node.get(int(uid), fields=request.fields)
+        if node is None:
+            raise NotFoundError("Node %s not found" % uid)
+        return _json_response(node)
+
+    def update_node(self, request, uid):
+        self.api.Node.update(int(uid), **request.json())
+        return _json_response(self.api.Node.get(int(uid)))
+
+    def patch_node(self, request, uid):
+        """Apply a JSON Patch (array body) or JSON Merge Patch (object)."""
+        data = request.json()
+        if isinstance(data, list):
+            self.api.Node.patch(int(uid), *data)
+        else:
+            self.api.Node.patch(int(uid), **data)
+        return _json_response(self.api.Node.get(int(uid)))
+
+    def delete_node(self, request, uid):
+        self.api.Node.delete(int(uid))
+        return Response(204)
+
+    def get_edge(self, request, src, dst):
+        edge = self.api.Edge.get(int(src), int(dst),
+                                 request.query.get('type'))
+        if edge is None:
+            raise NotFoundError("Edge (%s, %s) not found" % (src, dst))
+        return _json_response(edge)
+
+    def create_edge(self, request, src, dst):
+        return _json_response(
+            self.api.Edge.create(int(src), int(dst), **request.json()), 201)
+
+    def update_edge(self, request, src, dst):
+        type = request.query.get('type')
+        self.api.Edge.update(int(src), int(dst), type, **request.json())
+        return _json_response(self.api.Edge.get(int(src), int(dst), type))
+
+    def delete_edge(self, request, src, dst):
+        self.api.Edge.delete(int(src), int(dst), request.query.get('type'))
+        return Response(204)
+
+    def run_algorithm(self, request, name):
+        if not hasattr(self.api, 'Graph'):
+            raise NotFoundError("Graph API not available")
+        return _json_response(
+            self.api.Graph.algorithm(name, **request.query))
+
+    def find_path(self, request, kind):
+        if not hasattr(self.api, 'Graph'):
+            raise NotFoundError("Graph API not available")
+        return _json_response(self.api.Graph.path(kind, **request.query))
+
+
+def _etag_matches(header, etag):
+    """Check an If-None-Match header against an ETag."""
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(',')]
+    return '*' in tags or etag in tags or ('W/' + etag) in tags
+
+
+class Client:
+    """Minimal keep-alive HTTP/1.1 client, for tests and benchmarks."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._reader = self._writer = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(
+            self.host, self.port)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+    async def request(self, method, target, body=None, headers=None):
+        """Send a request over the open connection.
+
+        Returns:
+            (int, dict, bytes): Status, lower-cased headers, and body.
+        """
+        if self._writer is None:
+            await self.connect()
+        payload = b'' if body is None else _encode(body)
+        head = ['%s %s HTTP/1.1' % (method, target),
+                'Host: %s:%d' % (self.host, self.port),
+                'Content-Length: %d' % len(payload)]
+        head.extend('%s: %s' % kv for kv in (headers or {}).items())
+        self._writer.write(
+            ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + payload)
+        lines = (await self._reader.readuntil(b'\r\n\r\n')) \
+            .decode('latin-1').split('\r\n')
+        status = int(lines[0].split(' ')[1])
+        resp_headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(':')
+                resp_headers[name.strip().lower()] = value.strip()
+        if status in (204, 304):
+            data = b''
+        elif resp_headers.get('transfer-encoding') == 'chunked':
+            parts = []
+            while True:
+                size = int(await self._reader.readuntil(b'\r\n'), 16)
+                chunk = await self._reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                parts.append(chunk[:-2])
+            data = b''.join(parts)
+        elif 'content-length' in resp_headers:
+            data = await self._reader.readexactly(
+                int(resp_headers['content-length']))
+        else:
+            data = await self._reader.read()
+        if resp_headers.get('connection') == 'close':
+            self.close()
+        return status, resp_headers, data
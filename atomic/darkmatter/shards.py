@@ -0,0 +1,344 @@
+"""
+shards
+======
+Graphs stored in pieces: a shard file for each top-level project, or for
+each community of closely linked nodes, loaded only when something in it is
+needed.
+
+A sharded graph is a directory::
+
+    atomic.shards/
+        manifest.json
+        cross.json
+        shard-1.json
+        shard-14.json
+
+The manifest lists each shard's nodes as ranges of uids, so the shard
+holding a node is found without opening any other. Each shard holds its
+nodes and the edges between them; edges from one shard to another are kept
+in ``cross.json``, and added to the graph once both ends are loaded.
+
+Shards are named after a node: a project's top-level node, or a community's
+lowest uid. With shards by ``toplevel``, each node is saved with its first
+parent, so a project's nodes stay together as they're added and moved. With
+shards by ``community``, nodes stay in the shard they were first saved to,
+and new nodes join a parent's or neighbor's; rewrite the graph with
+:func:`write` to detect communities afresh.
+"""
+import bisect
+import itertools
+import json
+import os
+import tempfile
+from collections import Counter
+
+from networkx.readwrite import json_graph
+
+from atomic.errors import AtomicError
+from atomic.graph import graph, schema, serial, store
+from atomic.utils import log
+
+
+#: Suffix of sharded graphs' directories.
+SUFFIX = '.shards'
+MANIFEST = 'manifest.json'
+CROSS = 'cross.json'
+#: Ways of dividing a graph into shards.
+STRATEGIES = ('toplevel', 'community')
+#: Most passes of label propagation when detecting communities.
+ROUNDS = 20
+
+
+def is_sharded(path):
+    """Whether ``path`` names a sharded graph: an existing directory, or
+    one ending in :data:`SUFFIX`."""
+    return os.path.isdir(path) or path.rstrip(os.sep).endswith(SUFFIX)
+
+
+def partition(G, by='toplevel'):
+    """Assign each node to a shard.
+
+    Args:
+        G: The graph.
+        by (str): 'toplevel', for a shard per node without a parent, holding
+            everything below it; or 'community', for a shard per group of
+            nodes with more edges among themselves than to other nodes, found
+            by label propagation over edges of any type.
+
+    Returns:
+        dict: Node id to shard name.
+
+    Raises:
+        ValueError: If ``by`` isn't one of :data:`STRATEGIES`.
+    """
+    if by == 'toplevel':
+        return _spread(G, {}, str)
+    if by != 'community':
+        raise ValueError("Shards are by one of: %s" % ', '.join(STRATEGIES))
+    labels = {n: n for n in G}
+    for _ in range(ROUNDS):
+        changed = False
+        for n in sorted(G):
+            counts = Counter(labels[m] for m in itertools.chain(
+                G.succ[n], G.pred[n]) if m != n)
+            if not counts:
+                continue
+            most = max(counts.values())
+            if counts[labels[n]] == most:  # Ties keep the label
+                continue
+            labels[n] = max(label for label, count in counts.items()
+                            if count == most)
+            changed = True
+        if not changed:
+            break
+    lowest = {}
+    for n in sorted(G):
+        lowest.setdefault(labels[n], str(n))
+    return {n: lowest[labels[n]] for n in G}
+
+
+def _spread(G, owner, name_of):
+    """Assign the unassigned nodes to the shard of their first parent
+    reached from the top level; nodes without one start a shard named by
+    ``name_of(uid)``."""
+    # Nodes only reachable through a cycle start shards last
+    for root in itertools.chain(graph.roots(G), sorted(G)):
+        if root in owner:
+            continue
+        name = owner[root] = name_of(root)
+        todo = [root]
+        while todo:
+            for kid in graph.children(G, todo.pop()):
+                if kid not in owner:
+                    owner[kid] = name
+                    todo.append(kid)
+    return owner
+
+
+def _runs(uids):
+    """Return sorted uids as [lo, hi] ranges of consecutive ones."""
+    runs = []
+    for uid in uids:
+        if runs and runs[-1][1] == uid - 1:
+            runs[-1][1] = uid
+        else:
+            runs.append([uid, uid])
+    return runs
+
+
+class ShardedGraph(store.Graph):
+    """A graph saved as shards, whose nodes are loaded a shard at a time.
+
+    Shards are loaded by :meth:`touch`, after which :attr:`indexes` are
+    rebuilt, and saved by :meth:`save`: every loaded shard is written, and
+    the others left as they are.
+
+    Args:
+        directory (str): Where the shards are; it's created on first save.
+        by (str): How to divide a new graph; see :func:`partition`. An
+            existing graph keeps its own.
+
+    Attributes:
+        directory (str): Where the shards are.
+        by (str): How nodes are divided.
+        next (int): Lowest uid not yet reserved, as last saved; see
+            :func:`~atomic.graph.serial.next_uid`.
+        indexes (list[:class:`~atomic.graph.index.Index`]): Rebuilt after
+            shards are loaded.
+    """
+
+    def __init__(self, directory, by='toplevel'):
+        super().__init__()
+        if by not in STRATEGIES:
+            raise ValueError("Shards are by one of: %s" %
+                             ', '.join(STRATEGIES))
+        self.logger = log.get_logger('shards')
+        self.directory = directory
+        self.by = by
+        self.next = 1
+        self.indexes = []
+        self._shards = {}  # name => manifest entry
+        self._los, self._ranges = [], []  # Sorted range starts; (hi, name)
+        self._loaded = set()
+        self._cross = {}  # (src, dst, key) => attrs, with an end unloaded
+        self._linked = {}  # uid => nodes in other shards it has edges with
+        self._read()
+
+    def shard_of(self, uid):
+        """Return the name of the shard a node was saved to, or None."""
+        i = bisect.bisect_right(self._los, uid) - 1
+        if i >= 0 and uid <= self._ranges[i][0]:
+            return self._ranges[i][1]
+        return None
+
+    def shards(self):
+        """Return the shards' names, and whether each is loaded."""
+        return {name: name in self._loaded for name in self._shards}
+
+    def touch(self, uids=None, linked=False):
+        """Load the shards holding some nodes; every shard if None.
+
+        Args:
+            uids (iterable[int]): Node ids; those never saved are skipped.
+            linked (bool): Also load the shards of nodes with edges to and
+                from them, as deleting a node needs.
+        """
+        if uids is None:
+            names = set(self._shards)
+        else:
+            uids = set(uids)
+            if linked:
+                for uid in list(uids):
+                    uids.update(self._linked.get(uid, ()))
+            names = {self.shard_of(uid) for uid in uids}
+            names.discard(None)
+        names -= self._loaded
+        if not names:
+            return
+        for name in sorted(names):
+            part = store.Graph.from_node_link(_read_json(self._path(name)))
+            for n, attrs in part.nodes_iter(data=True):
+                attrs.update(schema.coerce(attrs))
+                self.add_node(n, attr_dict=attrs)
+            self.add_edges_from(part.edges_iter(data=True, keys=True))
+            self._loaded.add(name)
+        # Edges whose ends are now both loaded live in the graph
+        for (src, dst, key), attrs in list(self._cross.items()):
+            if src in self.node and dst in self.node:
+                self.add_edge(src, dst, key, attr_dict=attrs)
+                del self._cross[src, dst, key]
+        self.logger.debug("Loaded shards %s", ', '.join(sorted(names)))
+        for index in self.indexes:
+            index.rebuild(self)
+
+    def save(self):
+        """Write the loaded shards, those of new nodes, the cross-shard
+        edges and the manifest. Shards left empty are removed."""
+        self._save(self._owners())
+
+    def _save(self, owner):
+        members = {name: [] for name in self._loaded}
+        for n in sorted(owner):
+            members.setdefault(owner[n], []).append(n)
+        parts = {name: store.Graph() for name in members}
+        for n, name in owner.items():
+            parts[name].add_node(n, attr_dict=self.node[n])
+        cross = []
+        for src, dst, key, attrs in self.edges_iter(data=True, keys=True):
+            if owner[src] == owner[dst]:
+                parts[owner[src]].add_edge(src, dst, key, attr_dict=attrs)
+            else:
+                cross.append([src, dst, key, attrs])
+        # Keep the edges into unloaded shards, unless their loaded end is
+        # gone
+        for (src, dst, key), attrs in list(self._cross.items()):
+            if any(n not in self.node and self.shard_of(n) in self._loaded
+                   for n in (src, dst)):
+                del self._cross[src, dst, key]
+            else:
+                cross.append([src, dst, key, attrs])
+        os.makedirs(self.directory, exist_ok=True)
+        for name, uids in members.items():
+            if uids:
+                _write_json(self._path(name),
+                            json_graph.node_link_data(parts[name]))
+                self._shards[name] = {'nodes': len(uids),
+                                      'ranges': _runs(uids)}
+            elif name in self._shards:
+                os.remove(self._path(name))
+                del self._shards[name]
+        self._loaded = set(members) & set(self._shards)
+        self.next = max(self.next, max(self.node, default=0) + 1) \
+            if serial.KEY not in self.graph else serial.next_uid(self)
+        cross.sort(key=lambda edge: edge[:3])
+        _write_json(os.path.join(self.directory, CROSS), cross)
+        _write_json(os.path.join(self.directory, MANIFEST), {
+            'version': 1, 'by': self.by, 'next': self.next,
+            'shards': self._shards})
+        self._locate()
+        self._link(cross)
+        self.logger.debug("Saved %d shards", len(members))
+
+    def _owners(self):
+        """Assign every loaded node to a shard."""
+        if self.by == 'toplevel':
+            # Nodes follow their first parent, starting from the top
+            return _spread(self, {}, lambda n: self.shard_of(n) or str(n))
+        owner = {n: self.shard_of(n) for n in self.node}
+        for n in sorted(self.node):
+            if owner[n] is not None:
+                continue
+            near = graph.parents(self, n) + sorted(
+                itertools.chain(self.succ[n], self.pred[n]))
+            owner[n] = next((owner[m] for m in near if owner[m] is not None),
+                            str(n))
+        return owner
+
+    # Files
+
+    def _path(self, name):
+        return os.path.join(self.directory, 'shard-%s.json' % name)
+
+    def _read(self):
+        try:
+            manifest = _read_json(os.path.join(self.directory, MANIFEST))
+        except FileNotFoundError:
+            self.logger.debug("No shards found in %s", self.directory)
+            return
+        self.by = manifest['by']
+        self.next = manifest['next']
+        self.graph[serial.KEY] = {'next': self.next}
+        self._shards = manifest['shards']
+        self._locate()
+        cross = _read_json(os.path.join(self.directory, CROSS))
+        for src, dst, key, attrs in cross:
+            self._cross[src, dst, key] = attrs
+        self._link(cross)
+
+    def _locate(self):
+        ranges = sorted((lo, hi, name) for name, entry in self._shards.items()
+                        for lo, hi in entry['ranges'])
+        self._los = [lo for lo, _, _ in ranges]
+        self._ranges = [(hi, name) for _, hi, name in ranges]
+
+    def _link(self, cross):
+        self._linked = {}
+        for src, dst, _, _ in cross:
+            self._linked.setdefault(src, set()).add(dst)
+            self._linked.setdefault(dst, set()).add(src)
+
+
+def write(G, directory, by='toplevel'):
+    """Save a whole graph as shards.
+
+    Args:
+        G: The graph.
+        directory (str): Where to put them; it mustn't hold shards already.
+        by (str): How to divide the graph; see :func:`partition`.
+
+    Returns:
+        :class:`ShardedGraph`: The sharded graph, every shard loaded.
+
+    Raises:
+        AtomicError: If ``directory`` already holds shards.
+    """
+    if os.path.exists(os.path.join(directory, MANIFEST)):
+        raise AtomicError("%s already holds shards" % directory)
+    sharded = ShardedGraph(directory, by)
+    sharded.add_nodes_from(G.nodes_iter(data=True))
+    sharded.add_edges_from(G.edges_iter(data=True, keys=True))
+    sharded._save(partition(sharded, by))
+    return sharded
+
+
+def _read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_json(path, data):
+    """Replace a file at once, so a crash leaves the old one or the new."""
+    with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(path),
+                                     delete=False) as f:
+        json.dump(data, f, default=schema.encode)
+    os.replace(f.name, path)
@@ -1,9 +1,11 @@
 import logging
+from datetime import datetime, timedelta
 
 import pytest
 
 from atomic.darkmatter import fileapi
-from atomic.errors import AtomicError
+from atomic.errors import AtomicError, NotFoundError, ValidationError
+from atomic.graph import serial, store
 from atomic.graph.graph import EdgeTypes
 
 
@@ -35,6 +37,16 @@ def test_get_node(nodeapi):
     assert nodeapi.get(uid) == data
 
 
+def test_get_node_fields(nodeapi):
+    body = 'x' * 1024
+    uid = nodeapi.create(name=test_get_node_fields.__name__, body=body)
+    assert nodeapi.get(uid, fields=['name', 'missing']) == {
+        'uid': uid, 'name': test_get_node_fields.__name__}
+    assert nodeapi.get(uid, fields=[]) == {'uid': uid}
+    for node, _ in nodeapi.get(fields=['name']):
+        assert 'body' not in node
+
+
 def test_delete_node(nodeapi):
     data = {'name': test_delete_node.__name__}
     uid = nodeapi.create(**data)
@@ -54,6 +66,35 @@ def test_update_node(nodeapi):
     assert nodeapi.get(uid) == newdata
 
 
+def test_patch_node(nodeapi):
+    uid = nodeapi.create(name=test_patch_node.__name__, keep=True, drop=1)
+    changes = nodeapi.patch(uid, {'op': 'add', 'path': '/tags', 'value': []},
+                            drop=None, cats=True)
+    assert nodeapi.get(uid) == {'uid': uid, 'name': test_patch_node.__name__,
+                                'keep': True, 'tags': [], 'cats': True}
+    assert {'op': 'remove', 'path': '/drop'} in changes
+
+
+def test_patch_node_unchanged(nodeapi):
+    uid = nodeapi.create(name='a')
+    assert nodeapi.patch(uid) == []
+    assert nodeapi.patch(uid, {'op': 'test', 'path': '/name',
+                               'value': 'a'}) == []
+    assert nodeapi.get(uid) == {'uid': uid, 'name': 'a'}
+
+
+def test_patch_many_is_atomic(nodeapi):
+    a = nodeapi.create(name='a', count=1)
+    b = nodeapi.create(name='b')
+    op = {'op': 'replace', 'path': '/count', 'value': 2}
+    with pytest.raises(AtomicError):
+        nodeapi.patch_many([a, b], op)  # 'b' has no count to replace
+    assert nodeapi.get(a)['count'] == 1
+    diffs = nodeapi.patch_many([a, b], done=True)
+    assert set(diffs) == {a, b}
+    assert nodeapi.get(a)['done'] and nodeapi.get(b)['done']
+
+
 @pytest.fixture(params=[
     fileapi.FileEdgeAPI,
 ], ids=[
@@ -98,7 +139,98 @@ def test_update_edge(edgeapi):
     edgeapi.create(**data)
     newdata = dict(data)
     newdata['cats'] = True
-    newdata['type'] = EdgeTypes.precedes.name
 
     edgeapi.update(**newdata)
-    assert edgeapi.get(6, 7) == newdata
+    assert edgeapi.get(6, 7, 'related') == newdata
+    with pytest.raises(NotFoundError):
+        edgeapi.update(6, 7, type=EdgeTypes.precedes.name, cats=False)
+
+
+def test_typed_edges(edgeapi):
+    edgeapi.create(1, 4, type='parent_of', name='p')
+    edgeapi.create(1, 4, type='related', name='r')
+    edgeapi.create(1, 4, type='parent', weight=2)  # The same edge
+    assert edgeapi.get(1, 4, 'parent_of') == \
+        {'src': 1, 'dst': 4, 'type': 'parent', 'name': 'p', 'weight': 2}
+    assert edgeapi.get(1, 4, EdgeTypes.related.name)['name'] == 'r'
+    assert edgeapi.get(1, 4)['type'] == 'parent'  # The first added
+    assert edgeapi.get(1, 4, 'precedes') is None
+    edgeapi.update(1, 4, seen=True)
+    edgeapi.delete(1, 4, 'parent')
+    assert edgeapi.get(1, 4) == {'src': 1, 'dst': 4, 'type': 'related',
+                                 'name': 'r', 'seen': True}
+    edgeapi.delete(1, 4)
+    assert edgeapi.get(1, 4) is None
+    with pytest.raises(NotFoundError):
+        edgeapi.delete(1, 4)
+
+
+def test_typed_nodes(tmpdir):
+    filename = str(tmpdir.join('graph.json'))
+    nodes = fileapi.FileNodeAPI(fileapi._load(filename), logger,
+                                filename=filename)
+    uid = nodes.create(name='a', type='Action', time_estd='1h', done='')
+    node = nodes.get(uid)
+    assert node['time_estd'] == timedelta(hours=1) and node['done'] is True
+    nodes.patch(uid, due='2016 Oct 16')
+    assert nodes.get(uid)['due'] == datetime(2016, 10, 16)
+    with pytest.raises(ValidationError):
+        nodes.patch(uid, priority='high')
+    assert 'priority' not in nodes.get(uid)
+    # Values are restored when loaded
+    assert fileapi._load(filename).node[uid] == nodes.get(uid)
+
+
+def test_create_with_parent(nodeapi):
+    uid = nodeapi.create(1, name=test_create_with_parent.__name__)
+    assert nodeapi.G.edge[1][uid]['parent']['type'] == EdgeTypes.parent.name
+    before = len(nodeapi.G)
+    with pytest.raises(NotFoundError):
+        nodeapi.create(9999, name='orphan')
+    assert len(nodeapi.G) == before
+
+
+def test_create_many(nodeapi):
+    items = [{'name': 'a'}, {'name': 'b', 'type': 'Action', 'done': ''}]
+    uids = nodeapi.create_many(items)
+    assert [nodeapi.get(uid)['name'] for uid in uids] == ['a', 'b']
+    assert nodeapi.get(uids[1])['done'] is True
+    assert 'uid' not in items[0]  # Inputs are left alone
+    before = len(nodeapi.G)
+    with pytest.raises(ValidationError):
+        nodeapi.create_many([{'name': 'c'}, {'type': 'Action', 'done': '?'}])
+    assert len(nodeapi.G) == before
+
+
+def test_create_many_edges(edgeapi):
+    created = edgeapi.create_many([(4, 5, {}), (5, 6, {'type': 'precedes'})])
+    assert [e['type'] for e in created] == ['related', 'precedes']
+    assert edgeapi.get(5, 6) == {'src': 5, 'dst': 6, 'type': 'precedes'}
+    with pytest.raises(NotFoundError):
+        edgeapi.create_many([(7, 8, {}), (7, 9999, {})])
+    assert edgeapi.get(7, 8) is None
+
+
+def test_uids_from_header():
+    G = store.Graph()
+    G.add_node(5)
+    assert fileapi.FileNodeAPI(G, logger).create() == 6
+    G.graph[serial.KEY] = {'next': 10}  # Nodes aren't looked at
+    assert fileapi.FileNodeAPI(G, logger).create() == 10
+
+
+def test_uids_are_leased(tmpdir):
+    filename = str(tmpdir.join('graph.json'))
+    first = fileapi.FileNodeAPI(fileapi._load(filename), logger,
+                                filename=filename)
+    second = fileapi.FileNodeAPI(fileapi._load(filename), logger,
+                                 filename=filename)
+    assert first.create() == 1
+    assert second.create() == serial.BLOCK + 1
+    assert first.create() == 2
+    first.serial.release()  # Not given back; the second reserved since
+    second.serial.release()
+    assert tmpdir.join('graph.json.lease').read() == str(serial.BLOCK + 2)
+    third = fileapi.FileNodeAPI(fileapi._load(filename), logger,
+                                filename=filename)
+    assert third.create() == serial.BLOCK + 2
@@ -0,0 +1,59 @@
+import asyncio
+import logging
+
+import pytest
+
+from atomic.darkmatter import asyncapi, fileapi
+from atomic.errors import AtomicError
+
+
+logger = logging.getLogger('test')
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+@pytest.fixture
+def aapi(G):
+    _api = asyncapi.AsyncFileAPI(fileapi.FileAPI(G))
+    yield _api
+    _api.close()
+
+
+def test_create_and_get_node(aapi):
+    uid = run(aapi.Node.create(name=test_create_and_get_node.__name__))
+    assert run(aapi.Node.get(uid)) == {
+        'uid': uid, 'name': test_create_and_get_node.__name__}
+
+
+def test_create_with_parent(aapi):
+    uid = run(aapi.Node.create(3, name='x'))
+    assert aapi.sync.Edge.get(3, uid, 'parent') is not None
+
+
+def test_get_all_nodes_is_materialized(aapi):
+    nodes = run(aapi.Node.get())
+    assert isinstance(nodes, list)
+    assert len(nodes) > 0
+
+
+def test_errors_propagate(aapi):
+    with pytest.raises(AtomicError):
+        run(aapi.Node.delete(2**10))
+
+
+def test_edges(aapi):
+    run(aapi.Edge.create(4, 5, type='related', name='edge'))
+    assert run(aapi.Edge.get(4, 5))['name'] == 'edge'
+    run(aapi.Edge.delete(4, 5))
+    assert run(aapi.Edge.get(4, 5)) is None
+
+
+@pytest.mark.parametrize('limit', [None, 3])
+def test_gather_create_and_get(aapi, limit):
+    items = [{'name': 'n%d' % i} for i in range(20)]
+    uids = run(asyncapi.gather_create(aapi.Node, items, limit=limit))
+    assert len(set(uids)) == len(items)
+    nodes = run(asyncapi.gather_get(aapi.Node, uids, limit=limit))
+    assert [n['name'] for n in nodes] == [i['name'] for i in items]
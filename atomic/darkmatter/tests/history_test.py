@@ -0,0 +1,93 @@
+import copy
+import os
+from datetime import datetime
+
+import networkx as nx
+import pytest
+
+from atomic.darkmatter import fileapi, history
+from atomic.errors import NotFoundError
+
+
+class Clock:
+
+    def __init__(self, t=1000.0):
+        self.t = t
+
+    def __call__(self):
+        self.t += 1
+        return self.t
+
+
+@pytest.fixture
+def api(tmpdir):
+    api = fileapi.FileAPI(nx.MultiDiGraph())
+    api.filename = str(tmpdir.join('graph.json'))
+    api.Node.filename = api.Edge.filename = api.filename  # Saved as changed
+    api.clock = Clock()
+    api.history = api.add_index(history.History(api.filename, ratio=2,
+                                                clock=api.clock))
+    return api
+
+
+def snapshot(G):
+    return copy.deepcopy((G.node, sorted(G.edges(keys=True, data=True))))
+
+
+def test_as_of(api):
+    snapshots = []
+    a = api.Node.create(name='a', type='Action', due='2016 Oct 16 08:52')
+    snapshots.append((api.clock.t, snapshot(api.G)))
+    for i in range(10):
+        b = api.Node.create(a, name='b%d' % i)
+        api.Node.patch(a, priority=i)
+        if i % 3 == 0:
+            api.Node.delete(b)
+        snapshots.append((api.clock.t, snapshot(api.G)))
+    api.Edge.create(a, 3, type='related')
+    api.Edge.update(a, 3, weight=2)
+    snapshots.append((api.clock.t, snapshot(api.G)))
+
+    checkpoints = api.history.checkpoints()
+    assert len(checkpoints) > 2
+    for t, expected in snapshots:
+        assert snapshot(api.history.as_of(t)) == expected
+    past = api.history.as_of(datetime.fromtimestamp(snapshots[0][0]))
+    assert past.node[a]['due'] == datetime(2016, 10, 16, 8, 52)
+    with pytest.raises(NotFoundError):
+        api.history.as_of(checkpoints[0][1] - 1)
+
+
+def test_resume(api):
+    api.Node.create(name='a')
+    api.Node.create(name='b')
+    t = api.clock.t
+    seq = api.history.seq
+
+    resumed = history.History(api.filename, ratio=2, clock=api.clock)
+    resumed.rebuild(api.G)
+    assert resumed.seq == seq
+    assert len(resumed.checkpoints()) == 1
+    api.indexes[-1] = resumed
+    api.Node.create(name='c')
+    assert len(resumed.checkpoints()) == 1
+    api.Node.create(name='d')
+    api.Node.create(name='e')
+    assert len(resumed.checkpoints()) == 2
+    assert sorted(resumed.as_of(t)) == [1, 2]
+
+    resumed.rebuild(api.G)  # As when it's replaced
+    assert len(resumed.checkpoints()) == 3
+    assert os.path.isdir(api.filename + '.history')
+
+
+def test_checkpoints_per_save(api):
+    api.Node.create_many({'name': 'n%d' % i} for i in range(100))
+    # One batch, one save: flushed, and checkpointed once at most
+    assert len(api.history.checkpoints()) == 2
+    with open(api.history._journal_path(0)) as f:
+        assert sum(1 for _ in f) == 100
+    api.Node.create(name='a')
+    assert len(api.history.checkpoints()) == 2
+    with open(api.history._journal_path(api.history.seq - 1)) as f:
+        assert len(f.readlines()) == 1
@@ -0,0 +1,89 @@
+import pytest
+
+from atomic.darkmatter import fileapi, router
+from atomic.errors import NotFoundError
+
+
+@pytest.fixture(params=['range', 'hash'])
+def api(request):
+    backends = [fileapi.FileAPI() for _ in range(3)]
+    _api = router.RouterAPI(backends, by=request.param, span=100)
+    yield _api
+    _api.close()
+
+
+def test_layouts():
+    ranges = router.RouterAPI([None] * 3, span=100)
+    assert ranges.locate(1) == (0, 1)
+    assert ranges.locate(100) == (0, 100)
+    assert ranges.locate(101) == (1, 1)
+    assert ranges.uid(2, 5) == 205
+    with pytest.raises(NotFoundError):
+        ranges.locate(301)
+    hashes = router.RouterAPI([None] * 3, by='hash')
+    assert [hashes.locate(uid) for uid in (3, 4, 5, 6)] == [
+        (0, 1), (1, 1), (2, 1), (0, 2)]
+    assert hashes.uid(1, 2) == 7
+    with pytest.raises(NotFoundError):
+        hashes.locate(2)
+    with pytest.raises(ValueError):
+        router.RouterAPI([])
+
+
+def test_nodes(api):
+    a = api.Node.create(name='a')
+    b = api.Node.create(name='b')
+    a1 = api.Node.create(a, name='a1')
+    assert api.locate(a)[0] == api.locate(a1)[0] != api.locate(b)[0]
+    assert api.Node.get(a1) == {'uid': a1, 'name': 'a1'}
+    api.Node.update(a1, name='A1')
+    api.Node.patch(b, name='B')
+    assert api.Node.patch_many([a, b], done=True) == {
+        a: [{'op': 'add', 'path': '/done', 'value': True}],
+        b: [{'op': 'add', 'path': '/done', 'value': True}]}
+    assert [(n['uid'], n['name'], depth) for n, depth in api.Node.get()] == [
+        (a, 'a', 0), (a1, 'A1', 1), (b, 'B', 0)]
+    with pytest.raises(NotFoundError):
+        api.Node.create(999, name='orphan')
+
+
+def test_listing_is_ordered(api):
+    uids = [api.Node.create(name=str(i)) for i in range(7)]
+    uids += api.Node.create_many([{'name': 'x'}, {'name': 'y'}])
+    listed = [n['uid'] for n, _ in api.Node.get(fields=['name'])]
+    assert listed == sorted(uids)
+
+
+def test_cross_edges(api):
+    a, b = api.Node.create(name='a'), api.Node.create(name='b')
+    a1 = api.Node.create(a, name='a1')
+    assert api.Edge.create(a1, b, type='precedes', note='x') == {
+        'src': a1, 'dst': b, 'type': 'precedes', 'note': 'x'}
+    assert api.Edge.get(a1, b)['dst'] == b
+    assert api.Edge.get(b, a1) is None
+    assert api.Edge.get(a, a1, 'parent')['src'] == a
+    api.Edge.update(a1, b, note='y')
+    assert api.Edge.get(a1, b)['note'] == 'y'
+    # Only the cross graph holds it
+    for backend in api.backends:
+        assert backend.G.number_of_edges() <= 1
+    api.Node.delete(b)
+    assert api.Node.get(b) is None
+    assert len(api.cross.G) == 1  # a1's stand-in remains
+    with pytest.raises(NotFoundError):
+        api.Edge.delete(a1, b)
+    with pytest.raises(NotFoundError):
+        api.Edge.create(a1, b)
+
+
+def test_cross_edges_persist(tmpdir, monkeypatch):
+    monkeypatch.setattr(fileapi.atexit, 'register', lambda *args: None)
+    path = str(tmpdir.join('cross.json'))
+    backends = [fileapi.FileAPI() for _ in range(2)]
+    first = router.RouterAPI(backends, cross=fileapi.FileAPI(persist=path))
+    a, b = first.Node.create(), first.Node.create()
+    first.Edge.create(a, b)
+    second = router.RouterAPI(backends, cross=fileapi.FileAPI(persist=path))
+    assert second.Edge.get(a, b)['type'] == 'related'
+    second.Edge.delete(a, b)
+    assert second.Edge.get(a, b) is None
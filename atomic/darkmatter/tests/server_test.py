@@ -0,0 +1,169 @@
+import asyncio
+import json
+
+import networkx as nx
+import pytest
+
+from atomic.darkmatter import fileapi, server
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+@pytest.fixture
+def client():
+    G = nx.MultiDiGraph()
+    for n in range(1, 9):
+        G.add_node(n, {'uid': n, 'name': 'node %d' % n})
+    srv = server.Server(fileapi.FileAPI(G), port=0, batch=2)
+    run(srv.start())
+    _client = server.Client(srv.host, srv.port)
+    yield _client
+    _client.close()
+    run(srv.close())
+
+
+def test_get_node_with_fields(client):
+    status, headers, body = run(client.request('GET', '/nodes/3?fields=name'))
+    assert status == 200
+    assert json.loads(body.decode()) == {'uid': 3, 'name': 'node 3'}
+    assert headers['connection'] == 'keep-alive'
+
+
+def test_conditional_get(client):
+    _, headers, _ = run(client.request('GET', '/nodes/3'))
+    etag = headers['etag']
+    status, _, body = run(client.request(
+        'GET', '/nodes/3', headers={'If-None-Match': etag}))
+    assert status == 304 and body == b''
+    run(client.request('PATCH', '/nodes/3', body={'cats': True}))
+    status, headers, _ = run(client.request(
+        'GET', '/nodes/3', headers={'If-None-Match': etag}))
+    assert status == 200 and headers['etag'] != etag
+
+
+def test_list_nodes_streams(client):
+    status, headers, body = run(client.request('GET', '/nodes?fields=uid'))
+    assert status == 200
+    assert headers['transfer-encoding'] == 'chunked'
+    assert sorted(n['uid'] for n in json.loads(body.decode())) == \
+        list(range(1, 9))
+
+
+def test_list_nodes_while_deleting():
+    api = fileapi.FileAPI()
+    for _ in range(10):
+        api.Node.create()
+    srv = server.Server(api, batch=2)
+    response = srv.list_nodes(server.Request('GET', '/nodes', 'HTTP/1.1',
+                                             {}))
+    chunks = iter(response.chunks)
+    assert next(chunks) == b'[{"uid": 1},{"uid": 2}'
+    # Nodes deleted partway are left out of the rest
+    api.Node.delete(5)
+    api.Node.delete(10)
+    api.Node.update(3, name='three')
+    rest = b''.join(chunks).decode()
+    assert json.loads('[{"uid": 1},{"uid": 2}' + rest) == \
+        [{'uid': 1}, {'uid': 2}, {'uid': 3, 'name': 'three'}] + \
+        [{'uid': n} for n in (4, 6, 7, 8, 9)]
+
+
+def test_list_nodes_query(client):
+    status, _, body = run(client.request('GET',
+                                         '/nodes?q=name:%22node%206%22'))
+    assert [n['uid'] for n in json.loads(body.decode())] == [6]
+
+
+def test_node_crud(client):
+    status, _, body = run(client.request('POST', '/nodes', body={'a': '1'}))
+    assert status == 201
+    uid = json.loads(body.decode())['uid']
+    status, _, _ = run(client.request('DELETE', '/nodes/%d' % uid))
+    assert status == 204
+    status, _, _ = run(client.request('GET', '/nodes/%d' % uid))
+    assert status == 404
+
+
+def test_edges(client):
+    status, _, _ = run(client.request(
+        'POST', '/edges/1/2', body={'type': 'parent'}))
+    assert status == 201
+    status, _, body = run(client.request('GET', '/edges/1/2'))
+    assert status == 200
+    assert json.loads(body.decode())['type'] == 'parent'
+    status, _, _ = run(client.request('GET', '/edges/2/1'))
+    assert status == 404
+    run(client.request('POST', '/edges/1/2', body={'type': 'related'}))
+    status, _, _ = run(client.request('DELETE', '/edges/1/2?type=parent'))
+    assert status == 204
+    status, _, body = run(client.request('GET', '/edges/1/2'))
+    assert json.loads(body.decode())['type'] == 'related'
+    status, _, _ = run(client.request('GET', '/edges/1/2?type=parent'))
+    assert status == 404
+
+
+def test_algorithms(client):
+    status, _, body = run(client.request('GET', '/graph/algorithms/toplevel'))
+    assert status == 200 and json.loads(body.decode()) == list(range(1, 9))
+    status, _, _ = run(client.request('GET', '/graph/algorithms/nope'))
+    assert status == 404
+    for src, dst in ((1, 2), (2, 3), (1, 4)):
+        run(client.request('POST', '/edges/%d/%d' % (src, dst),
+                           body={'type': 'parent'}))
+    status, _, body = run(client.request(
+        'GET', '/graph/algorithms/neighborhood?node=2&hops=2&type=parent'))
+    assert status == 200
+    assert json.loads(body.decode()) == [[1, 1], [3, 1], [4, 2]]
+    status, _, body = run(client.request(
+        'GET', '/graph/algorithms/common_ancestor?nodes=3,4'))
+    assert json.loads(body.decode()) == 1
+    status, _, _ = run(client.request(
+        'GET', '/graph/algorithms/neighborhood?node=2&direction=up'))
+    assert status == 400
+
+
+def test_list_by_importance(client):
+    pytest.importorskip('scipy')
+    run(client.request('POST', '/edges/3/5', body={'type': 'precedes'}))
+    status, _, body = run(client.request(
+        'GET', '/nodes?sort=importance&fields=name&q=-uid:1'))
+    assert status == 200
+    nodes = json.loads(body.decode())
+    assert nodes[0]['uid'] == 3 and len(nodes) == 7
+    assert set(nodes[0]) == {'uid', 'name', 'importance'}
+    status, _, _ = run(client.request('GET', '/nodes?sort=name'))
+    assert status == 400
+
+
+def test_paths(client):
+    for src, dst in ((1, 2), (2, 3), (1, 3)):
+        run(client.request('POST', '/edges/%d/%d' % (src, dst),
+                           body={'type': 'precedes'}))
+    status, _, body = run(client.request(
+        'GET', '/graph/paths/shortest?src=1&dst=3'))
+    assert status == 200 and json.loads(body.decode()) == [1, 3]
+    status, _, body = run(client.request(
+        'GET', '/graph/paths/longest?src=1&weight=uid'))
+    assert json.loads(body.decode()) == {'path': [1, 2, 3], 'length': 6}
+    status, _, body = run(client.request(
+        'GET', '/graph/paths/maxflow?src=1&dst=3'))
+    assert json.loads(body.decode())['value'] == 2
+    status, _, _ = run(client.request(
+        'GET', '/graph/paths/shortest?src=3&dst=1'))
+    assert status == 404
+
+
+def test_method_not_allowed(client):
+    status, headers, _ = run(client.request('DELETE', '/nodes'))
+    assert status == 405
+    assert 'GET' in headers['allow']
+
+
+def test_connection_close(client):
+    status, headers, _ = run(client.request(
+        'GET', '/nodes/1', headers={'Connection': 'close'}))
+    assert status == 200 and headers['connection'] == 'close'
+    status, _, _ = run(client.request('GET', '/nodes/1'))  # Reconnects
+    assert status == 200
@@ -0,0 +1,131 @@
+import json
+import os
+
+import pytest
+
+from atomic.darkmatter import fileapi, shards
+from atomic.errors import AtomicError
+from atomic.graph import store
+
+
+@pytest.fixture
+def path(tmpdir, monkeypatch):
+    # Graphs are saved as they change; not again at exit
+    monkeypatch.setattr(fileapi.atexit, 'register', lambda *args: None)
+    return str(tmpdir.join('graph.shards'))
+
+
+def manifest(path):
+    with open(os.path.join(path, shards.MANIFEST)) as f:
+        return json.load(f)
+
+
+def build(path):
+    """Two projects, a and b, linked across by a 'related' edge."""
+    api = fileapi.FileAPI(persist=path)
+    a = api.Node.create(name='a')
+    b = api.Node.create(name='b')
+    a1 = api.Node.create(a, name='a1')
+    b1 = api.Node.create(b, name='b1')
+    api.Node.create(a1, name='a2')
+    api.Edge.create(a1, b1)
+    # As at exit
+    api.Node.serial.release()
+    api.G.save()
+    return a, b, a1, b1
+
+
+def test_partition_toplevel(G):
+    owner = shards.partition(store.Graph.from_node_link(
+        {'nodes': [{'id': n} for n in (1, 2, 3)], 'links': []}))
+    assert owner == {1: '1', 2: '2', 3: '3'}
+    assert set(shards.partition(G).values()) == {'1'}
+
+
+def test_partition_community():
+    G = store.Graph()
+    for group in ((1, 2, 3, 4), (5, 6, 7, 8)):
+        for src in group:
+            for dst in group:
+                if src < dst:
+                    G.add_edge(src, dst, type='related')
+    G.add_edge(4, 5, type='related')
+    G.add_node(9)
+    owner = shards.partition(G, 'community')
+    assert owner == dict([(n, '1') for n in range(1, 5)] +
+                         [(n, '5') for n in range(5, 9)] + [(9, '9')])
+    with pytest.raises(ValueError):
+        shards.partition(G, 'random')
+
+
+def test_saves_by_project(path):
+    a, b, a1, b1 = build(path)
+    found = manifest(path)
+    assert found['next'] == 6
+    assert found['shards'] == {
+        '1': {'nodes': 3, 'ranges': [[1, 1], [3, 3], [5, 5]]},
+        '2': {'nodes': 2, 'ranges': [[2, 2], [4, 4]]}}
+    with open(os.path.join(path, shards.CROSS)) as f:
+        cross = json.load(f)
+    assert [edge[:3] for edge in cross] == [[a1, b1, 'related']]
+
+
+def test_loads_shards_touched(path):
+    a, b, a1, b1 = build(path)
+    api = fileapi.FileAPI(persist=path)
+    assert len(api.G) == 0
+    assert api.Node.get(b1)['name'] == 'b1'
+    assert sorted(api.G) == [b, b1]
+    assert api.G.shards() == {'1': False, '2': True}
+    # Saving writes only the loaded shard, and keeps the cross edge
+    api.Node.update(b1, name='B1')
+    assert api.Node.create(b, name='b2') == 6
+    assert api.G.shards() == {'1': False, '2': True}
+    assert api.Edge.get(a1, b1)['type'] == 'related'
+    assert api.G.shards() == {'1': True, '2': True}
+    fresh = fileapi.FileAPI(persist=path)
+    assert [n['uid'] for n, _ in fresh.Graph.hierarchy()] == \
+        [a, a1, 5, b, b1, 6]
+    assert fresh.G.node[b1]['name'] == 'B1'
+
+
+def test_follows_new_parents(path):
+    a, b, a1, b1 = build(path)
+    api = fileapi.FileAPI(persist=path)
+    api.Edge.delete(a, a1, 'parent')
+    api.Edge.create(b, a1, type='parent')
+    assert manifest(path)['shards'] == {
+        '1': {'nodes': 1, 'ranges': [[1, 1]]},
+        '2': {'nodes': 4, 'ranges': [[2, 5]]}}
+    api.Node.delete(a)
+    assert set(manifest(path)['shards']) == {'2'}
+    assert not os.path.exists(os.path.join(path, 'shard-1.json'))
+
+
+def test_delete_loads_linked(path):
+    a, b, a1, b1 = build(path)
+    api = fileapi.FileAPI(persist=path)
+    api.Node.delete(b1)
+    assert api.G.shards() == {'1': True, '2': True}
+    fresh = fileapi.FileAPI(persist=path)
+    fresh.touch()
+    assert fresh.G.number_of_edges() == 2
+    assert fresh.Edge.get(a1, b1) is None
+
+
+def test_algorithms_load_everything(path):
+    a, b, a1, b1 = build(path)
+    api = fileapi.FileAPI(persist=path)
+    assert api.Graph.algorithm('toplevel') == [a, b]
+    assert api.Graph.path('shortest', src=a, dst=b1) == [a, a1, b1]
+    assert api.history is None
+
+
+def test_write(path, G):
+    sharded = shards.write(G, path, by='toplevel')
+    assert sharded.shards() == {'1': True}
+    api = fileapi.FileAPI(persist=path)
+    assert sorted(n['uid'] for n, _ in api.Node.get()) == list(range(1, 9))
+    assert api.Node.create() == 9
+    with pytest.raises(AtomicError):
+        shards.write(G, path)
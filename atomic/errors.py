@@ -1,3 +1,18 @@
 class AtomicError(Exception):
     """Top-level error thrown by Atomic."""
     pass
+
+
+class NotFoundError(AtomicError):
+    """A requested node or edge doesn't exist."""
+    pass
+
+
+class PatchError(AtomicError):
+    """A patch is malformed, or can't be applied to a document."""
+    pass
+
+
+class ValidationError(AtomicError):
+    """An attribute doesn't conform to its node's schema."""
+    pass
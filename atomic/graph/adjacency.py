@@ -0,0 +1,94 @@
+"""
+adjacency
+=========
+Forward and reverse adjacency, kept separately for each edge type.
+
+A node's edges mix types; a project may have dozens of children, a few
+related items, and a chain of predecessors. Looking edges up by type means
+finding the children of a node, or its parents, touches only those edges,
+and so does a walk of the hierarchy.
+"""
+import bisect
+
+from atomic.graph import graph, index
+
+
+class TypeIndex(index.Index):
+    """Sorted neighbor lists per edge type, in both directions.
+
+    Edge types are given as :class:`~atomic.graph.graph.EdgeTypes` members,
+    or by name or value. Edges of any other type are indexed under it
+    as-is.
+    """
+
+    def __init__(self):
+        self.G = None
+        self._succ = {}  # type => uid => sorted successor uids
+        self._pred = {}  # type => uid => sorted predecessor uids
+
+    def children(self, uid, edge_type=graph.EdgeTypes.parent):
+        """Return the successors of a node along edges of a type, in uid
+        order."""
+        return list(self._succ.get(graph.as_type(edge_type), {}).get(uid, ()))
+
+    def parents(self, uid, edge_type=graph.EdgeTypes.parent):
+        """Return the predecessors of a node along edges of a type, in uid
+        order."""
+        return list(self._pred.get(graph.as_type(edge_type), {}).get(uid, ()))
+
+    def roots(self, edge_type=graph.EdgeTypes.parent):
+        """Yield nodes without predecessors along edges of a type, in uid
+        order."""
+        pred = self._pred.get(graph.as_type(edge_type), {})
+        for n in sorted(self.G):
+            if n not in pred:
+                yield n
+
+    def successors(self, edge_type=graph.EdgeTypes.parent):
+        """Return the successors of every node along edges of a type.
+
+        Returns:
+            dict: Node id to sorted successor ids, for nodes with any. It's
+                the index's own; don't modify it.
+        """
+        return self._succ.get(graph.as_type(edge_type), {})
+
+    def types(self):
+        """Return the edge types present."""
+        return [t for t, succ in self._succ.items() if succ]
+
+    # Index hooks
+
+    def rebuild(self, G):
+        self.G = G
+        self._succ, self._pred = {}, {}
+        super().rebuild(G)
+
+    def edge_added(self, src, dst, attrs):
+        edge_type = graph.type_of(attrs)
+        _insert(self._succ.setdefault(edge_type, {}), src, dst)
+        _insert(self._pred.setdefault(edge_type, {}), dst, src)
+
+    def edge_removed(self, src, dst, key):
+        edge_type = graph.as_type(key)
+        if _remove(self._succ.get(edge_type, {}), src, dst):
+            _remove(self._pred[edge_type], dst, src)
+
+
+def _insert(adj, n, m):
+    uids = adj.setdefault(n, [])
+    i = bisect.bisect_left(uids, m)
+    if i == len(uids) or uids[i] != m:
+        uids.insert(i, m)
+
+
+def _remove(adj, n, m):
+    """Remove ``m`` from ``n``'s neighbors; returns whether it was one."""
+    uids = adj.get(n, ())
+    i = bisect.bisect_left(uids, m)
+    if i == len(uids) or uids[i] != m:
+        return False
+    del uids[i]
+    if not uids:
+        del adj[n]
+    return True
@@ -0,0 +1,308 @@
+"""
+columnar
+========
+Columnar mirror of common node attributes, for vectorized aggregates.
+
+Questions like "total estimated hours of undone work by tag" are answered
+from NumPy arrays indexed by uid, rather than by walking every node's
+attribute dict. The store is an :class:`~atomic.graph.index.Index`, so API
+implementations keep it in sync with each mutation.
+
+Requires ``numpy``; install with ``pip install atomic[columnar]``.
+"""
+import math
+from datetime import datetime, timedelta
+
+import pytimeparse
+
+from atomic.errors import AtomicError
+from atomic.graph import index
+from atomic.utils import parse
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+#: Numeric columns and the function converting attribute values into them.
+#: Intervals are stored in seconds, and dates as POSIX timestamps.
+COLUMNS = ('priority', 'due', 'time_estd', 'time_spent')
+DONE_STATUSES = frozenset(('done', 'complete', 'completed'))
+FALSE_STRINGS = frozenset(('false', 'no', 'n', '0', 'f'))
+FUNCS = ('sum', 'mean', 'count', 'min', 'max')
+GROUPS = ('tag', 'done', 'priority')
+
+
+def _number(value):
+    if isinstance(value, bool) or value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _seconds(value):
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, str) and value.strip():
+        seconds = pytimeparse.parse(value)
+        if seconds is not None:
+            return float(seconds)
+    return _number(value)
+
+
+def _timestamp(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str) and value.strip():
+        try:
+            return parse.parse_datetime(value.strip()).timestamp()
+        except ValueError:
+            pass
+    return _number(value)
+
+
+CONVERTERS = {
+    'priority': _number,
+    'due': _timestamp,
+    'time_estd': _seconds,
+    'time_spent': _seconds,
+}
+
+
+def is_done(attrs):
+    """Whether a node's attributes mark it as done.
+
+    Either a truthy ``done`` attribute (a bare ``done=`` flag counts), or a
+    ``status`` of done, complete or completed.
+    """
+    done = attrs.get('done')
+    if isinstance(done, str):
+        if done.strip().lower() not in FALSE_STRINGS:
+            return True
+    elif done is not None and done is not False:
+        return bool(done)
+    return str(attrs.get('status', '')).lower() in DONE_STATUSES
+
+
+def tags_of(attrs):
+    """Return a node's tags: valueless keys, plus any ``tags`` list."""
+    tags = [k for k, v in attrs.items()
+            if (v is None or v == '') and k not in CONVERTERS and
+            k not in ('done', 'name')]
+    extra = attrs.get('tags')
+    if isinstance(extra, str):
+        extra = parse.parse_csv(extra)
+    if isinstance(extra, (list, tuple)):
+        tags.extend(t for t in extra if t not in tags)
+    return tags
+
+
+class ColumnStore(index.Index):
+    """NumPy arrays of node attributes, indexed by uid.
+
+    Attributes:
+        present (:class:`numpy.ndarray`): Whether a node exists at each uid.
+        done (:class:`numpy.ndarray`): Whether each node is done.
+        columns (dict): Column name to float array; missing values are NaN.
+    """
+
+    def __init__(self, capacity=1024):
+        if np is None:
+            raise AtomicError("The columnar store requires numpy")
+        self.present = np.zeros(capacity, dtype=bool)
+        self.done = np.zeros(capacity, dtype=bool)
+        self.columns = {name: np.full(capacity, np.nan) for name in COLUMNS}
+        self._tags = {}  # uid => tuple of tag ids
+        self._tag_ids = {}  # tag => id
+        self._tag_names = []
+        self._pairs = None  # Cached (uids, tag ids) arrays
+
+    def __len__(self):
+        return int(self.present.sum())
+
+    @property
+    def capacity(self):
+        return len(self.present)
+
+    def _reserve(self, uid):
+        """Grow the arrays, doubling, until ``uid`` fits."""
+        if uid < self.capacity:
+            return
+        size = self.capacity
+        while size <= uid:
+            size *= 2
+        grow = size - self.capacity
+        self.present = np.concatenate([self.present, np.zeros(grow, bool)])
+        self.done = np.concatenate([self.done, np.zeros(grow, bool)])
+        for name, col in self.columns.items():
+            self.columns[name] = np.concatenate([col, np.full(grow, np.nan)])
+
+    def _tag_id(self, tag):
+        try:
+            return self._tag_ids[tag]
+        except KeyError:
+            self._tag_names.append(tag)
+            tid = self._tag_ids[tag] = len(self._tag_names) - 1
+            return tid
+
+    # Index hooks
+
+    def rebuild(self, G):
+        self.__init__(max(1024, max(G.node, default=0) + 1))
+        for uid, attrs in G.node.items():
+            self.node_added(uid, attrs)
+
+    def node_added(self, uid, attrs):
+        self._reserve(uid)
+        self.present[uid] = True
+        self.done[uid] = is_done(attrs)
+        for name, convert in CONVERTERS.items():
+            self.columns[name][uid] = convert(attrs.get(name))
+        tags = tuple(self._tag_id(t) for t in tags_of(attrs))
+        if tags or uid in self._tags:
+            self._tags[uid] = tags
+            self._pairs = None
+
+    node_updated = node_added
+
+    def node_removed(self, uid):
+        if uid >= self.capacity:
+            return
+        self.present[uid] = False
+        self.done[uid] = False
+        for col in self.columns.values():
+            col[uid] = np.nan
+        if self._tags.pop(uid, None) is not None:
+            self._pairs = None
+
+    # Queries
+
+    def where(self, done=None, tag=None, uids=None):
+        """Build a boolean mask selecting nodes.
+
+        Args:
+            done (bool): Select only done, or only undone, nodes.
+            tag (str): Select nodes carrying this tag.
+            uids (iterable[int]): Restrict to these nodes.
+
+        Returns:
+            :class:`numpy.ndarray`: Boolean mask, indexed by uid.
+        """
+        mask = self.present.copy()
+        if done is not None:
+            mask &= self.done if done else ~self.done
+        if tag is not None:
+            tagged = np.zeros_like(mask)
+            tid = self._tag_ids.get(tag)
+            if tid is not None:
+                tagged[[u for u, t in self._tags.items() if tid in t]] = True
+            mask &= tagged
+        if uids is not None:
+            selected = np.zeros_like(mask)
+            selected[[u for u in uids if 0 <= u < self.capacity]] = True
+            mask &= selected
+        return mask
+
+    def uids(self, mask=None):
+        """Return the uids selected by ``mask``."""
+        return np.flatnonzero(self.present if mask is None else mask)
+
+    def column(self, name):
+        """Return a column's array, indexed by uid."""
+        try:
+            return self.columns[name]
+        except KeyError:
+            raise AtomicError("Unknown column '%s'; expected one of %s" %
+                              (name, ', '.join(COLUMNS))) from None
+
+    def _tag_pairs(self):
+        """Return parallel arrays of (uid, tag id), flattened from all tags."""
+        if self._pairs is None:
+            uids = np.fromiter(
+                (u for u, tags in self._tags.items() for _ in tags),
+                dtype=np.int64)
+            tids = np.fromiter(
+                (t for tags in self._tags.values() for t in tags),
+                dtype=np.int64)
+            self._pairs = uids, tids
+        return self._pairs
+
+    def aggregate(self, column=None, func='sum', by=None, where=None):
+        """Aggregate a column over the selected nodes.
+
+        Args:
+            column (str): Column name. Only ``count`` may omit it, counting
+                nodes rather than values.
+            func (str): One of sum, mean, count, min or max. Missing (NaN)
+                values are ignored.
+            by (str): Group by ``tag``, ``done`` or ``priority``. Nodes with
+                several tags count towards each.
+            where (:class:`numpy.ndarray`): Mask from :meth:`where`.
+
+        Returns:
+            float, or dict of group to float if ``by`` is given.
+        """
+        if func not in FUNCS:
+            raise AtomicError("Unknown function '%s'; expected one of %s" %
+                              (func, ', '.join(FUNCS)))
+        if column is None and func != 'count':
+            raise AtomicError("A column is required for '%s'" % func)
+        mask = self.present if where is None else where & self.present
+        if column is None:
+            values = np.where(mask, 0.0, np.nan)
+        else:
+            values = np.where(mask, self.column(column), np.nan)
+
+        if by is None:
+            return _reduce(values[mask], func)
+        if by == 'tag':
+            uids, codes = self._tag_pairs()
+            labels = self._tag_names
+            values = values[uids]
+        elif by == 'done':
+            codes = self.done.astype(np.int64)
+            labels = [False, True]
+        elif by == 'priority':
+            priority = self.columns['priority']
+            keep = mask & ~np.isnan(priority)
+            labels, codes = np.unique(priority[keep], return_inverse=True)
+            labels = labels.tolist()
+            values = values[keep]
+        else:
+            raise AtomicError("Unknown grouping '%s'; expected one of %s" %
+                              (by, ', '.join(GROUPS)))
+        return _grouped(values, codes, labels, func)
+
+
+def _reduce(values, func):
+    valid = values[~np.isnan(values)]
+    if func == 'count':
+        return float(len(valid))
+    if not len(valid):
+        return 0.0 if func == 'sum' else math.nan
+    return float(getattr(np, func)(valid))
+
+
+def _grouped(values, codes, labels, func):
+    """Vectorized group-by over integer codes, dropping NaN values."""
+    n = len(labels)
+    valid = ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+    counts = np.bincount(codes, minlength=n)
+    if func == 'count':
+        result = counts.astype(float)
+    elif func in ('sum', 'mean'):
+        result = np.bincount(codes, weights=values, minlength=n)
+        if func == 'mean':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result = result / counts
+    else:
+        fill = np.inf if func == 'min' else -np.inf
+        result = np.full(n, fill)
+        getattr(np, 'fmin' if func == 'min' else 'fmax').at(
+            result, codes, values)
+        result[counts == 0] = np.nan
+    return {labels[i]: float(result[i]) for i in range(n) if counts[i]}
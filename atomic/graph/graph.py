@@ -5,10 +5,8 @@ graph
 Operations on the in-memory graph representation.
 """
 import enum
-from io import StringIO
-from collections import deque
-
-import networkx as nx
+import functools
+from collections.abc import Mapping
 
 
 class EdgeTypes(enum.Enum):
@@ -22,43 +20,298 @@ def toplevel(G):
     return (n for n in G if not G.pred[n])
 
 
-def hierarchy(G, edge_type=EdgeTypes.parent):
-    """Produce child nodes in a depth-first order."""
-    for root in toplevel(G):
-        dq = deque()
-        yield G.node[root], len(dq)  # Depth 0
-        # Iterate over all children
-        dq.append(root)
-        for src, dest in nx.dfs_edges(G, source=root):
-            while len(dq) > 0 and dq[-1] != src:
-                dq.pop()  # Unwind the stack
-            if G.edge[src][dest].get('type') == edge_type:
-                yield G.node[dest], len(dq)
-            dq.append(dest)
+#: Edge types by name and by value.
+_TYPES = dict([(t.name, t) for t in EdgeTypes] +
+              [(t.value, t) for t in EdgeTypes])
 
 
-class Node:
-    """Nodes are the fundamental Graph primitive."""
+def as_type(edge_type):
+    """Return the :class:`EdgeTypes` member named by ``edge_type``, or with
+    it as its value. Anything else is returned as-is."""
+    if isinstance(edge_type, EdgeTypes):
+        return edge_type
+    return _TYPES.get(edge_type, edge_type)
+
+
+def type_of(attrs):
+    """Return an edge's type, as :func:`as_type` does."""
+    value = attrs.get('type')
+    return _TYPES.get(value, value)
+
+
+def is_type(attrs, edge_type):
+    """Whether an edge's attributes have the type; by name or value."""
+    return type_of(attrs) == as_type(edge_type)
+
+
+def key_of(edge_type):
+    """Return the key edges of a type are stored under, between a pair of
+    nodes: the name of an :class:`EdgeTypes` member, or else the type as
+    given."""
+    edge_type = as_type(edge_type)
+    return edge_type.name if isinstance(edge_type, EdgeTypes) else edge_type
+
+
+def children(G, n, edge_type=EdgeTypes.parent):
+    """Return the ids of a node's children, in creation (uid) order."""
+    key = key_of(edge_type)
+    return sorted(dst for dst, edges in G.succ[n].items() if key in edges)
+
+
+def parents(G, n, edge_type=EdgeTypes.parent):
+    """Return the ids of a node's parents, in uid order."""
+    key = key_of(edge_type)
+    return sorted(src for src, edges in G.pred[n].items() if key in edges)
+
+
+def roots(G, edge_type=EdgeTypes.parent):
+    """Yield nodes without a parent, in uid order."""
+    key = key_of(edge_type)
+    for n in sorted(G):
+        if not any(key in edges for edges in G.pred[n].values()):
+            yield n
+
+
+def descendants(G, n, edge_type=EdgeTypes.parent):
+    """Return the ids of the nodes below a node, in uid order."""
+    found, todo = set(), [n]
+    while todo:
+        for m in children(G, todo.pop(), edge_type):
+            if m not in found:
+                found.add(m)
+                todo.append(m)
+    found.discard(n)  # Even if it's within a cycle
+    return sorted(found)
+
+
+def neighborhood(G, n, hops=1, edge_types=None, direction='both'):
+    """Return the nodes within a number of edges of a node, breadth-first.
+
+    Args:
+        G: The graph.
+        n (int): Node to start from.
+        hops (int): Most edges to follow.
+        edge_types (iterable): Edge types to follow, by name or value; any
+            if None.
+        direction (str): 'out' to follow edges from each node, 'in' to follow
+            edges into it, or 'both'.
+
+    Returns:
+        dict: Node id to the fewest edges between it and ``n``; 0 for ``n``.
+
+    Raises:
+        ValueError: If ``direction`` isn't one of the above.
+    """
+    if direction not in ('out', 'in', 'both'):
+        raise ValueError("Unknown direction '%s'" % direction)
+    adj = [a for d, a in (('out', G.succ), ('in', G.pred))
+           if direction in (d, 'both')]
+    keys = None if edge_types is None else {key_of(t) for t in edge_types}
+    found, frontier = {n: 0}, [n]
+    for distance in range(1, hops + 1):
+        reached = []
+        for m in frontier:
+            for a in adj:
+                for other, edges in a[m].items():
+                    if other in found or not (
+                            keys is None or any(k in edges for k in keys)):
+                        continue
+                    found[other] = distance
+                    reached.append(other)
+        frontier = reached
+    return found
+
+
+def project(attrs, fields=None):
+    """Restrict a node's attributes to ``fields``; the uid is always kept.
+
+    Only the requested values are copied, so large attributes, like a body,
+    are left alone. If ``fields`` is None, ``attrs`` is returned as-is.
+    """
+    if fields is None or attrs is None:
+        return attrs
+    return {k: attrs[k] for k in ('uid', *fields) if k in attrs}
+
+
+def hierarchy(G, edge_type=EdgeTypes.parent, adjacency=None):
+    """Produce (node, depth) pairs depth-first, following edges of one type
+    down from each node without an edge of that type into it.
+
+    Args:
+        G: The graph.
+        edge_type (:class:`EdgeTypes` or str): By name or value.
+        adjacency (:class:`~atomic.graph.adjacency.TypeIndex`): The graph's
+            edges by type, so only matching edges are visited. Without it,
+            each node's edges are all checked.
+    """
+    if adjacency is None:
+        tops = roots(G, edge_type)
+        below = functools.partial(children, G, edge_type=edge_type)
+    else:
+        tops = adjacency.roots(edge_type)
+        succ = adjacency.successors(edge_type)
+
+        def below(n):
+            return succ.get(n, ())
+    for root in tops:
+        yield G.node[root], 0
+        visited = {root}
+        stack = [iter(below(root))]  # One iterator of children per level
+        while stack:
+            for dest in stack[-1]:
+                if dest not in visited:
+                    break
+            else:
+                stack.pop()  # Level exhausted
+                continue
+            visited.add(dest)
+            yield G.node[dest], len(stack)
+            stack.append(iter(below(dest)))
 
-    def __init__(self, uid: int, *args, **kwargs):
-        self.uid = uid
-        for k, v in kwargs.items():
-            setattr(self, k, v)
+
+def format_node(attrs):
+    """Format a node's attributes for display, without building a Node.
+
+    The uid and name form a header line; other attributes follow, indented.
+    """
+    lines = ["[{}] {}".format(attrs.get("uid"),
+                              attrs.get("name", "<No Name>"))]
+    lines.extend("{indent}{key}: {value}".format(indent=2*" ", key=k, value=v)
+                 for k, v in attrs.items() if k not in ("uid", "name"))
+    return "\n".join(lines)
+
+
+class _Shape:
+    """An ordered set of attribute names, shared between instances.
+
+    Instances with the same extra attributes, set in the same order, point at
+    the same shape, so attribute names are stored once instead of per-instance
+    (a "hidden class").
+    """
+    __slots__ = ('keys', 'index', '_transitions')
+
+    def __init__(self, keys=()):
+        self.keys = keys
+        self.index = {k: i for i, k in enumerate(keys)}
+        self._transitions = {}
+
+    def add(self, key):
+        """Return the shape with ``key`` appended."""
+        try:
+            return self._transitions[key]
+        except KeyError:
+            shape = self._transitions[key] = _Shape(self.keys + (key,))
+            return shape
+
+    def remove(self, key):
+        """Return the shape without ``key``, built by replaying additions."""
+        shape = _EMPTY_SHAPE
+        for k in self.keys:
+            if k != key:
+                shape = shape.add(k)
+        return shape
+
+
+_EMPTY_SHAPE = _Shape()
+
+
+class _Compact:
+    """Slotted attribute storage with a shared-key overflow.
+
+    Subclasses declare their core fields in ``__slots__``; any other attribute
+    is stored positionally in the ``_values`` tuple, keyed by the shared
+    ``_shape``. Tuples are sized exactly, and attributes are rarely added
+    after construction, so rebuilding on change is cheap.
+    """
+    __slots__ = ('_shape', '_values')
+
+    def __init__(self, **kwargs):
+        object.__setattr__(self, '_shape', _EMPTY_SHAPE)
+        object.__setattr__(self, '_values', ())
+        shape, values = _EMPTY_SHAPE, []
+        for name, value in kwargs.items():
+            try:
+                object.__setattr__(self, name, value)
+            except AttributeError:  # Not a slot
+                shape = shape.add(name)
+                values.append(value)
+        object.__setattr__(self, '_shape', shape)
+        object.__setattr__(self, '_values', tuple(values))
+
+    def __getattr__(self, name):
+        # Only invoked when the attribute isn't a populated slot
+        try:
+            shape, values = self._shape, self._values
+        except AttributeError:
+            raise AttributeError(name) from None
+        try:
+            return values[shape.index[name]]
+        except KeyError:
+            raise AttributeError(
+                "%r object has no attribute %r" % (type(self).__name__, name)
+            ) from None
+
+    def __setattr__(self, name, value):
+        try:
+            object.__setattr__(self, name, value)
+        except AttributeError:  # Not a slot; store in the overflow
+            values = self._values
+            i = self._shape.index.get(name)
+            if i is not None:
+                values = values[:i] + (value,) + values[i + 1:]
+            else:
+                object.__setattr__(self, '_shape', self._shape.add(name))
+                values += (value,)
+            object.__setattr__(self, '_values', values)
+
+    def __delattr__(self, name):
+        try:
+            object.__delattr__(self, name)
+        except AttributeError:
+            i = self._shape.index.get(name)
+            if i is None:
+                raise
+            object.__setattr__(self, '_values',
+                               self._values[:i] + self._values[i + 1:])
+            object.__setattr__(self, '_shape', self._shape.remove(name))
+
+    @classmethod
+    def _slot_names(cls):
+        for klass in reversed(cls.__mro__):
+            for name in getattr(klass, '__slots__', ()):
+                if not name.startswith('_'):
+                    yield name
+
+    def items(self):
+        """Yield (name, value) pairs for every attribute that's set."""
+        for name in self._slot_names():
+            try:
+                yield name, object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        yield from zip(self._shape.keys, self._values)
 
     def to_json(self):
-        return self.__dict__
+        return dict(self.items())
+
+
+class Node(_Compact):
+    """Nodes are the fundamental Graph primitive.
+
+    Only the uid is required. Subclasses declare well-known attributes in
+    ``__slots__``; anything else is stored in a compact, shared-key overflow.
+    """
+    __slots__ = ('uid',)
+
+    def __init__(self, uid: int, *args, **kwargs):
+        if isinstance(uid, Mapping):  # Node({'uid': 1, ...})
+            kwargs = dict(uid, **kwargs)
+            uid = kwargs.pop("uid")
+        super().__init__(**kwargs)
+        self.uid = uid
 
     def __str__(self) -> str:
-        sio = StringIO()
-        header = "[{:d}] {:s}".format(
-            self.uid, getattr(self, "name", "<No Name>"))
-        sio.write("{}\n".format(header))
-        for k, v in self.__dict__.items():
-            if k == "name":
-                continue
-            sio.write("{indent}{key}: {value}\n".format(indent=2*" ", key=k,
-                                                        value=v))
-        return sio.getvalue().rstrip("\n")
+        return format_node(self.to_json())
 
     def __repr__(self) -> str:
         return "{:d}) {:s}".format(self.uid,
@@ -86,14 +339,19 @@ class Node:
         raise NotImplemented
 
 
-class Edge:
+class Edge(_Compact):
+    __slots__ = ('src', 'dst', '_type')
 
     def __init__(self, src, dst, _type, **kwargs):
+        super().__init__(**kwargs)
         self.src = src
         self.dst = dst
         self._type = _type
-        for k, v in kwargs.items():
-            setattr(self, k, v)
+
+    def to_json(self):
+        data = dict(self.items())
+        data['type'] = self._type
+        return data
 
     @classmethod
     def from_json(cls, json_object):
@@ -102,6 +360,7 @@ class Edge:
 
 class Thought(Node):
     """Thoughts are recorded non-actionable ideas."""
+    __slots__ = ('name', 'body')
 
     def __init__(self, *args, name=None, body=None, **kwargs):
         super().__init__(*args, **kwargs)
@@ -114,6 +373,7 @@ class Thought(Node):
 
 class Action(Thought):
     """Actions are thoughts coupled with real-world events; your class Todo."""
+    __slots__ = ('time_estd', 'time_spent', 'done')
 
     def __init__(self,
                  *args,
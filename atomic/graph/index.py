@@ -0,0 +1,47 @@
+"""
+index
+=====
+Secondary structures kept in sync with the graph.
+
+API implementations notify every registered :class:`Index` after each
+successful mutation, so derived data never has to be recomputed by walking
+the whole graph.
+"""
+
+
+class Index:
+    """Base class for structures maintained alongside the graph.
+
+    Subclasses override the hooks they care about; the rest are no-ops.
+    Edges are told apart by their nodes and key, which is the edge's type.
+    When a node is deleted, its edges are reported removed first.
+    """
+
+    def rebuild(self, G):
+        """Discard any state and rebuild from the graph."""
+        for uid, attrs in G.node.items():
+            self.node_added(uid, attrs)
+        for src, dst, attrs in G.edges_iter(data=True):
+            self.edge_added(src, dst, attrs)
+
+    def node_added(self, uid, attrs):
+        pass
+
+    def node_updated(self, uid, attrs):
+        pass
+
+    def node_removed(self, uid):
+        pass
+
+    def edge_added(self, src, dst, attrs):
+        pass
+
+    def edge_updated(self, src, dst, attrs):
+        pass
+
+    def edge_removed(self, src, dst, key):
+        pass
+
+    def saved(self):
+        """Called once the graph is saved, after a change or a batch of
+        them."""
@@ -0,0 +1,287 @@
+"""
+intervals
+=========
+Interval labels over the ``parent`` hierarchy, for constant-time ancestry
+checks.
+
+Each node is labeled with a (start, end) pair, numbered as a depth-first
+walk enters and leaves it, so a node's interval nests within its parent's.
+One node is below another exactly when its start falls within the other's
+interval, and a node's descendants are the nodes whose starts do: a range of
+the sorted labels.
+
+Labels are spaced apart, so a new node usually fits between its neighbors'
+without disturbing them. When a parent's interval fills up, the nearest
+enclosing subtree with room to spare is relabeled; a root without room is
+relabeled past every other.
+
+Labels describe a forest. A node with several parents is placed under the
+first one linked, and its other parent edges, like those closing a cycle,
+are kept aside; queries follow them explicitly, when there are any.
+"""
+import bisect
+
+from atomic.graph import graph, index
+
+
+#: Spacing between labels when nodes are appended at the top level.
+GAP = 1 << 16
+#: Sparsest spacing a subtree may be relabeled with; any closer, and its
+#: parent is relabeled instead.
+MIN_GAP = 16
+
+_PARENT = graph.EdgeTypes.parent
+
+
+class IntervalIndex(index.Index):
+    """Nested interval labels for the forest of ``parent`` edges."""
+
+    def __init__(self):
+        self._start = {}  # uid => start label
+        self._end = {}  # uid => end label
+        self._at = {}  # start label => uid
+        self._starts = []  # Sorted start labels
+        self._ends = []  # Sorted end labels
+        self._up = {}  # uid => parent in the forest
+        self._kids = {}  # uid => sorted children in the forest
+        self._extra = {}  # uid => parents outside the forest
+        self._across = {}  # uid => children outside the forest
+
+    def is_ancestor(self, uid, other):
+        """Whether ``other`` is below ``uid``, along parent edges. A node
+        isn't its own ancestor, even within a cycle.
+
+        Raises:
+            KeyError: If either node doesn't exist.
+        """
+        if self._within(uid, other):
+            return True
+        if not self._extra or uid == other:
+            return False
+        # Climb through the edges outside the forest above ``other``
+        todo, seen = [other], {other}
+        while todo:
+            n = todo.pop()
+            for dst, srcs in self._extra.items():
+                if dst != n and not self._within(dst, n):
+                    continue
+                for src in srcs:
+                    if src == uid or self._within(uid, src):
+                        return True
+                    if src not in seen:
+                        seen.add(src)
+                        todo.append(src)
+        return False
+
+    def descendants(self, uid):
+        """Return the ids of the nodes below a node, along parent edges.
+
+        Nodes are in label order, which is depth-first, though not
+        necessarily by uid.
+
+        Raises:
+            KeyError: If the node doesn't exist.
+        """
+        found = self._range(uid)
+        if not self._across:
+            return found
+        seen = set(found)
+        seen.add(uid)
+        todo = [uid] + found
+        while todo:
+            for dst in self._across.get(todo.pop(), ()):
+                if dst in seen:
+                    continue
+                new = [n for n in [dst] + self._range(dst) if n not in seen]
+                seen.update(new)
+                found.extend(new)
+                todo.extend(new)
+        return found
+
+    def __len__(self):
+        return len(self._start)
+
+    def _within(self, uid, other):
+        start = self._start[uid]
+        return start < self._start[other] < self._end[uid]
+
+    def _range(self, uid):
+        """Return the ids of the nodes below a node within the forest."""
+        i = bisect.bisect_right(self._starts, self._start[uid])
+        j = bisect.bisect_left(self._starts, self._end[uid])
+        return [self._at[label] for label in self._starts[i:j]]
+
+    # Index hooks
+
+    def rebuild(self, G):
+        """Label the graph, placing each node under the first parent
+        reached depth-first from the top-level nodes, in uid order."""
+        self.__init__()
+        below = {}
+        for src, dst, attrs in G.edges_iter(data=True):
+            if graph.type_of(attrs) == _PARENT:
+                below.setdefault(src, []).append(dst)
+        above = {dst for dsts in below.values() for dst in dsts}
+        # Nodes only reachable through a cycle become roots last
+        order = [n for n in sorted(G) if n not in above] + sorted(above)
+        roots, seen = [], set()
+        for root in order:
+            if root in seen:
+                continue
+            seen.add(root)
+            roots.append(root)
+            todo = [root]
+            while todo:
+                src = todo.pop()
+                for dst in sorted(below.get(src, ())):
+                    if dst in seen:
+                        self._link_across(src, dst)
+                    else:
+                        seen.add(dst)
+                        self._up[dst] = src
+                        self._kids.setdefault(src, []).append(dst)
+                        todo.append(dst)
+        self._layout(roots, 0, GAP)
+
+    def node_added(self, uid, attrs):
+        self._layout([uid], self._top(), GAP)
+
+    def node_removed(self, uid):
+        # Its edges have been removed already
+        self._unlabel(uid)
+        self._kids.pop(uid, None)
+
+    def edge_added(self, src, dst, attrs):
+        if graph.type_of(attrs) != _PARENT or self._up.get(dst) == src:
+            return
+        if dst in self._up or dst == src or self._within(dst, src):
+            self._link_across(src, dst)
+        else:
+            self._unlabel(dst)
+            self._adopt(src, dst)
+
+    def edge_removed(self, src, dst, key):
+        if graph.as_type(key) != _PARENT:
+            return
+        if self._up.get(dst) != src:
+            self._unlink_across(src, dst)
+            return
+        del self._up[dst]
+        kids = self._kids[src]
+        kids.remove(dst)
+        if not kids:
+            del self._kids[src]
+        # Another parent, not itself below the node, takes it in
+        for parent in sorted(self._extra.get(dst, ())):
+            if parent != dst and not self._within(dst, parent):
+                self._unlink_across(parent, dst)
+                self._unlabel(dst)
+                self._adopt(parent, dst)
+                return
+        self._unlabel(dst)
+        self._layout([dst], self._top(), GAP)
+
+    # Maintenance
+
+    def _link_across(self, src, dst):
+        self._extra.setdefault(dst, set()).add(src)
+        self._across.setdefault(src, set()).add(dst)
+
+    def _unlink_across(self, src, dst):
+        for adj, n, m in ((self._extra, dst, src), (self._across, src, dst)):
+            linked = adj.get(n, ())
+            if m in linked:
+                linked.discard(m)
+                if not linked:
+                    del adj[n]
+
+    def _top(self):
+        return self._ends[-1] if self._ends else 0
+
+    def _size(self, uid):
+        count, todo = 0, [uid]
+        while todo:
+            count += 1
+            todo.extend(self._kids.get(todo.pop(), ()))
+        return count
+
+    def _adopt(self, parent, uid):
+        """Place an unlabeled subtree last under a parent."""
+        self._up[uid] = parent
+        bisect.insort(self._kids.setdefault(parent, []), uid)
+        start, end = self._start[parent], self._end[parent]
+        i = bisect.bisect_left(self._ends, end)
+        lo = max(start, self._ends[i - 1]) if i else start
+        size = self._size(uid)
+        # Use up to half the room left, keeping the rest for later siblings
+        step = (end - lo) // (2 * (2 * size + 1))
+        if step:
+            self._layout([uid], lo, step)
+        else:
+            self._spread(parent, size)
+
+    def _spread(self, uid, unlabeled):
+        """Relabel the nearest subtree, from ``uid`` up, whose interval
+        fits its nodes, ``unlabeled`` more than now have labels, at least
+        :data:`MIN_GAP` apart."""
+        while True:
+            start, end = self._start[uid], self._end[uid]
+            count = unlabeled + (bisect.bisect_left(self._starts, end) -
+                                 bisect.bisect_right(self._starts, start))
+            step = (end - start) // (2 * count + 1)
+            if step >= MIN_GAP:
+                break
+            if uid not in self._up:  # Out of room at the top level
+                self._unlabel(uid)
+                self._layout([uid], self._top(), GAP)
+                return
+            uid = self._up[uid]
+        self._clear(start + 1, end - 1)
+        self._layout(self._kids[uid], start, step)
+
+    def _layout(self, roots, lo, step):
+        """Label unlabeled subtrees depth-first, ``step`` apart from
+        ``lo`` on, where no labels are yet."""
+        starts, ends, label = [], [], lo
+        for root in roots:
+            label += step
+            self._start[root] = label
+            self._at[label] = root
+            starts.append(label)
+            stack = [(root, iter(self._kids.get(root, ())))]
+            while stack:
+                n, kids = stack[-1]
+                for kid in kids:
+                    label += step
+                    self._start[kid] = label
+                    self._at[label] = kid
+                    starts.append(label)
+                    stack.append((kid, iter(self._kids.get(kid, ()))))
+                    break
+                else:
+                    stack.pop()
+                    label += step
+                    self._end[n] = label
+                    ends.append(label)
+        if starts:
+            i = bisect.bisect_left(self._starts, starts[0])
+            self._starts[i:i] = starts
+            i = bisect.bisect_left(self._ends, ends[0])
+            self._ends[i:i] = ends
+
+    def _unlabel(self, uid):
+        """Drop the labels of a node and those below it in the forest."""
+        self._clear(self._start[uid], self._end[uid])
+
+    def _clear(self, lo, hi):
+        """Drop the labels from ``lo`` to ``hi``, inclusive, and the nodes
+        they start."""
+        i = bisect.bisect_left(self._starts, lo)
+        j = bisect.bisect_right(self._starts, hi)
+        for label in self._starts[i:j]:
+            n = self._at.pop(label)
+            del self._start[n], self._end[n]
+        del self._starts[i:j]
+        i = bisect.bisect_left(self._ends, lo)
+        j = bisect.bisect_right(self._ends, hi)
+        del self._ends[i:j]
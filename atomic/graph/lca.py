@@ -0,0 +1,225 @@
+"""
+lca
+===
+Lowest common ancestors in the ``parent`` hierarchy, in constant time.
+
+A depth-first walk of the hierarchy, recording each node as it's entered
+and again as the walk returns to it, is its Euler tour. Between the first
+visits of any two nodes, the shallowest node the tour passes through is
+their lowest common ancestor, so a query is a range minimum. A sparse table
+of the minimum of every power-of-two span of the tour answers any range with
+two overlapping spans.
+
+The tour describes a forest; a node with several parents is placed under
+the first one reached.
+
+Leaves are added, removed and moved without touching the tour: they're kept
+beside it, each pointing at its parent, until they and the nodes removed
+outnumber the square root of the tour's nodes. A query walks up from such a
+node to the first one in the tour, then asks the table. Other changes to the
+hierarchy, like removing a node with children, or giving a node a second
+parent, mark the tour stale instead, and it's rebuilt on the next query, so
+a batch of them costs a single rebuild.
+"""
+from atomic.graph import graph, index
+
+
+# Tour entries pack a node's depth above its uid, so the smallest entry in a
+# range is the shallowest node
+_SHIFT = 64
+_MASK = (1 << _SHIFT) - 1
+
+_PARENT = graph.EdgeTypes.parent
+#: Fewest leaves kept beside the tour before it's rebuilt.
+LEAVES = 64
+
+
+class LCAIndex(index.Index):
+    """Euler tour and sparse table of the parent forest, and the leaves
+    changed since it was built."""
+
+    def __init__(self):
+        self.G = None
+        self._stale = True
+        self._first = {}  # uid => position of its first visit in the tour
+        self._tree = {}  # uid => root of its tree
+        self._table = []  # k => minimum of each 2**k entries of the tour
+        self._leaves = {}  # uid => parent, or None; overrides the tour
+        self._gone = set()  # Removed nodes left in the tour
+        self._limit = 0  # Most leaves and removed nodes kept beside it
+
+    def lca(self, *uids):
+        """Return the lowest node that every given node is, or is below.
+
+        Returns:
+            int: The common ancestor, or None if the nodes are in separate
+                trees.
+
+        Raises:
+            KeyError: If a node doesn't exist.
+            ValueError: If no nodes are given.
+        """
+        if not uids:
+            raise ValueError("At least one node is required")
+        self._refresh()
+        if self._leaves or self._gone:
+            found = uids[0]
+            for uid in uids[1:]:
+                found = self._pair(found, uid)
+                if found is None:
+                    return None
+            self._up(found)  # Raises KeyError, like the tour
+            return found
+        if len({self._tree[uid] for uid in uids}) > 1:
+            return None
+        firsts = [self._first[uid] for uid in uids]
+        return self._min(min(firsts), max(firsts)) & _MASK
+
+    def depth(self, uid):
+        """Return a node's distance from the root of its tree."""
+        self._refresh()
+        chain, top = self._up(uid)
+        if top is None:
+            return len(chain) - 1
+        return len(chain) + (self._table[0][self._first[top]] >> _SHIFT)
+
+    def _min(self, lo, hi):
+        """Return the smallest tour entry from ``lo`` to ``hi``,
+        inclusive."""
+        k = (hi - lo + 1).bit_length() - 1
+        level = self._table[k]
+        return min(level[lo], level[hi - (1 << k) + 1])
+
+    def _up(self, uid):
+        """Walk up from a node through the leaves kept beside the tour.
+
+        Returns:
+            (list[int], int): The leaves passed, from ``uid`` up, and the
+                first node in the tour; None if the walk ends at a root
+                outside it.
+
+        Raises:
+            KeyError: If a node doesn't exist.
+        """
+        chain = []
+        while uid in self._leaves:
+            chain.append(uid)
+            uid = self._leaves[uid]
+            if uid is None:
+                return chain, None
+        if uid in self._gone or uid not in self._first:
+            raise KeyError(uid)
+        return chain, uid
+
+    def _pair(self, a, b):
+        """Return the lowest common ancestor of two nodes, or None."""
+        chain_a, top_a = self._up(a)
+        chain_b, top_b = self._up(b)
+        below = set(chain_a)
+        for uid in chain_b:
+            if uid in below:
+                return uid
+        if top_a is None or top_b is None or \
+                self._tree[top_a] != self._tree[top_b]:
+            return None
+        lo, hi = sorted((self._first[top_a], self._first[top_b]))
+        return self._min(lo, hi) & _MASK
+
+    # Index hooks
+
+    def rebuild(self, G):
+        self.G = G
+        self._stale = True
+
+    def node_added(self, uid, attrs):
+        if not self._stale:
+            self._gone.discard(uid)
+            self._move(uid, None)
+
+    def node_removed(self, uid):
+        # Its edges were reported removed first
+        if not self._stale:
+            self._leaves.pop(uid, None)
+            self._gone.add(uid)
+            self._check()
+
+    def edge_added(self, src, dst, attrs):
+        if self._stale or graph.type_of(attrs) != _PARENT:
+            return
+        try:
+            above = self._up(src)[0]
+        except KeyError:
+            above = [dst]
+        # Only a leaf without another parent moves under src
+        if dst in above or graph.parents(self.G, dst) != [src] or \
+                not self._is_leaf(dst):
+            self._stale = True
+        else:
+            self._move(dst, src)
+
+    def edge_removed(self, src, dst, key):
+        if self._stale or graph.as_type(key) != _PARENT:
+            return
+        # The edge may still be in the graph
+        if any(p != src for p in graph.parents(self.G, dst)) or \
+                not self._is_leaf(dst):
+            self._stale = True
+        else:
+            self._move(dst, None)
+
+    # Maintenance
+
+    def _is_leaf(self, uid):
+        """Whether none of a node's children are in the tour."""
+        return all(kid in self._leaves for kid in graph.children(self.G, uid))
+
+    def _move(self, uid, parent):
+        self._leaves[uid] = parent
+        self._check()
+
+    def _check(self):
+        if len(self._leaves) + len(self._gone) > self._limit:
+            self._stale = True
+
+    def _refresh(self):
+        if not self._stale:
+            return
+        below = {}
+        for src, dst, attrs in self.G.edges_iter(data=True):
+            if graph.type_of(attrs) == _PARENT:
+                below.setdefault(src, []).append(dst)
+        above = set()
+        for dsts in below.values():
+            dsts.sort()
+            above.update(dsts)
+        # Nodes only reachable through a cycle become roots last
+        order = [n for n in sorted(self.G) if n not in above] + sorted(above)
+        first, tree, tour = {}, {}, []
+        for root in order:
+            if root in first:
+                continue
+            first[root], tree[root] = len(tour), root
+            tour.append(root)
+            stack = [(root, 0, iter(below.get(root, ())))]
+            while stack:
+                _, depth, kids = stack[-1]
+                for kid in kids:
+                    if kid not in first:
+                        break
+                else:
+                    stack.pop()
+                    if stack:  # Back up to the parent
+                        tour.append(stack[-1][1] << _SHIFT | stack[-1][0])
+                    continue
+                first[kid], tree[kid] = len(tour), root
+                tour.append((depth + 1) << _SHIFT | kid)
+                stack.append((kid, depth + 1, iter(below.get(kid, ()))))
+        table, span = [tour], 1
+        while 2 * span <= len(tour):
+            level = table[-1]
+            table.append(list(map(min, level, level[span:])))
+            span *= 2
+        self._first, self._tree, self._table = first, tree, table
+        self._leaves, self._gone = {}, set()
+        self._limit = max(LEAVES, int(len(first) ** 0.5))
+        self._stale = False
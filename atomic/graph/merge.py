@@ -0,0 +1,202 @@
+"""
+merge
+=====
+Diff and three-way merge of graph snapshots, as when one graph file is
+edited on several machines.
+
+Every node and edge is keyed by its uid, or its (src, dst, key) triple, and
+compared by a hash of its attributes, so both operations take time linear
+in the size of the graphs. Only items whose hashes differ are looked at
+more closely.
+"""
+import hashlib
+import json
+from collections import namedtuple
+
+import networkx as nx
+
+from atomic.graph import patch, schema, store
+
+
+_MISSING = object()
+
+Diff = namedtuple('Diff', ['added', 'removed', 'changed'])
+Diff.__doc__ = """Keys present only in the new snapshot, only in the old, and
+in both with different attributes; each sorted."""
+
+Conflict = namedtuple('Conflict', ['kind', 'key', 'field', 'ours', 'theirs'])
+Conflict.__doc__ = """A change made differently on each side.
+
+``kind`` is 'node' or 'edge', and ``key`` its uid, or (src, dst, key).
+``field``
+is the attribute both sides changed, or None if one side deleted the item
+the other changed. Our side is kept."""
+
+
+def fingerprint(attrs):
+    """Hash a node's or edge's attributes, regardless of key order."""
+    data = json.dumps(attrs, sort_keys=True, default=schema.encode)
+    return hashlib.sha1(data.encode('utf-8')).digest()
+
+
+def fingerprints(G):
+    """Hash every node and edge.
+
+    Returns:
+        (dict, dict): uid to hash, and (src, dst, key) to hash.
+    """
+    nodes = {n: fingerprint(attrs) for n, attrs in G.node.items()}
+    edges = {(src, dst, key): fingerprint(attrs)
+             for src, dst, key, attrs in G.edges_iter(data=True, keys=True)}
+    return nodes, edges
+
+
+def _diff(old, new):
+    added = sorted(k for k in new if k not in old)
+    removed = sorted(k for k in old if k not in new)
+    changed = sorted(k for k, h in new.items() if k in old and old[k] != h)
+    return Diff(added, removed, changed)
+
+
+def diff(old, new):
+    """Compare two snapshots of a graph.
+
+    Args:
+        old (:class:`networkx.MultiDiGraph`): Earlier snapshot.
+        new (:class:`networkx.MultiDiGraph`): Later snapshot.
+
+    Returns:
+        (:class:`Diff`, :class:`Diff`): Node and edge differences.
+    """
+    old_nodes, old_edges = fingerprints(old)
+    new_nodes, new_edges = fingerprints(new)
+    return _diff(old_nodes, new_nodes), _diff(old_edges, new_edges)
+
+
+def changes(old, new, key, kind='node'):
+    """Describe how one node, or edge, changed as RFC 6902 operations."""
+    if kind == 'node':
+        return patch.diff(old.node[key], new.node[key])
+    src, dst, k = key
+    return patch.diff(old.edge[src][dst][k], new.edge[src][dst][k])
+
+
+def _merge_attrs(base, ours, theirs, kind, key, conflicts):
+    """Merge attributes key by key; where both sides changed one, keep ours."""
+    merged = {}
+    fields = list(ours)
+    fields.extend(f for f in theirs if f not in ours)
+    fields.extend(f for f in base if f not in ours and f not in theirs)
+    for field in fields:
+        b = base.get(field, _MISSING)
+        o = ours.get(field, _MISSING)
+        t = theirs.get(field, _MISSING)
+        if o == t or t == b:
+            value = o
+        elif o == b:
+            value = t
+        else:
+            value = o
+            conflicts.append(Conflict(
+                kind, key, field,
+                None if o is _MISSING else o, None if t is _MISSING else t))
+        if value is not _MISSING:
+            merged[field] = value
+    return merged
+
+
+def _merge_items(base, ours, theirs, hashes, kind, conflicts):
+    """Three-way merge of uid-keyed attribute dicts.
+
+    Args:
+        base, ours, theirs (dict): Key to attributes, for each snapshot.
+        hashes (tuple[dict]): Key to fingerprint, for each snapshot.
+    """
+    hb, ho, ht = hashes
+    merged = {}
+    keys = list(ours)
+    keys.extend(k for k in theirs if k not in ours)
+    for key in keys:
+        b, o, t = hb.get(key), ho.get(key), ht.get(key)
+        if o == t or t == b:  # Unchanged by them
+            if o is not None:
+                merged[key] = ours[key]
+        elif o == b:  # Unchanged by us
+            if t is not None:
+                merged[key] = theirs[key]
+        elif o is None or t is None:  # Deleted by one, changed by the other
+            conflicts.append(Conflict(kind, key, None, ours.get(key),
+                                      theirs.get(key)))
+            merged[key] = ours[key] if o is not None else theirs[key]
+        else:
+            merged[key] = _merge_attrs(base.get(key, {}), ours[key],
+                                       theirs[key], kind, key, conflicts)
+    return merged
+
+
+def _renumber(base, ours, theirs):
+    """Give nodes both sides added under the same uid distinct uids.
+
+    Each side numbers new nodes from its own highest uid, so diverging
+    copies reuse them. Their nodes are moved past every uid in use.
+
+    Returns:
+        dict: Their old uid to its new one.
+    """
+    clashes = sorted(n for n in theirs.node
+                     if n in ours.node and n not in base.node and
+                     fingerprint(ours.node[n]) != fingerprint(theirs.node[n]))
+    if not clashes:
+        return {}
+    start = max(max(ours.node), max(theirs.node)) + 1
+    mapping = {n: start + i for i, n in enumerate(clashes)}
+    for n, m in mapping.items():
+        theirs.node[n]['uid'] = m
+    return mapping
+
+
+def merge3(base, ours, theirs):
+    """Three-way merge two snapshots, given the one they both started from.
+
+    Changes made on only one side are taken. Where both sides changed the
+    same node or edge, differing attributes are merged one by one; where
+    they changed the same attribute differently, or one side deleted what
+    the other changed, ours wins and a :class:`Conflict` is reported. Nodes
+    both sides added with the same uid are kept, with theirs renumbered.
+    Edges left without a node at either end are dropped.
+
+    Args:
+        base (:class:`networkx.MultiDiGraph`): Common ancestor.
+        ours (:class:`networkx.MultiDiGraph`): Our snapshot.
+        theirs (:class:`networkx.MultiDiGraph`): Their snapshot. Renumbered
+            nodes' attributes are given their new uids in place.
+
+    Returns:
+        (:class:`~atomic.graph.store.Graph`, list[:class:`Conflict`]): The
+            merged graph, and any conflicts.
+    """
+    mapping = _renumber(base, ours, theirs)
+    if mapping:
+        theirs = store.as_networkx(theirs)
+        nx.relabel_nodes(theirs, mapping, copy=False)
+        for src, dst, attrs in theirs.edges_iter(data=True):
+            attrs['src'], attrs['dst'] = src, dst
+    hashes = [fingerprints(G) for G in (base, ours, theirs)]
+    conflicts = []
+    nodes = _merge_items(base.node, ours.node, theirs.node,
+                         [h[0] for h in hashes], 'node', conflicts)
+    edges = _merge_items(*(_edge_attrs(G) for G in (base, ours, theirs)),
+                         hashes=[h[1] for h in hashes], kind='edge',
+                         conflicts=conflicts)
+    merged = store.Graph()
+    for n, attrs in nodes.items():
+        merged.add_node(n, attr_dict=dict(attrs))
+    for (src, dst, key), attrs in edges.items():
+        if src in nodes and dst in nodes:
+            merged.add_edge(src, dst, key, attr_dict=dict(attrs))
+    return merged, conflicts
+
+
+def _edge_attrs(G):
+    return {(src, dst, key): attrs
+            for src, dst, key, attrs in G.edges_iter(data=True, keys=True)}
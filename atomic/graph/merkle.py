@@ -0,0 +1,180 @@
+"""
+merkle
+======
+Content-addressed hashes of subtrees, for cheap change detection.
+
+Each node's hash covers its own attributes and, through their hashes, its
+``parent`` children's subtrees. Children are combined by summing their
+hashes, so one child changing adjusts the sum without revisiting its
+siblings, and a mutation only rehashes the chain of ancestors above it.
+
+Two indexes can then be compared by descending from the top-level nodes
+into differing hashes only; identical subtrees are skipped whole.
+"""
+import hashlib
+
+from atomic.graph import graph, index, merge
+
+
+BITS = 160  # SHA-1
+MOD = 1 << BITS
+
+
+def _hash(data):
+    return int.from_bytes(hashlib.sha1(data).digest(), 'big')
+
+
+def _own(attrs):
+    return int.from_bytes(merge.fingerprint(attrs), 'big')
+
+
+class MerkleIndex(index.Index):
+    """Subtree hashes, kept up to date along the ancestor chain.
+
+    Hashes within a cycle of parent edges depend on the order of changes;
+    :meth:`rebuild` makes them consistent again.
+    """
+
+    def __init__(self):
+        self._own = {}  # uid => hash of its attributes
+        self._sum = {}  # uid => sum of its children's hashes
+        self._hash = {}  # uid => subtree hash
+        self._parents = {}  # uid => parent uids
+        self._children = {}  # uid => child uids
+        self._roots = set()  # Nodes without parents
+        self._top = 0  # Sum of their hashes
+
+    def digest(self, uid):
+        """Return the hex hash of a node's subtree, or None if it doesn't
+        exist. Unchanged subtrees keep their digest."""
+        h = self._hash.get(uid)
+        return None if h is None else '%040x' % h
+
+    def root(self):
+        """Return a hex hash of the whole hierarchy."""
+        return '%040x' % self._top
+
+    def __len__(self):
+        return len(self._hash)
+
+    # Index hooks
+
+    def rebuild(self, G):
+        self.__init__()
+        for uid, attrs in G.node.items():
+            self._own[uid] = _own(attrs)
+            self._sum[uid] = 0
+            self._parents[uid], self._children[uid] = set(), set()
+        for src, dst, attrs in G.edges_iter(data=True):
+            if graph.is_type(attrs, graph.EdgeTypes.parent):
+                self._parents[dst].add(src)
+                self._children[src].add(dst)
+        self._roots = {n for n, parents in self._parents.items()
+                       if not parents}
+        self._update(G)
+
+    def node_added(self, uid, attrs):
+        self._own[uid] = _own(attrs)
+        self._sum[uid] = 0
+        self._parents[uid], self._children[uid] = set(), set()
+        self._roots.add(uid)
+        self._update((uid,))
+
+    def node_updated(self, uid, attrs):
+        own = _own(attrs)
+        if own != self._own[uid]:
+            self._own[uid] = own
+            self._update((uid,))
+
+    def node_removed(self, uid):
+        # Its edges have been removed already
+        if uid in self._roots:
+            self._roots.discard(uid)
+            self._top = (self._top - self._hash[uid]) % MOD
+        for d in (self._own, self._sum, self._hash, self._parents,
+                  self._children):
+            d.pop(uid, None)
+
+    def edge_added(self, src, dst, attrs):
+        if graph.is_type(attrs, graph.EdgeTypes.parent):
+            self._link(src, dst, True)
+
+    edge_updated = edge_added
+
+    def edge_removed(self, src, dst, key):
+        if key == graph.key_of(graph.EdgeTypes.parent):
+            self._link(src, dst, False)
+
+    # Maintenance
+
+    def _link(self, src, dst, is_parent):
+        if is_parent == (dst in self._children[src]):
+            return
+        h = self._hash[dst]
+        if is_parent:
+            self._children[src].add(dst)
+            self._parents[dst].add(src)
+            self._sum[src] = (self._sum[src] + h) % MOD
+            if dst in self._roots:
+                self._roots.discard(dst)
+                self._top = (self._top - h) % MOD
+        else:
+            self._children[src].discard(dst)
+            self._parents[dst].discard(src)
+            self._sum[src] = (self._sum[src] - h) % MOD
+            if not self._parents[dst]:
+                self._roots.add(dst)
+                self._top = (self._top + h) % MOD
+        self._update((src,))
+
+    def _update(self, changed):
+        """Rehash nodes whose attributes or children changed, and their
+        ancestors, each after any of its children that need it."""
+        affected, todo = set(), list(changed)
+        while todo:
+            n = todo.pop()
+            if n not in affected:
+                affected.add(n)
+                todo.extend(self._parents[n])
+        pending = dict.fromkeys(affected, 0)  # Children yet to be rehashed
+        for n in affected:
+            for p in self._parents[n]:
+                pending[p] += 1
+        ready = [n for n, count in pending.items() if not count]
+        while affected:
+            if not ready:  # Only cycles are left; break one anywhere
+                ready.append(next(iter(affected)))
+            n = ready.pop()
+            if n not in affected:
+                continue
+            affected.discard(n)
+            old = self._hash.get(n, 0)
+            new = self._hash[n] = _hash(self._own[n].to_bytes(20, 'big') +
+                                        self._sum[n].to_bytes(20, 'big'))
+            if n in self._roots:
+                self._top = (self._top + new - old) % MOD
+            for p in self._parents[n]:
+                self._sum[p] = (self._sum[p] + new - old) % MOD
+                pending[p] -= 1
+                if not pending[p]:
+                    ready.append(p)
+
+
+def changed(a, b):
+    """Yield the nodes that differ between two indexes: those whose
+    attributes or children differ, or which exist in only one.
+
+    Only subtrees whose hashes differ are descended into.
+    """
+    if a._top == b._top:
+        return
+    todo, seen = list(a._roots | b._roots), set()
+    while todo:
+        n = todo.pop()
+        if n in seen or a._hash.get(n) == b._hash.get(n):
+            continue
+        seen.add(n)
+        children = a._children.get(n, set()), b._children.get(n, set())
+        if a._own.get(n) != b._own.get(n) or children[0] != children[1]:
+            yield n
+        todo.extend(children[0] | children[1])
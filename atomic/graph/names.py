@@ -0,0 +1,194 @@
+"""
+names
+=====
+Path-qualified names: each node's name, preceded by its ancestors' names.
+
+Outlines reuse names freely; "Notes" may appear under every project. The
+path from the root, like ``('Work', 'Report', 'Notes')``, tells them apart,
+which lets importers match items to the nodes they created before.
+
+Each node's parent along its path is stored in the graph's own attributes,
+so it's saved with it, and a later session derives the paths from it rather
+than walking every node's edges again.
+"""
+import bisect
+
+from atomic.graph import graph, index
+
+
+#: Key of the persisted state within ``G.graph``.
+KEY = 'name_index'
+#: Version of the persisted state; others are ignored.
+VERSION = 2
+
+
+class NameIndex(index.Index):
+    """Maps name paths to node ids, and back.
+
+    A node's path follows its parent edges up to a root. Nodes with several
+    parents use the lowest-numbered one. Changes mark nodes stale, and their
+    paths, with those of their descendants, are brought up to date on the
+    next lookup.
+    """
+
+    def __init__(self):
+        self.G = None
+        self._parents = {}  # uid => parent its path goes through, or None
+        self._paths = {}  # uid => path
+        self._uids = {}  # path => sorted uids
+        self._stale = {}  # uids whose subtrees need new paths; ordered set
+        self._derived = True  # Whether paths follow from _parents yet
+
+    def get(self, path):
+        """Return the ids of the nodes at a path, in ascending order.
+
+        Args:
+            path (tuple[str]): Names, from a root down.
+
+        Returns:
+            list[int]: Possibly empty; names aren't unique.
+        """
+        self._refresh()
+        return list(self._uids.get(tuple(path), ()))
+
+    def path(self, uid):
+        """Return a node's path, or None if it doesn't exist."""
+        self._refresh()
+        return self._paths.get(uid)
+
+    def __len__(self):
+        self._refresh()
+        return len(self._paths)
+
+    # Index hooks
+
+    def rebuild(self, G):
+        """Reuse the parents saved in ``G.graph`` if there's one per node, or
+        else walk the graph. Paths are derived on the first lookup."""
+        self.G = G
+        state = G.graph.get(KEY) or {}
+        # JSON has turned int keys into strings
+        parents = {int(k): v for k, v in state.get('parents', {}).items()}
+        stale = (int(k) for k in state.get('stale', ()))
+        if state.get('version') != VERSION or len(parents) != len(G):
+            parents, stale = dict.fromkeys(G), G
+        self._parents, self._paths, self._uids = parents, {}, {}
+        self._stale = dict.fromkeys(stale)
+        self._derived = False
+        self._persist()
+
+    def node_added(self, uid, attrs):
+        self._parents[uid] = None
+        self._stale[uid] = None
+
+    def node_updated(self, uid, attrs):
+        path = self._paths.get(uid)
+        if path is None or path[-1] != attrs.get('name'):
+            self._stale[uid] = None
+
+    def node_removed(self, uid):
+        self._parents.pop(uid, None)
+        self._stale.pop(uid, None)
+        self._set(uid, None)
+
+    def edge_added(self, src, dst, attrs):
+        if graph.is_type(attrs, graph.EdgeTypes.parent):
+            self._stale[dst] = None
+
+    edge_updated = edge_added
+
+    def edge_removed(self, src, dst, key):
+        # The edge may still be in the graph; it's looked at later
+        if key == graph.key_of(graph.EdgeTypes.parent):
+            self._stale[dst] = None
+
+    # Maintenance
+
+    def _persist(self):
+        G = self.G
+        G.graph[KEY] = {'version': VERSION, 'parents': self._parents,
+                        'stale': self._stale}
+
+    def _derive(self):
+        """Set every node's path from the saved parents. Nodes whose parents
+        don't lead to a root, or aren't in the graph, are marked stale; if
+        the saved nodes aren't the graph's, it's walked afresh."""
+        self._derived = True
+        if any(uid not in self.G for uid in self._parents):
+            self._parents = dict.fromkeys(self.G)
+            self._stale = dict.fromkeys(self.G)
+            self._persist()
+            return
+        for uid in self._parents:
+            chain, n = [], uid
+            while n is not None and n not in self._paths:
+                if n not in self._parents or n in chain:
+                    # Within a cycle, or under a missing node
+                    self._stale.update(dict.fromkeys(chain))
+                    break
+                chain.append(n)
+                n = self._parents[n]
+            else:
+                path = self._paths.get(n, ())
+                for n in reversed(chain):
+                    path += (self.G.node[n].get('name'),)
+                    self._set(n, path)
+
+    def _set(self, uid, path):
+        old = self._paths.get(uid)
+        if old == path:
+            return
+        if old is not None:
+            uids = self._uids[old]
+            uids.remove(uid)
+            if not uids:
+                del self._uids[old]
+            del self._paths[uid]
+        if path is not None:
+            self._paths[uid] = path
+            bisect.insort(self._uids.setdefault(path, []), uid)
+
+    def _parent(self, uid):
+        parents = graph.parents(self.G, uid)
+        return parents[0] if parents else None
+
+    def _compute(self, uid):
+        """Walk up from a node to its root, collecting names.
+
+        Returns:
+            (tuple[str], set[int]): The path, and the ids along it.
+        """
+        names, seen = [], set()
+        while uid is not None and uid not in seen:
+            seen.add(uid)
+            names.append(self.G.node[uid].get('name'))
+            uid = self._parent(uid)
+        return tuple(reversed(names)), seen
+
+    def _refresh(self):
+        if not self._derived:
+            self._derive()
+        while self._stale:
+            uid = next(iter(self._stale))
+            del self._stale[uid]
+            if uid not in self.G:
+                continue
+            path, ancestors = self._compute(uid)
+            todo, seen = [(uid, self._parent(uid), path)], set()
+            while todo:
+                n, parent, path = todo.pop()
+                if n in seen:
+                    continue
+                seen.add(n)
+                self._parents[n] = parent
+                if self._paths.get(n) == path and n != uid:
+                    continue  # Its descendants are unchanged, too
+                self._set(n, path)
+                for c in graph.children(self.G, n):
+                    if self._parent(c) != n:
+                        continue
+                    if c in ancestors:  # Within a cycle; it ends before n
+                        todo.append((c, n, self._compute(c)[0]))
+                    else:
+                        todo.append(
+                            (c, n, path + (self.G.node[c].get('name'),)))
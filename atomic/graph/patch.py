@@ -0,0 +1,276 @@
+"""
+patch
+=====
+JSON Patch (`RFC 6902`_) and JSON Merge Patch (`RFC 7386`_) for node
+attributes.
+
+Patches are compiled once, validating operations and splitting JSON Pointers,
+then applied to any number of documents. Application is atomic: the original
+document is never modified, and only containers along modified paths are
+copied.
+
+.. _RFC 6902: https://tools.ietf.org/html/rfc6902
+.. _RFC 7386: https://tools.ietf.org/html/rfc7386
+"""
+import copy
+
+from atomic.errors import PatchError
+
+
+OPERATIONS = ('add', 'remove', 'replace', 'move', 'copy', 'test')
+
+
+def parse_pointer(pointer):
+    """Split a JSON Pointer (`RFC 6901`_) into unescaped reference tokens.
+
+    .. _RFC 6901: https://tools.ietf.org/html/rfc6901
+    """
+    if pointer == '':
+        return ()
+    if not isinstance(pointer, str) or not pointer.startswith('/'):
+        raise PatchError("Invalid JSON pointer: %r" % (pointer,))
+    return tuple(t.replace('~1', '/').replace('~0', '~')
+                 for t in pointer[1:].split('/'))
+
+
+def format_pointer(tokens):
+    """Join reference tokens into a JSON Pointer."""
+    return ''.join('/' + str(t).replace('~', '~0').replace('/', '~1')
+                   for t in tokens)
+
+
+def _index(container, token, pointer, append=False):
+    """Resolve a reference token against a list."""
+    if append and token == '-':
+        return len(container)
+    if not token.isdigit() or (token != '0' and token.startswith('0')):
+        raise PatchError("Invalid array index in %s" % pointer)
+    idx = int(token)
+    if idx > len(container) or (not append and idx == len(container)):
+        raise PatchError("Array index out of range in %s" % pointer)
+    return idx
+
+
+def _get(doc, tokens, pointer):
+    """Return the value referenced by ``tokens``."""
+    for token in tokens:
+        if isinstance(doc, dict):
+            if token not in doc:
+                raise PatchError("Path %s not found" % pointer)
+            doc = doc[token]
+        elif isinstance(doc, list):
+            doc = doc[_index(doc, token, pointer)]
+        else:
+            raise PatchError("Path %s not found" % pointer)
+    return doc
+
+
+class Patch:
+    """A compiled sequence of JSON Patch operations and a JSON Merge Patch.
+
+    The RFC 6902 operations are applied first, followed by the merge patch.
+    """
+
+    def __init__(self, ops=(), merge=None):
+        """Compile the patch.
+
+        Args:
+            ops (list[dict]): RFC 6902 operations.
+            merge (dict): RFC 7386 merge patch; ``None`` values delete keys.
+
+        Raises:
+            PatchError: If an operation is malformed.
+        """
+        self.ops = [self._compile(op) for op in ops]
+        self.merge = merge or None
+        keys = set()
+        for _, path, frm, _ in self.ops:
+            for tokens in (path, frm):
+                if tokens is None:
+                    continue
+                if not tokens:  # The whole document is touched
+                    keys = None
+                    break
+                keys.add(tokens[0])
+            if keys is None:
+                break
+        if keys is not None and self.merge:
+            keys.update(self.merge)
+        #: Top-level keys the patch may change, or None for the whole document
+        self.keys = keys
+
+    @staticmethod
+    def _compile(op):
+        if not isinstance(op, dict):
+            raise PatchError("Patch operations must be objects: %r" % (op,))
+        name = op.get('op')
+        if name not in OPERATIONS:
+            raise PatchError("Unknown patch operation: %r" % (name,))
+        if 'path' not in op:
+            raise PatchError("Operation '%s' is missing 'path'" % name)
+        path = parse_pointer(op['path'])
+        frm = None
+        if name in ('move', 'copy'):
+            if 'from' not in op:
+                raise PatchError("Operation '%s' is missing 'from'" % name)
+            frm = parse_pointer(op['from'])
+            if name == 'move' and path[:len(frm)] == frm and path != frm:
+                raise PatchError("Cannot move %s into itself" % op['from'])
+        if name in ('add', 'replace', 'test') and 'value' not in op:
+            raise PatchError("Operation '%s' is missing 'value'" % name)
+        return name, path, frm, op.get('value')
+
+    def __bool__(self):
+        return bool(self.ops or self.merge)
+
+    def __call__(self, doc):
+        return self.apply(doc)
+
+    def apply(self, doc):
+        """Apply the patch, returning a new document.
+
+        Raises:
+            PatchError: If an operation fails; ``doc`` is left untouched.
+        """
+        state = _Document(doc)
+        for name, path, frm, value in self.ops:
+            pointer = format_pointer(path)
+            if name == 'add':
+                state.add(path, copy.deepcopy(value), pointer)
+            elif name == 'remove':
+                state.remove(path, pointer)
+            elif name == 'replace':
+                state.remove(path, pointer)
+                state.add(path, copy.deepcopy(value), pointer)
+            elif name == 'move':
+                moved = state.remove(frm, format_pointer(frm))
+                state.add(path, moved, pointer)
+            elif name == 'copy':
+                value = _get(state.root, frm, format_pointer(frm))
+                state.add(path, copy.deepcopy(value), pointer)
+            elif name == 'test':
+                if _get(state.root, path, pointer) != value:
+                    raise PatchError("Test failed at %s" % pointer)
+        if self.merge:
+            state.root = merge_patch(state.root, self.merge)
+        return state.root
+
+    def apply_with_diff(self, doc):
+        """Apply the patch, also returning the effective changes.
+
+        Returns:
+            (dict, list[dict]): The new document, and RFC 6902 operations
+                describing what actually changed; see :func:`diff`.
+        """
+        new = self.apply(doc)
+        return new, diff(doc, new, keys=self.keys)
+
+
+class _Document:
+    """Copy-on-write view of a document being patched."""
+
+    def __init__(self, root):
+        self.root = root
+        self._owned = set()  # ids of containers already copied
+
+    def _own(self, container):
+        dup = copy.copy(container)
+        self._owned.add(id(dup))
+        return dup
+
+    def _parent(self, tokens, pointer):
+        """Return the writable container holding the last token."""
+        if id(self.root) not in self._owned:
+            self.root = self._own(self.root)
+        node = self.root
+        for token in tokens[:-1]:
+            if isinstance(node, dict):
+                if token not in node:
+                    raise PatchError("Path %s not found" % pointer)
+                key = token
+            elif isinstance(node, list):
+                key = _index(node, token, pointer)
+            else:
+                raise PatchError("Path %s not found" % pointer)
+            child = node[key]
+            if isinstance(child, (dict, list)) and \
+                    id(child) not in self._owned:
+                child = node[key] = self._own(child)
+            node = child
+        return node
+
+    def add(self, tokens, value, pointer):
+        if not tokens:
+            self.root = value
+            return
+        parent = self._parent(tokens, pointer)
+        if isinstance(parent, dict):
+            parent[tokens[-1]] = value
+        elif isinstance(parent, list):
+            parent.insert(_index(parent, tokens[-1], pointer, append=True),
+                          value)
+        else:
+            raise PatchError("Path %s not found" % pointer)
+
+    def remove(self, tokens, pointer):
+        if not tokens:
+            value, self.root = self.root, None
+            return value
+        parent = self._parent(tokens, pointer)
+        if isinstance(parent, dict):
+            if tokens[-1] not in parent:
+                raise PatchError("Path %s not found" % pointer)
+            return parent.pop(tokens[-1])
+        elif isinstance(parent, list):
+            return parent.pop(_index(parent, tokens[-1], pointer))
+        raise PatchError("Path %s not found" % pointer)
+
+
+def merge_patch(target, patch):
+    """Apply an RFC 7386 merge patch, returning a new document."""
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def diff(before, after, keys=None, _path=()):
+    """Describe the changes between two documents as RFC 6902 operations.
+
+    Args:
+        before (dict): Original document.
+        after (dict): Patched document.
+        keys (set[str]): Top-level keys that may differ. Other keys aren't
+            compared; if None, all are.
+
+    Returns:
+        list[dict]: ``add``, ``remove`` and ``replace`` operations which turn
+            ``before`` into ``after``.
+    """
+    if not (isinstance(before, dict) and isinstance(after, dict)):
+        if before == after:
+            return []
+        return [{'op': 'replace', 'path': format_pointer(_path),
+                 'value': after}]
+    if keys is None:
+        keys = list(before)
+        keys.extend(k for k in after if k not in before)
+    else:
+        keys = sorted(keys)
+    ops = []
+    for key in keys:
+        path = _path + (key,)
+        if key not in after:
+            if key in before:
+                ops.append({'op': 'remove', 'path': format_pointer(path)})
+        elif key not in before:
+            ops.append({'op': 'add', 'path': format_pointer(path),
+                        'value': after[key]})
+        elif before[key] is not after[key]:
+            ops.extend(diff(before[key], after[key], _path=path))
+    return ops
@@ -0,0 +1,240 @@
+"""
+paths
+=====
+Paths between nodes: shortest, longest, and the most that can flow.
+
+:func:`shortest` searches breadth-first from both ends at once, so it
+visits about the square root of the nodes a one-sided search would.
+:func:`longest` is the critical path through a DAG of estimates, like
+``precedes`` edges between actions with a ``time_estd``. :func:`max_flow`
+finds how much can move from one node to another given edge capacities, and
+the edges that limit it.
+
+All of them follow the graph's own ``succ`` and ``pred`` mappings and can be
+restricted to edges of some types; nothing is copied into a networkx graph.
+"""
+from collections import namedtuple
+
+from atomic.graph import graph, schema
+
+
+#: Result of :func:`max_flow`. ``flows`` maps (src, dst) to the amount sent
+#: along the edges between them; ``cut`` lists the saturated (src, dst) pairs
+#: of a minimum cut, the bottleneck.
+Flow = namedtuple('Flow', 'value flows cut')
+
+
+def _keys(edge_types):
+    return None if edge_types is None else {graph.key_of(t)
+                                            for t in edge_types}
+
+
+def _follows(edges, keys):
+    return keys is None or any(k in edges for k in keys)
+
+
+def _reachable(adj, n, keys):
+    found, todo = {n}, [n]
+    while todo:
+        for m, edges in adj[todo.pop()].items():
+            if m not in found and _follows(edges, keys):
+                found.add(m)
+                todo.append(m)
+    return found
+
+
+def shortest(G, src, dst, edge_types=None):
+    """Return a path with the fewest edges from one node to another.
+
+    Args:
+        G: The graph.
+        src, dst (int): End nodes.
+        edge_types (iterable): Edge types to follow, by name or value; any
+            if None.
+
+    Returns:
+        list[int]: The nodes along the path, from ``src`` to ``dst``, or None
+            if there's none.
+    """
+    if src == dst:
+        return [src]
+    keys = _keys(edge_types)
+    # Each side maps the nodes it reached to the one it reached them from
+    ahead, behind = {src: None}, {dst: None}
+    forward, backward = [src], [dst]
+    while forward and backward:
+        # Grow the smaller side by a whole level. Until they meet, the path
+        # is longer than both sides' depths, so the first meeting is optimal.
+        if len(forward) <= len(backward):
+            forward, meet = _grow(G.succ, forward, ahead, behind, keys)
+        else:
+            backward, meet = _grow(G.pred, backward, behind, ahead, keys)
+        if meet is not None:
+            path = [meet]
+            while ahead[path[-1]] is not None:
+                path.append(ahead[path[-1]])
+            path.reverse()
+            while behind[path[-1]] is not None:
+                path.append(behind[path[-1]])
+            return path
+    return None
+
+
+def _grow(adj, frontier, seen, other, keys):
+    """Visit the next level; returns it, and a node the other side has
+    reached, if one was found."""
+    level = []
+    for n in frontier:
+        for m, edges in adj[n].items():
+            if m in seen or not _follows(edges, keys):
+                continue
+            seen[m] = n
+            if m in other:
+                return level, m
+            level.append(m)
+    return level, None
+
+
+def _weight(attrs, weight):
+    try:
+        return schema.to_interval(attrs.get(weight)).total_seconds()
+    except (TypeError, ValueError):
+        return 0
+
+
+def longest(G, src=None, dst=None, edge_types=(graph.EdgeTypes.precedes,),
+            weight='time_estd'):
+    """Return the path whose nodes have the greatest total weight.
+
+    Args:
+        G: The graph.
+        src (int): Node the path starts at; any if None.
+        dst (int): Node the path ends at; any if None.
+        edge_types (iterable): Edge types to follow; any if None.
+        weight (str): Node attribute to add up, an interval like
+            ``time_estd`` or a number of seconds. Nodes without one weigh
+            nothing.
+
+    Returns:
+        (list[int], float): The path's nodes, and their total weight in
+            seconds. The path is None if ``dst`` can't be reached.
+
+    Raises:
+        ValueError: If the edges followed from ``src``, or anywhere, form a
+            cycle.
+    """
+    keys = _keys(edge_types)
+    nodes = G if src is None else _reachable(G.succ, src, keys)
+    best, prev = {}, {}
+    if src is not None:
+        best[src] = _weight(G.node[src], weight)
+    for n in _topological(G, nodes, keys):
+        if n not in best:
+            if src is not None:
+                continue
+            best[n] = _weight(G.node[n], weight)
+        for m, edges in G.succ[n].items():
+            if not _follows(edges, keys):
+                continue
+            total = best[n] + _weight(G.node[m], weight)
+            if total > best.get(m, -1):
+                best[m], prev[m] = total, n
+    if dst is None:
+        if not best:
+            return [], 0
+        dst = max(best, key=lambda n: (best[n], -n))
+    elif dst not in best:
+        return None, 0
+    path = [dst]
+    while path[-1] in prev:
+        path.append(prev[path[-1]])
+    path.reverse()
+    return path, best[dst]
+
+
+def _topological(G, nodes, keys):
+    """Return ``nodes`` in an order where every followed edge between them
+    points forward."""
+    incoming = dict.fromkeys(nodes, 0)
+    for n in incoming:
+        for m, edges in G.succ[n].items():
+            if m in incoming and _follows(edges, keys):
+                incoming[m] += 1
+    ready = [n for n, count in incoming.items() if not count]
+    order = []
+    while ready:
+        n = ready.pop()
+        order.append(n)
+        for m, edges in G.succ[n].items():
+            if m in incoming and _follows(edges, keys):
+                incoming[m] -= 1
+                if not incoming[m]:
+                    ready.append(m)
+    if len(order) < len(incoming):
+        raise ValueError("The edges followed form a cycle")
+    return order
+
+
+def max_flow(G, src, dst, edge_types=None, capacity='capacity', default=1):
+    """Return the most that can flow from one node to another.
+
+    Augmenting paths are found breadth-first (Edmonds-Karp), over residual
+    capacities of the nodes reachable from ``src`` only.
+
+    Args:
+        G: The graph.
+        src, dst (int): Source and sink.
+        edge_types (iterable): Edge types that carry flow; any if None.
+        capacity (str): Edge attribute holding its capacity. Edges between
+            the same nodes add up.
+        default (float): Capacity of edges without one; with the default,
+            the flow counts edge-disjoint paths.
+
+    Returns:
+        :class:`Flow`
+
+    Raises:
+        ValueError: If ``src`` is ``dst``, or a capacity isn't a number.
+    """
+    if src == dst:
+        raise ValueError("Source and sink must differ")
+    keys = _keys(edge_types)
+    residual = {}
+    for u in _reachable(G.succ, src, keys):
+        for v, edges in G.succ[u].items():
+            total = sum(float(attrs.get(capacity, default))
+                        for key, attrs in edges.items()
+                        if keys is None or key in keys)
+            if total > 0:
+                residual.setdefault(u, {})[v] = total
+                residual.setdefault(v, {}).setdefault(u, 0)
+    given = {u: dict(caps) for u, caps in residual.items()}
+    value = 0
+    while True:
+        prev, todo = {src: None}, [src]
+        while todo and dst not in prev:
+            level = []
+            for u in todo:
+                for v, left in residual.get(u, {}).items():
+                    if left > 0 and v not in prev:
+                        prev[v] = u
+                        level.append(v)
+            todo = level
+        if dst not in prev:
+            break
+        path, v = [], dst
+        while prev[v] is not None:
+            path.append((prev[v], v))
+            v = prev[v]
+        sent = min(residual[u][v] for u, v in path)
+        for u, v in path:
+            residual[u][v] -= sent
+            residual[v][u] += sent
+        value += sent
+    flows = {(u, v): given[u][v] - left
+             for u, caps in residual.items() for v, left in caps.items()
+             if given[u][v] > left}
+    # The nodes the last search reached are the source's side of a cut
+    cut = sorted((u, v) for u in prev for v, cap in given.get(u, {}).items()
+                 if cap > 0 and v not in prev)
+    return Flow(value, flows, cut)
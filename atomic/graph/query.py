@@ -0,0 +1,49 @@
+"""
+query
+=====
+A small subset of Lucene query syntax for filtering nodes.
+
+Supported terms, implicitly AND'ed together:
+
+    name:value      Attribute equals value (case-insensitive).
+    name:*          Attribute is present.
+    -term           Negate a term.
+    word            Name contains the word (case-insensitive).
+    "some words"    Quoted phrases are kept together.
+"""
+import shlex
+
+
+def _compile_term(term):
+    """Compile a single term into a predicate on a node's attribute dict."""
+    if term.startswith('-') and len(term) > 1:
+        inner = _compile_term(term[1:])
+        return lambda node: not inner(node)
+    key, sep, value = term.partition(':')
+    if not sep or not key:  # Free text; search within the name
+        word = term.lower()
+        return lambda node: word in str(node.get('name', '')).lower()
+    if value == '*':
+        return lambda node: key in node
+    value = value.lower()
+    return lambda node: key in node and str(node[key]).lower() == value
+
+
+def compile_query(q):
+    """Compile a query string into a predicate.
+
+    Args:
+        q (str): Query string; see the module documentation for its syntax.
+            An empty or ``None`` query matches everything.
+
+    Returns:
+        callable: Function accepting a node's attribute dict, returning True
+            if the node matches.
+
+    Raises:
+        ValueError: If the query can't be tokenized, e.g. an unclosed quote.
+    """
+    if not q:
+        return lambda node: True
+    predicates = [_compile_term(t) for t in shlex.split(q)]
+    return lambda node: all(p(node) for p in predicates)
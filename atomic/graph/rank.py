@@ -0,0 +1,147 @@
+"""
+rank
+====
+Importance scores: PageRank over the edges between tasks, for surfacing the
+work that unblocks the most other work.
+
+An edge's source collects importance from its target; a task that
+``precedes`` many others, or precedes one that's itself important, ranks
+highly. ``related`` edges go both ways. Scores are scaled so the average
+node scores 1.
+
+Scores are found by power iteration over a sparse matrix and cached. Changes
+to the graph are counted, and the scores recomputed only once the changes
+amount to a material share of the edges; the previous scores are the
+starting point, so a few iterations usually suffice.
+
+Requires ``numpy`` and ``scipy``; install with ``pip install atomic[rank]``.
+"""
+from atomic.errors import AtomicError
+from atomic.graph import graph, index
+
+try:
+    import numpy as np
+    import scipy.sparse as sparse
+except ImportError:  # pragma: no cover
+    np = sparse = None
+
+
+#: Edges followed by default.
+EDGE_TYPES = (graph.EdgeTypes.related, graph.EdgeTypes.precedes)
+#: Edges whose ends lend each other importance.
+SYMMETRIC = frozenset((graph.EdgeTypes.related,))
+
+
+class RankIndex(index.Index):
+    """Cached PageRank scores.
+
+    Args:
+        edge_types (iterable): Edge types to follow, by name or value.
+        damping (float): Chance of following an edge, rather than jumping to
+            any node, at each step of the random walk.
+        tolerance (float): Share of the edges that must change, counting
+            nodes added and removed, before scores are recomputed.
+        iterations (int): Most iterations per computation.
+    """
+
+    def __init__(self, edge_types=EDGE_TYPES, damping=0.85, tolerance=0.05,
+                 iterations=100):
+        if np is None:
+            raise AtomicError("Importance ranking requires numpy and scipy")
+        self.edge_types = frozenset(graph.as_type(t) for t in edge_types)
+        self.damping = damping
+        self.tolerance = tolerance
+        self.iterations = iterations
+        self.G = None
+        self._scores = None  # uid => score, as last computed
+        self._floor = 1.0  # Score of nodes added since
+        self._edges = 0  # Edges followed, as last computed
+        self._changes = 0  # Changes since
+
+    def score(self, uid):
+        """Return a node's importance."""
+        return self.scores()[uid]
+
+    def scores(self):
+        """Return every node's importance, recomputing if the graph has
+        changed materially. Nodes added since score as the least important
+        did.
+
+        Returns:
+            dict: Node id to score; it's the index's own, don't modify it.
+        """
+        if self._scores is None or \
+                self._changes > self.tolerance * self._edges:
+            self._compute()
+        return self._scores
+
+    def ranked(self):
+        """Return the node ids, most important first, then by uid."""
+        scores = self.scores()
+        return sorted(scores, key=lambda uid: (-scores[uid], uid))
+
+    # Index hooks
+
+    def rebuild(self, G):
+        self.G = G
+        self._scores = None
+
+    def node_added(self, uid, attrs):
+        self._changes += 1
+        if self._scores is not None:
+            self._scores[uid] = self._floor
+
+    def node_removed(self, uid):
+        self._changes += 1
+        if self._scores is not None:
+            self._scores.pop(uid, None)
+
+    def edge_added(self, src, dst, attrs):
+        if graph.type_of(attrs) in self.edge_types:
+            self._changes += 1
+
+    def edge_removed(self, src, dst, key):
+        if graph.as_type(key) in self.edge_types:
+            self._changes += 1
+
+    # Computation
+
+    def _compute(self):
+        uids = sorted(self.G)
+        n = len(uids)
+        pos = {uid: i for i, uid in enumerate(uids)}
+        givers, takers = [], []
+        for src, dst, attrs in self.G.edges_iter(data=True):
+            edge_type = graph.type_of(attrs)
+            if edge_type in self.edge_types:
+                givers.append(pos[dst])
+                takers.append(pos[src])
+                if edge_type in SYMMETRIC:
+                    givers.append(pos[src])
+                    takers.append(pos[dst])
+        self._edges, self._changes = len(givers), 0
+        if not n:
+            self._scores, self._floor = {}, 1.0
+            return
+        links = sparse.csr_matrix(
+            (np.ones(len(givers)), (takers, givers)), shape=(n, n))
+        given = np.asarray(links.sum(axis=0)).ravel()
+        dangling = given == 0
+        # Each node's importance is split among the nodes it gives to
+        share = np.zeros(n)
+        np.divide(1, given, out=share, where=~dangling)
+        walk = links.dot(sparse.diags(share)).tocsr()
+        x = np.ones(n) / n
+        if self._scores:  # Start from where the scores were
+            x = np.array([self._scores.get(uid, self._floor) for uid in uids])
+            x /= x.sum()
+        for _ in range(self.iterations):
+            new = self.damping * (walk.dot(x) + x[dangling].sum() / n) + \
+                (1 - self.damping) / n
+            done = np.abs(new - x).sum() < 1e-10
+            x = new
+            if done:
+                break
+        x *= n
+        self._scores = dict(zip(uids, x.tolist()))
+        self._floor = float(x.min())
@@ -0,0 +1,219 @@
+"""
+schema
+======
+Typed schemas for node kinds, applied once at write time.
+
+Attributes arrive as strings from the CLI and shell. A node whose ``type``
+names a registered schema has its known attributes validated and converted
+when it's written (and when the graph is loaded), so readers get ints,
+:class:`~datetime.datetime` and :class:`~datetime.timedelta` values instead
+of re-parsing strings. Attributes the schema doesn't know about, and nodes
+without a registered ``type``, are stored as given.
+
+Example::
+
+    atomic add Write docs type=Action time_estd=2h due=2016 Oct 16 done=
+"""
+from datetime import datetime, timedelta
+
+import pytimeparse
+
+from atomic.errors import ValidationError
+from atomic.utils import parse
+
+
+#: Formats tried, after :data:`~atomic.utils.parse.timestamp_formats`, when
+#: parsing datetimes; the first is what :func:`encode` produces.
+ISO_FORMATS = ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%d')
+DATETIME_FORMATS = parse.timestamp_formats + ISO_FORMATS
+TRUE_STRINGS = frozenset(('', 'true', 'yes', 'y', '1', 't'))
+FALSE_STRINGS = frozenset(('false', 'no', 'n', '0', 'f'))
+
+
+# Coercers convert a value to their type, raising ValueError or TypeError.
+# Values already of the right type are returned first, untouched.
+
+def to_str(value):
+    if isinstance(value, str):
+        return value
+    return str(value)
+
+
+def to_int(value):
+    if isinstance(value, bool):
+        raise TypeError("%r isn't an integer" % value)
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError("%r isn't an integer" % value)
+    return int(value)
+
+
+def to_float(value):
+    if isinstance(value, float):
+        return value
+    if isinstance(value, bool):
+        raise TypeError("%r isn't a number" % value)
+    return float(value)
+
+
+def to_bool(value):
+    """Booleans; a bare flag (``done=``) is True."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in TRUE_STRINGS:
+            return True
+        if lowered in FALSE_STRINGS:
+            return False
+        raise ValueError("%r isn't a boolean" % value)
+    if isinstance(value, int):
+        return bool(value)
+    raise TypeError("%r isn't a boolean" % value)
+
+
+def to_datetime(value):
+    """Datetimes, from any supported timestamp string or POSIX timestamp."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        return parse.parse_datetime(value.strip(), DATETIME_FORMATS)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value)
+    raise TypeError("%r isn't a datetime" % value)
+
+
+def to_interval(value):
+    """Intervals, from strings like '1h30m' or a number of seconds."""
+    if isinstance(value, timedelta):
+        return value
+    if isinstance(value, str):
+        seconds = pytimeparse.parse(value.strip())
+        if seconds is None:
+            raise ValueError("%r isn't an interval" % value)
+        return timedelta(seconds=seconds)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return timedelta(seconds=value)
+    raise TypeError("%r isn't an interval" % value)
+
+
+def to_list(value):
+    """Lists, from a comma-separated string."""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str):
+        return parse.parse_csv(value)
+    if isinstance(value, tuple):
+        return list(value)
+    raise TypeError("%r isn't a list" % value)
+
+
+class Schema:
+    """Coercers for a node kind's attributes.
+
+    Fields are resolved against the base schema once, at construction, so
+    coercion is a single pass over the node's attributes with one dict
+    lookup each.
+    """
+
+    def __init__(self, name, fields, base=None):
+        """Compile the schema.
+
+        Args:
+            name (str): Kind of node; matched against the ``type`` attribute.
+            fields (dict): Attribute name to coercer function.
+            base (:class:`Schema`): Schema whose fields are inherited.
+        """
+        self.name = name
+        self.fields = dict(base.fields) if base is not None else {}
+        self.fields.update(fields)
+
+    def __repr__(self):
+        return "Schema(%r, %s)" % (self.name, sorted(self.fields))
+
+    def coerce(self, attrs):
+        """Return a copy of ``attrs`` with known fields converted.
+
+        ``None`` values are kept as-is, as they mark keys for removal.
+
+        Raises:
+            ValidationError: If a value can't be converted.
+        """
+        result = {}
+        fields = self.fields
+        for key, value in attrs.items():
+            coercer = fields.get(key)
+            if coercer is not None and value is not None:
+                try:
+                    value = coercer(value)
+                except (TypeError, ValueError, OverflowError) as e:
+                    raise ValidationError(
+                        "Invalid %s.%s=%r: %s" %
+                        (self.name, key, value, e)) from None
+            result[key] = value
+        return result
+
+
+#: Registered schemas, by lower-cased name
+SCHEMAS = {}
+
+
+def register(schema):
+    """Register a schema under its name, replacing any existing one."""
+    SCHEMAS[schema.name.lower()] = schema
+    return schema
+
+
+def lookup(kind):
+    """Return the schema registered for a kind, or None."""
+    if not isinstance(kind, str):
+        return None
+    return SCHEMAS.get(kind.lower())
+
+
+def coerce(attrs):
+    """Coerce node attributes by the schema named in their ``type``.
+
+    Returns ``attrs`` itself if no schema applies.
+
+    Raises:
+        ValidationError: If a value can't be converted.
+    """
+    schema = lookup(attrs.get('type'))
+    if schema is None:
+        return attrs
+    return schema.coerce(attrs)
+
+
+def encode(value):
+    """JSON ``default`` hook for coerced values.
+
+    Datetimes become ISO 8601 strings and intervals seconds, both of which
+    coerce back on load.
+    """
+    if isinstance(value, datetime):
+        return value.strftime(ISO_FORMATS[1] if value.microsecond
+                              else ISO_FORMATS[0])
+    if isinstance(value, timedelta):
+        seconds = value.total_seconds()
+        return int(seconds) if seconds.is_integer() else seconds
+    return str(value)
+
+
+Thought = register(Schema('Thought', {
+    'name': to_str,
+    'body': to_str,
+}))
+Action = register(Schema('Action', {
+    'time_estd': to_interval,
+    'time_spent': to_interval,
+    'done': to_bool,
+    'due': to_datetime,
+    'priority': to_int,
+}, base=Thought))
+Todo = register(Schema('Todo', {
+    'desc': to_str,
+    'tags': to_list,
+    'timelog': to_interval,
+}, base=Action))
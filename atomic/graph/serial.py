@@ -1,6 +1,34 @@
+"""
+serial
+======
+Node ids.
+
+:class:`Serial` counts up within one process. :class:`Lease` hands out ids
+from blocks reserved ahead of time, so processes sharing a graph never
+hand out the same id without asking each other for every one. A graph's
+header, ``G.graph[KEY]``, records the first id not yet reserved, so it's
+known without looking at every node.
+"""
 from atomic.utils import log
 
 
+#: Key of the id state in a graph's attributes.
+KEY = 'serial'
+#: Ids reserved at a time.
+BLOCK = 1000
+
+
+def next_uid(G):
+    """Return the first id not reserved for any node of ``G``.
+
+    Graphs saved before their headers recorded it are scanned once.
+    """
+    state = G.graph.get(KEY)
+    if state:
+        return state['next']
+    return max(G, default=0) + 1
+
+
 class Serial:
     """1-indexed auto-incrementing integer.
 
@@ -38,3 +66,40 @@ class Serial:
     @classmethod
     def from_json(cls, json_object):
         return cls(**json_object)
+
+
+class Lease(Serial):
+    """Serial handing out ids from blocks reserved ahead of time.
+
+    Args:
+        reserve (callable): Given a block size, reserves that many ids for
+            this process alone, returning the first.
+        release (callable): Given the first and end of the unused rest of a
+            block, gives them back, if no one reserved any ids since. If
+            None, unused ids are skipped.
+        size (int): Ids reserved at a time.
+    """
+
+    def __init__(self, reserve, release=None, size=BLOCK):
+        super().__init__(0)
+        self._reserve = reserve
+        self._release = release
+        self._end = 0
+        self.size = size
+
+    @property
+    def index(self):
+        if self._index >= self._end:
+            self._index = self._reserve(self.size)
+            self._end = self._index + self.size
+        return Serial.index.fget(self)
+
+    def release(self):
+        """Give back the ids left in the current block."""
+        if self._index < self._end and self._release is not None:
+            self._release(self._index, self._end)
+        self._end = self._index
+
+    def reset(self):
+        """Drop the current block; the next id reserves another."""
+        self._index = self._end = 0
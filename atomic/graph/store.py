@@ -0,0 +1,423 @@
+"""
+store
+=====
+Compact, in-memory graph storage.
+
+networkx keeps a successor and a predecessor dict for every node, so most
+of a large hierarchy's memory goes to dicts that are empty, or hold a single
+parent. :class:`Graph` keeps successor dicts only for nodes that have
+successors, and predecessors as arrays of integer uids; other nodes share
+an empty, read-only mapping. Edge attributes are stored once, in the
+successor dicts, and a pair of nodes with a single edge, as most have, does
+without a dict of edges by key.
+
+It implements the part of the networkx 1.x MultiDiGraph interface used
+here, including the ``node``, ``edge``, ``succ`` and ``pred`` mappings, so
+API implementations work with either. Algorithms that need a real networkx
+graph can use :meth:`Graph.to_networkx`, a view sharing attribute dicts.
+"""
+from array import array
+from collections.abc import Mapping
+
+import networkx as nx
+
+
+def _uids(items=()):
+    return array('q', items)
+
+
+class _NoNeighbors(Mapping):
+    """The neighbors of nodes that have none; read-only, and shared."""
+
+    __slots__ = ()
+
+    def __getitem__(self, n):
+        raise KeyError(n)
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+    def __bool__(self):
+        return False
+
+    def items(self):
+        return ()
+
+    def __repr__(self):
+        return '{}'
+
+    def __reduce__(self):
+        return 'NO_NEIGHBORS'  # Copies are the singleton
+
+
+NO_NEIGHBORS = _NoNeighbors()
+
+
+class _NodeTable(dict):
+    """Node attribute table; adding a node gives it (empty) adjacency, and
+    replacing a node's dict invalidates views."""
+
+    __slots__ = ('_graph',)
+
+    def __init__(self, graph):
+        super().__init__()
+        self._graph = graph
+
+    def __setitem__(self, n, attrs):
+        super().__setitem__(n, attrs)
+        self._graph.succ.setdefault(n, NO_NEIGHBORS)
+        self._graph.pred.setdefault(n, NO_NEIGHBORS)
+        self._graph._nx = None
+
+    def __reduce__(self):
+        return dict, (dict(self),)  # Copies don't take the graph along
+
+
+class _OneEdge(Mapping):
+    """The edges between a pair of nodes, by key, while there's just one;
+    which is much smaller than a dict."""
+
+    __slots__ = ('key', 'attrs')
+
+    def __init__(self, key, attrs):
+        self.key, self.attrs = key, attrs
+
+    def __getitem__(self, key):
+        if key != self.key:
+            raise KeyError(key)
+        return self.attrs
+
+    def __contains__(self, key):
+        return key == self.key
+
+    def __iter__(self):
+        yield self.key
+
+    def __len__(self):
+        return 1
+
+    def get(self, key, default=None):
+        return self.attrs if key == self.key else default
+
+    def items(self):
+        return ((self.key, self.attrs),)
+
+    def values(self):
+        return (self.attrs,)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+class _Predecessors(Mapping):
+    """A node's predecessors, mapped to the edges from them by key, which
+    are kept by the predecessors."""
+
+    __slots__ = ('_succ', '_n', 'uids')
+
+    def __init__(self, succ, n):
+        self._succ, self._n = succ, n
+        self.uids = _uids()
+
+    def __getitem__(self, m):
+        return self._succ.get(m, NO_NEIGHBORS)[self._n]
+
+    def __contains__(self, m):
+        return self._n in self._succ.get(m, NO_NEIGHBORS)
+
+    def __iter__(self):
+        return iter(self.uids)
+
+    def __len__(self):
+        return len(self.uids)
+
+    def items(self):
+        return ((m, self._succ[m][self._n]) for m in self.uids)
+
+    def values(self):
+        return (self._succ[m][self._n] for m in self.uids)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+class Graph:
+    """Directed multigraph with compact adjacency.
+
+    A pair of nodes may have several edges, each with its own key. Unless
+    one is given, an edge's key is its type, so a pair has at most one edge
+    of each type.
+
+    Attributes:
+        graph (dict): Graph attributes.
+        node (dict): Node to attribute dict.
+        succ, edge, adj (dict): Node to successors, mapped to their edges'
+            keys, mapped to edge attributes.
+        pred (dict): Node to predecessors, likewise.
+    """
+
+    def __init__(self, **attr):
+        self.graph = dict(attr)
+        self.node = _NodeTable(self)
+        self.succ = self.edge = self.adj = {}
+        self.pred = {}
+        self._size = 0  # Edges
+        self._nx = None  # Cached networkx view
+
+    @classmethod
+    def from_node_link(cls, data):
+        """Build a graph from :func:`~networkx.readwrite.json_graph.
+        node_link_data` output, as loaded from JSON. Links without a key,
+        as written for simple graphs, are keyed by type."""
+        G = cls()
+        G.graph = data.get('graph', {})
+        ids = []
+        for attrs in data['nodes']:
+            attrs = dict(attrs)
+            n = attrs.pop('id', len(ids))
+            ids.append(n)
+            G.add_node(n, attr_dict=attrs)
+        for attrs in data['links']:
+            attrs = dict(attrs)
+            src, dst = ids[attrs.pop('source')], ids[attrs.pop('target')]
+            G.add_edge(src, dst, attrs.pop('key', None), attr_dict=attrs)
+        return G
+
+    def to_networkx(self):
+        """Return a networkx MultiDiGraph of this graph.
+
+        Attribute dicts are shared, so changes to them show through; the
+        view is rebuilt after nodes or edges are added or removed.
+        """
+        if self._nx is None:
+            G = nx.MultiDiGraph()
+            G.graph = self.graph
+            for n, attrs in self.node.items():
+                G.add_node(n)
+                G.node[n] = attrs
+            for src, dst, keys in self._pairs():
+                G.succ[src][dst] = G.pred[dst][src] = dict(keys)
+            self._nx = G
+        return self._nx
+
+    def is_directed(self):
+        return True
+
+    def is_multigraph(self):
+        return True
+
+    def __iter__(self):
+        return iter(self.node)
+
+    def __len__(self):
+        return len(self.node)
+
+    def __contains__(self, n):
+        try:
+            return n in self.node
+        except TypeError:
+            return False
+
+    def __getitem__(self, n):
+        return self.succ[n]
+
+    # Nodes
+
+    def has_node(self, n):
+        return n in self
+
+    def number_of_nodes(self):
+        return len(self.node)
+
+    def nodes_iter(self, data=False):
+        return iter(self.node.items()) if data else iter(self.node)
+
+    def nodes(self, data=False):
+        return list(self.nodes_iter(data))
+
+    def add_node(self, n, attr_dict=None, **attr):
+        """Add a node, or update its attributes. As with networkx,
+        ``attr_dict`` is stored as given for new nodes."""
+        if attr_dict is None:
+            attr_dict = attr
+        else:
+            attr_dict.update(attr)
+        if n in self.node:
+            self.node[n].update(attr_dict)
+        else:
+            self.node[n] = attr_dict
+
+    def add_nodes_from(self, nodes, **attr):
+        for n in nodes:
+            if isinstance(n, tuple):
+                n, attrs = n
+                self.add_node(n, dict(attrs, **attr))
+            else:
+                self.add_node(n, dict(attr))
+
+    def remove_node(self, n):
+        if n not in self.node:
+            raise nx.NetworkXError("The node %s is not in the graph." % (n,))
+        succ = self.succ.pop(n)
+        for dst, keys in succ.items():
+            self._size -= len(keys)
+            self._discard(dst, n)
+        for src in self.pred.pop(n):  # Self-loops are gone already
+            self._size -= len(self.succ[src][n])
+            self._unlink(src, n)
+        del self.node[n]
+        self._nx = None
+
+    # Edges
+
+    def has_edge(self, u, v, key=None):
+        keys = self.succ.get(u, NO_NEIGHBORS).get(v)
+        return keys is not None and (key is None or key in keys)
+
+    def get_edge_data(self, u, v, key=None, default=None):
+        """Return the attributes of an edge, or of a pair's edges by key if
+        ``key`` is None."""
+        keys = self.succ.get(u, NO_NEIGHBORS).get(v)
+        if keys is None:
+            return default
+        return keys if key is None else keys.get(key, default)
+
+    def number_of_edges(self, u=None, v=None):
+        if u is None:
+            return self._size
+        return len(self.succ.get(u, NO_NEIGHBORS).get(v, ()))
+
+    def _nodes(self, nbunch):
+        if nbunch is None:
+            return self.node
+        return [n for n in ([nbunch] if nbunch in self else nbunch)
+                if n in self]
+
+    def _pairs(self, nbunch=None):
+        for src in self._nodes(nbunch):
+            for dst, keys in self.succ[src].items():
+                yield src, dst, keys
+
+    def edges_iter(self, nbunch=None, data=False, keys=False):
+        for src, dst, edges in self._pairs(nbunch):
+            for key, attrs in edges.items():
+                yield _edge(src, dst, key, attrs, data, keys)
+
+    def edges(self, nbunch=None, data=False, keys=False):
+        return list(self.edges_iter(nbunch, data, keys))
+
+    out_edges = edges
+
+    def in_edges(self, nbunch=None, data=False, keys=False):
+        return [_edge(src, dst, key, attrs, data, keys)
+                for dst in self._nodes(nbunch) for src in self.pred[dst]
+                for key, attrs in self.succ[src][dst].items()]
+
+    def successors(self, n):
+        return list(self.succ[n])
+
+    def predecessors(self, n):
+        return list(self.pred[n])
+
+    def add_edge(self, u, v, key=None, attr_dict=None, **attr):
+        """Add an edge, adding its nodes if need be, or update its
+        attributes.
+
+        Args:
+            key: Tells the edge apart from others between the pair; if None,
+                it's the edge's ``type`` attribute.
+        """
+        if attr_dict is None:
+            attr_dict = attr
+        else:
+            attr_dict.update(attr)
+        if key is None:
+            key = attr_dict.get('type')
+        for n in (u, v):
+            if n not in self.node:
+                self.node[n] = {}
+        succ = self.succ[u]
+        keys = succ.get(v)
+        data = None if keys is None else keys.get(key)
+        if data is None:
+            data = {}
+            if succ is NO_NEIGHBORS:
+                succ = self.succ[u] = {}
+            if keys is None:
+                succ[v] = _OneEdge(key, data)
+                pred = self.pred[v]
+                if pred is NO_NEIGHBORS:
+                    pred = self.pred[v] = _Predecessors(self.succ, v)
+                pred.uids.append(u)
+            elif isinstance(keys, _OneEdge):
+                succ[v] = {keys.key: keys.attrs, key: data}
+            else:
+                keys[key] = data
+            self._size += 1
+            self._nx = None
+        data.update(attr_dict)
+
+    def add_edges_from(self, edges, **attr):
+        """Add edges from (u, v), (u, v, attributes) or (u, v, key,
+        attributes) tuples."""
+        for e in edges:
+            u, v, key, attrs = e if len(e) == 4 else \
+                (e[0], e[1], None, e[2] if len(e) == 3 else {})
+            self.add_edge(u, v, key, dict(attrs, **attr))
+
+    def remove_edge(self, u, v, key=None):
+        """Remove an edge; if ``key`` is None, the pair's latest."""
+        keys = self.succ.get(u, NO_NEIGHBORS).get(v)
+        if keys is None or (key is not None and key not in keys):
+            raise nx.NetworkXError("The edge %s-%s not in graph." % (u, v))
+        if len(keys) == 1:
+            self._unlink(u, v)
+            self._discard(v, u)
+        else:
+            if key is None:
+                key = list(keys)[-1]
+            del keys[key]
+            if len(keys) == 1:
+                self.succ[u][v] = _OneEdge(*next(iter(keys.items())))
+        self._size -= 1
+        self._nx = None
+
+    def _unlink(self, u, v):
+        succ = self.succ[u]
+        del succ[v]
+        if not succ:
+            self.succ[u] = NO_NEIGHBORS
+
+    def _discard(self, n, m):
+        pred = self.pred[n]
+        pred.uids.remove(m)
+        if not pred.uids:
+            self.pred[n] = NO_NEIGHBORS
+
+    def clear(self):
+        self.graph.clear()
+        dict.clear(self.node)
+        self.succ.clear()
+        self.pred.clear()
+        self._size = 0
+        self._nx = None
+
+
+def _edge(src, dst, key, attrs, data, keys):
+    if keys:
+        return (src, dst, key, attrs) if data else (src, dst, key)
+    return (src, dst, attrs) if data else (src, dst)
+
+
+def as_networkx(G):
+    """Return ``G`` if it's a networkx graph, or else a networkx view."""
+    return G if isinstance(G, nx.Graph) else G.to_networkx()
@@ -0,0 +1,65 @@
+import random
+
+from atomic.darkmatter import fileapi
+from atomic.graph import adjacency, graph
+
+
+def test_by_type(G):
+    index = adjacency.TypeIndex()
+    index.rebuild(G)
+    G.add_edge(4, 3, 'related', type='related_to')
+    index.edge_added(4, 3, G.edge[4][3]['related'])
+    assert index.children(1) == [2, 3]
+    assert index.children(6, 'parent_of') == [7, 8]
+    assert index.parents(3) == [1]
+    assert index.parents(3, 'related') == [4]
+    assert index.children(4, graph.EdgeTypes.related) == [3]
+    assert index.children(4) == []
+    assert list(index.roots()) == [1]
+    assert list(index.roots('related')) == [1, 2, 4, 5, 6, 7, 8]
+    assert sorted(index.types(), key=str) == [graph.EdgeTypes.parent,
+                                              graph.EdgeTypes.related]
+    assert list(graph.hierarchy(G, adjacency=index)) == \
+        list(graph.hierarchy(G))
+    assert [(n['uid'], depth) for n, depth in graph.hierarchy(G)] == [
+        (1, 0), (2, 1), (4, 2), (5, 2), (3, 1), (6, 2), (7, 3), (8, 3)]
+
+
+def test_follows_mutations():
+    rand = random.Random(0)
+    api = fileapi.FileAPI()
+    for _ in range(300):
+        uids = sorted(api.G)
+        op = rand.randrange(4)
+        if op == 0 or len(uids) < 2:
+            api.Node.create(rand.choice(uids) if uids else None)
+        elif op == 1:
+            api.Node.delete(rand.choice(uids))
+        else:
+            src, dst = rand.sample(uids, 2)
+            kind = rand.choice(('parent', 'related', 'precedes'))
+            if api.Edge.get(src, dst, kind) is None:
+                api.Edge.create(src, dst, type=kind)
+            elif op == 2:
+                api.Edge.delete(src, dst, kind)
+            else:
+                api.Edge.delete(src, dst)  # Of every type
+    for kind in graph.EdgeTypes:
+        for n in api.G:
+            assert api.adjacency.children(n, kind) == \
+                graph.children(api.G, n, kind)
+            assert api.adjacency.parents(n, kind) == \
+                graph.parents(api.G, n, kind)
+        assert list(api.adjacency.roots(kind)) == \
+            list(graph.roots(api.G, kind))
+    assert list(api.Node.get()) == list(graph.hierarchy(api.G))
+
+
+def test_algorithms(G):
+    api = fileapi.FileAPI(G)
+    api.Edge.create(5, 3)
+    assert api.Graph.algorithm('children', node='6') == [7, 8]
+    assert api.Graph.algorithm('parents', node='3', type='related') == [5]
+    assert [(n['uid'], depth) for n, depth in
+            api.Graph.algorithm('hierarchy', type='related')] == [
+        (1, 0), (2, 0), (4, 0), (5, 0), (3, 1), (6, 0), (7, 0), (8, 0)]
@@ -0,0 +1,69 @@
+import math
+
+import networkx as nx
+import pytest
+
+from atomic.darkmatter import fileapi
+from atomic.errors import AtomicError
+from atomic.graph import columnar
+
+
+@pytest.fixture
+def api():
+    pytest.importorskip('numpy')
+    api = fileapi.FileAPI(nx.MultiDiGraph())
+    api.Node.create(name='a', time_estd='2h', priority=1, work='')
+    api.Node.create(name='b', time_estd='30m', priority=2, work='',
+                    home='', done='')
+    api.Node.create(name='c', time_estd=3600, priority=1, status='done')
+    api.Node.create(name='d', due='2016 Oct 16', tags=['home'])
+    return api
+
+
+def test_columns(api):
+    cols = api.columns
+    assert len(cols) == 4
+    assert cols.column('time_estd')[1:5].tolist()[:3] == [7200, 1800, 3600]
+    assert math.isnan(cols.column('time_estd')[4])
+    assert cols.uids(cols.where(done=True)).tolist() == [2, 3]
+    assert cols.uids(cols.where(tag='home')).tolist() == [2, 4]
+    with pytest.raises(AtomicError):
+        cols.column('nope')
+
+
+def test_aggregate(api):
+    cols = api.columns
+    assert cols.aggregate('time_estd') == 12600
+    assert cols.aggregate('time_estd', where=cols.where(done=False)) == 7200
+    assert cols.aggregate(func='count') == 4
+    assert cols.aggregate('priority', func='mean') == pytest.approx(4 / 3)
+    assert cols.aggregate('time_estd', by='tag') == {'work': 9000,
+                                                     'home': 1800}
+    assert cols.aggregate('time_estd', by='done', func='max') == {
+        False: 7200, True: 3600}
+    assert cols.aggregate('time_estd', by='priority', func='count') == {
+        1: 2, 2: 1}
+    with pytest.raises(AtomicError):
+        cols.aggregate('time_estd', func='median')
+
+
+def test_sync(api):
+    cols = api.columns
+    api.Node.patch(1, done='')
+    api.Node.delete(2)
+    uid = api.Node.create(name='e', time_estd='1h', work='')
+    assert uid == 5
+    assert cols.aggregate('time_estd', by='tag',
+                          where=cols.where(done=False)) == {'work': 3600}
+    # Growing past capacity keeps existing values
+    cols._reserve(5000)
+    assert cols.capacity == 8192
+    assert cols.aggregate('time_estd') == 14400
+
+
+def test_is_done():
+    assert columnar.is_done({'done': ''})
+    assert columnar.is_done({'done': True})
+    assert not columnar.is_done({'done': 'false'})
+    assert columnar.is_done({'status': 'Completed'})
+    assert not columnar.is_done({'status': 'pending'})
@@ -0,0 +1,77 @@
+import random
+
+from atomic.darkmatter import fileapi
+from atomic.graph import graph, intervals
+
+
+def check(api):
+    index = api.intervals
+    assert len(index) == len(api.G)
+    for n in api.G:
+        below = graph.descendants(api.G, n)
+        assert sorted(index.descendants(n)) == below
+        for m in api.G:
+            assert index.is_ancestor(n, m) == (m in below)
+
+
+def test_labels(G):
+    index = intervals.IntervalIndex()
+    index.rebuild(G)
+    assert index.descendants(1) == [2, 4, 5, 3, 6, 7, 8]
+    assert index.descendants(3) == [6, 7, 8]
+    assert index.descendants(8) == []
+    assert index.is_ancestor(1, 8) and index.is_ancestor(3, 7)
+    assert not index.is_ancestor(2, 7)
+    assert not index.is_ancestor(7, 3)
+    assert not index.is_ancestor(4, 4)
+
+
+def test_follows_mutations(monkeypatch):
+    monkeypatch.setattr(intervals, 'GAP', 64)  # Run out of room often
+    rand = random.Random(0)
+    api = fileapi.FileAPI()
+    for _ in range(400):
+        uids = sorted(api.G)
+        op = rand.randrange(5)
+        if op < 2 or len(uids) < 2:
+            api.Node.create(rand.choice(uids) if uids else None)
+        elif op == 2:
+            api.Node.delete(rand.choice(uids))
+        else:
+            src, dst = rand.sample(uids, 2)
+            if api.Edge.get(src, dst, 'parent') is None:
+                api.Edge.create(src, dst, type='parent')
+            else:
+                api.Edge.delete(src, dst, 'parent')
+    check(api)
+    api.intervals.rebuild(api.G)
+    check(api)
+
+
+def test_cycles():
+    api = fileapi.FileAPI()
+    a = api.Node.create()
+    b = api.Node.create(a)
+    c = api.Node.create(b)
+    api.Edge.create(c, a, type='parent')
+    assert api.intervals.is_ancestor(c, b)
+    assert sorted(api.intervals.descendants(b)) == [a, c]
+    check(api)
+    api.Edge.delete(a, b)
+    assert api.Graph.descendants(str(a)) == []
+    assert api.Graph.algorithm('is_ancestor', node=str(b),
+                               descendant=str(a))
+    check(api)
+
+
+def test_many_children():
+    api = fileapi.FileAPI()
+    root = api.Node.create()
+    for _ in range(200):
+        api.Node.create(root)
+    uids = api.Node.create_many([{}] * 50)
+    for uid in uids:  # Adopted under the last child, one at a time
+        api.Edge.create(root + 200, uid, type='parent')
+    assert api.Graph.descendants(root) == list(range(root + 1, root + 251))
+    assert api.Graph.descendants(root + 200) == uids
+    check(api)
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from atomic.darkmatter import fileapi
+from atomic.errors import NotFoundError
+from atomic.graph import graph, lca
+
+
+def ancestors(G, n):
+    """n and its ancestors, nearest first, in a graph of single parents."""
+    chain = [n]
+    while graph.parents(G, chain[-1]):
+        chain.append(graph.parents(G, chain[-1])[0])
+    return chain
+
+
+def test_lca(G):
+    index = lca.LCAIndex()
+    index.rebuild(G)
+    assert index.lca(4, 5) == 2
+    assert index.lca(4, 7) == 1
+    assert index.lca(7, 8) == 6
+    assert index.lca(6, 7, 8) == 6
+    assert index.lca(5) == 5
+    assert index.depth(7) == 3
+    G.add_node(9)
+    index.node_added(9, G.node[9])
+    assert index.lca(9, 1) is None
+    with pytest.raises(ValueError):
+        index.lca()
+
+
+def test_follows_mutations():
+    rand = random.Random(0)
+    api = fileapi.FileAPI()
+    for _ in range(50):
+        for _ in range(10):
+            uids = sorted(api.G)
+            op = rand.randrange(6)
+            if op < 3 or not uids:
+                api.Node.create(rand.choice(uids) if uids else None)
+            elif op == 3:
+                api.Node.delete(rand.choice(uids))
+            else:
+                # Move a node under another, unless that's below it
+                n, parent = rand.choice(uids), rand.choice(uids)
+                if n in ancestors(api.G, parent):
+                    continue
+                for p in graph.parents(api.G, n):
+                    api.Edge.delete(p, n, 'parent')
+                api.Edge.create(parent, n, type='parent')
+        uids = sorted(api.G)
+        for _ in range(20):
+            a, b = rand.choice(uids), rand.choice(uids)
+            shared = [n for n in ancestors(api.G, a)
+                      if n in ancestors(api.G, b)]
+            assert api.lca.lca(a, b) == (shared[0] if shared else None)
+
+
+def test_leaves_kept_beside(G):
+    api = fileapi.FileAPI(G)
+    index = api.lca
+    assert index.lca(4, 7) == 1
+    table = index._table
+    a = api.Node.create(7)
+    b = api.Node.create(a)
+    c = api.Node.create()
+    api.Edge.delete(6, 8)
+    api.Edge.create(5, 8, type='parent')
+    api.Node.delete(4)
+    assert index.lca(b, 8) == 1
+    assert index.lca(b, a, 7) == 7
+    assert index.lca(8, 5) == 5
+    assert index.lca(c, 1) is None
+    assert index.depth(b) == 5
+    with pytest.raises(KeyError):
+        index.lca(4, 5)
+    assert index._table is table
+    api.Node.delete(2)  # Has children, so the tour is rebuilt
+    assert index.lca(b, 3) == 3
+    assert index._table is not table
+    assert index.lca(5, 8) == 5
+
+
+def test_algorithms(G):
+    api = fileapi.FileAPI(G)
+    assert api.Graph.algorithm('common_ancestor', nodes='4, 7') == 1
+    assert api.Graph.algorithm('common_ancestor', nodes=[7, 8]) == 6
+    with pytest.raises(NotFoundError):
+        api.Graph.common_ancestor('4,10')
+    with pytest.raises(ValueError):
+        api.Graph.common_ancestor('')
+    api.Graph.lca = None  # Built for the query instead
+    assert api.Graph.common_ancestor('5,4') == 2
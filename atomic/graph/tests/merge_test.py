@@ -0,0 +1,78 @@
+import copy
+
+import networkx as nx
+
+from atomic.graph import merge
+
+
+def snapshot():
+    G = nx.MultiDiGraph()
+    for uid, name in enumerate(('a', 'b', 'c'), 1):
+        G.add_node(uid, uid=uid, name=name, priority=uid)
+    G.add_edge(1, 2, 'parent', src=1, dst=2, type='parent')
+    G.add_edge(1, 3, 'parent', src=1, dst=3, type='parent')
+    return G
+
+
+def test_fingerprint():
+    assert merge.fingerprint({'a': 1, 'b': 2}) == \
+        merge.fingerprint({'b': 2, 'a': 1})
+    assert merge.fingerprint({'a': 1}) != merge.fingerprint({'a': '1'})
+
+
+def test_diff():
+    old, new = snapshot(), snapshot()
+    new.node[2]['name'] = 'B'
+    new.remove_node(3)
+    new.add_node(4, uid=4, name='d')
+    new.add_edge(1, 4, 'parent', src=1, dst=4, type='parent')
+    new.add_edge(1, 4, 'related', src=1, dst=4, type='related')
+    new.edge[1][2]['parent']['weight'] = 2
+    nodes, edges = merge.diff(old, new)
+    assert nodes == merge.Diff([4], [3], [2])
+    assert edges == merge.Diff([(1, 4, 'parent'), (1, 4, 'related')],
+                               [(1, 3, 'parent')], [(1, 2, 'parent')])
+    assert merge.changes(old, new, (1, 2, 'parent'), 'edge') == \
+        [{'op': 'add', 'path': '/weight', 'value': 2}]
+    assert merge.changes(old, new, 2) == \
+        [{'op': 'replace', 'path': '/name', 'value': 'B'}]
+    assert merge.diff(old, copy.deepcopy(old)) == (merge.Diff([], [], []),) * 2
+
+
+def test_merge3():
+    base, ours, theirs = snapshot(), snapshot(), snapshot()
+    ours.node[1]['name'] = 'A'
+    theirs.node[1]['priority'] = 10  # Different fields merge
+    theirs.node[2]['name'] = 'B'
+    theirs.remove_node(3)
+    ours.add_node(4, uid=4, name='ours')
+    theirs.add_node(4, uid=4, name='theirs')  # Renumbered
+    theirs.add_edge(2, 4, 'parent', src=2, dst=4, type='parent')
+    theirs.add_edge(1, 2, 'related', src=1, dst=2, type='related')
+
+    merged, conflicts = merge.merge3(base, ours, theirs)
+    assert conflicts == []
+    assert merged.node[1] == {'uid': 1, 'name': 'A', 'priority': 10}
+    assert merged.node[2]['name'] == 'B'
+    assert 3 not in merged
+    assert merged.node[4]['name'] == 'ours'
+    assert merged.node[5] == {'uid': 5, 'name': 'theirs'}
+    assert sorted(merged.edges(keys=True)) == [
+        (1, 2, 'parent'), (1, 2, 'related'), (2, 5, 'parent')]
+    assert merged.edge[2][5]['parent']['dst'] == 5
+
+
+def test_merge3_conflicts():
+    base, ours, theirs = snapshot(), snapshot(), snapshot()
+    ours.node[1]['name'] = 'ours'
+    theirs.node[1]['name'] = 'theirs'
+    ours.remove_node(2)
+    theirs.node[2]['priority'] = 0
+    merged, conflicts = merge.merge3(base, ours, theirs)
+    assert conflicts == [
+        merge.Conflict('node', 1, 'name', 'ours', 'theirs'),
+        merge.Conflict('node', 2, None, None, theirs.node[2]),
+    ]
+    assert merged.node[1]['name'] == 'ours'
+    assert merged.node[2]['priority'] == 0
+    assert (1, 2) not in merged.edges()  # We deleted it, they left it be
@@ -0,0 +1,82 @@
+import random
+
+import networkx as nx
+
+from atomic.darkmatter import fileapi
+from atomic.graph import merkle
+
+
+def tree():
+    api = fileapi.FileAPI(nx.MultiDiGraph())
+    a = api.Node.create(name='a')
+    b = api.Node.create(a, name='b')
+    api.Node.create(b, name='c')
+    api.Node.create(a, name='d')
+    return api
+
+
+def rebuilt(G):
+    index = merkle.MerkleIndex()
+    index.rebuild(G)
+    return index
+
+
+def test_digests():
+    api = tree()
+    digests = {n: api.merkle.digest(n) for n in api.G}
+    root = api.merkle.root()
+
+    api.Node.patch(3, done=True)  # Reaches the ancestors only
+    assert api.merkle.digest(4) == digests[4]
+    assert all(api.merkle.digest(n) != digests[n] for n in (1, 2, 3))
+    assert api.merkle.root() != root
+
+    api.Node.patch(3, done=None)
+    assert {n: api.merkle.digest(n) for n in api.G} == digests
+    assert api.merkle.root() == root
+
+    # Related edges don't count; unlinking and relinking restores it
+    api.Edge.create(4, 3)
+    assert api.merkle.root() == root
+    api.Edge.delete(2, 3)
+    assert api.merkle.digest(1) != digests[1]
+    api.Edge.create(2, 3, type='parent')
+    assert api.merkle.root() == root
+    assert api.merkle.digest(5) is None
+
+
+def test_matches_rebuild():
+    rand = random.Random(0)
+    api = tree()
+    for _ in range(300):
+        uids = sorted(api.G)
+        op = rand.randrange(5)
+        if op == 0 or len(uids) < 3:
+            api.Node.create(rand.choice(uids), name=str(rand.randrange(5)))
+        elif op == 1:
+            api.Node.patch(rand.choice(uids), name=str(rand.randrange(5)))
+        elif op == 2:
+            api.Node.delete(rand.choice(uids))
+        else:
+            src, dst = rand.sample(uids, 2)
+            if nx.has_path(api.G, dst, src):
+                continue  # Keep it acyclic
+            if api.G.has_edge(src, dst):
+                api.Edge.delete(src, dst)
+            else:
+                api.Edge.create(src, dst, type=rand.choice(('parent',
+                                                            'related')))
+        index = rebuilt(api.G)
+        assert index._hash == api.merkle._hash
+        assert index.root() == api.merkle.root()
+
+
+def test_changed():
+    a = tree()
+    b = tree()
+    assert list(merkle.changed(a.merkle, b.merkle)) == []
+    b.Node.patch(3, name='C')
+    b.Node.create(1, name='e')
+    assert sorted(merkle.changed(a.merkle, b.merkle)) == [1, 3, 5]
+    b.Edge.delete(1, 4)  # Unlinked, not changed itself
+    assert sorted(merkle.changed(a.merkle, b.merkle)) == [1, 3, 5]
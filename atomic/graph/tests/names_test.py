@@ -0,0 +1,68 @@
+import json
+
+import networkx as nx
+
+from atomic.darkmatter import fileapi
+from atomic.graph import names
+
+
+def outline():
+    api = fileapi.FileAPI(nx.MultiDiGraph())
+    a = api.Node.create(name='a')
+    b = api.Node.create(a, name='b')
+    api.Node.create(b, name='c')
+    api.Node.create(name='b')
+    return api
+
+
+def test_paths():
+    api = outline()
+    assert api.names.get(('a', 'b', 'c')) == [3]
+    assert api.names.get(('b',)) == [4]
+    assert api.names.get(('c',)) == []
+    assert api.names.path(2) == ('a', 'b')
+    assert api.names.path(5) is None
+
+
+def test_changes():
+    api = outline()
+    api.Node.update(2, name='x')  # Renames reach descendants
+    assert api.names.path(3) == ('a', 'x', 'c')
+    api.Edge.create(4, 3, type='parent')  # The lowest parent wins
+    assert api.names.path(3) == ('a', 'x', 'c')
+    api.Node.delete(2)
+    assert api.names.get(('b', 'c')) == [3]
+    assert api.names.get(('a', 'x')) == []
+    api.Edge.delete(4, 3)
+    assert api.names.path(3) == ('c',)
+    api.Edge.create(3, 1, type='parent')
+    api.Edge.create(1, 3, type='parent')  # A cycle
+    assert api.names.path(1) == ('c', 'a')
+    assert api.names.path(3) == ('a', 'c')
+    api.Node.update(1, name='z')
+    assert api.names.get(('z', 'c')) == [3]
+
+
+def test_persisted(tmpdir):
+    path = str(tmpdir.join('graph.json'))
+    api = outline()
+    api.names.path(1)
+    api.Node.create(1, name='d')  # Stale when saved
+    fileapi._save(api.G, path)
+    with open(path) as f:
+        state = json.load(f)['graph'][names.KEY]
+    # Only each node's parent is saved, and paths derived from them
+    assert state['parents'] == {'1': None, '2': 1, '3': 2, '4': None,
+                                '5': None}
+
+    index = names.NameIndex()
+    index.rebuild(fileapi._load(path))
+    assert not index._stale.keys() - {5}
+    assert index.get(('a', 'd')) == [5]
+    assert index.path(3) == ('a', 'b', 'c')
+
+    G = fileapi._load(path)
+    G.add_node(6, name='e')  # Out of sync, so it's rebuilt
+    index.rebuild(G)
+    assert index.get(('e',)) == [6]
+    assert len(index) == 6
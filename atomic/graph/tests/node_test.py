@@ -1,7 +1,7 @@
 import unittest
 from textwrap import dedent
 
-from atomic.graph.graph import Node
+from atomic.graph.graph import Action, Edge, Node
 
 
 class NodeTestCase(unittest.TestCase):
@@ -19,3 +19,29 @@ class NodeTestCase(unittest.TestCase):
             """).strip()
         obs = str(Node(node))
         self.assertEqual(exp, obs)
+
+    def test_node_overflow_attributes(self):
+        a = Node(1, name='a', due='today')
+        b = Node(2, name='b', due='tomorrow')
+        self.assertFalse(hasattr(a, '__dict__'))
+        self.assertIs(a._shape, b._shape)  # Attribute names are shared
+        self.assertEqual('tomorrow', b.due)
+        b.due = 'never'
+        self.assertEqual({'uid': 2, 'name': 'b', 'due': 'never'},
+                         b.to_json())
+        del a.name
+        self.assertEqual({'uid': 1, 'due': 'today'}, a.to_json())
+        with self.assertRaises(AttributeError):
+            a.name
+
+    def test_action_slots(self):
+        action = Action(3, name='do it', time_estd=60, tag='')
+        self.assertEqual({'uid': 3, 'name': 'do it', 'body': None,
+                          'time_estd': 60, 'time_spent': None,
+                          'done': False, 'tag': ''},
+                         action.to_json())
+
+    def test_edge(self):
+        edge = Edge(1, 2, 'parent_of', weight=3)
+        self.assertEqual({'src': 1, 'dst': 2, 'type': 'parent_of',
+                          'weight': 3}, edge.to_json())
@@ -0,0 +1,106 @@
+import pytest
+
+from atomic.errors import PatchError
+from atomic.graph import patch
+
+
+# Examples from RFC 6902, Appendix A
+@pytest.mark.parametrize('doc,ops,exp', [
+    ({'foo': 'bar'},
+     [{'op': 'add', 'path': '/baz', 'value': 'qux'}],
+     {'baz': 'qux', 'foo': 'bar'}),
+    ({'foo': ['bar', 'baz']},
+     [{'op': 'add', 'path': '/foo/1', 'value': 'qux'}],
+     {'foo': ['bar', 'qux', 'baz']}),
+    ({'baz': 'qux', 'foo': 'bar'},
+     [{'op': 'remove', 'path': '/baz'}],
+     {'foo': 'bar'}),
+    ({'foo': ['bar', 'qux', 'baz']},
+     [{'op': 'remove', 'path': '/foo/1'}],
+     {'foo': ['bar', 'baz']}),
+    ({'baz': 'qux', 'foo': 'bar'},
+     [{'op': 'replace', 'path': '/baz', 'value': 'boo'}],
+     {'baz': 'boo', 'foo': 'bar'}),
+    ({'foo': {'bar': 'baz', 'waldo': 'fred'}, 'qux': {'corge': 'grault'}},
+     [{'op': 'move', 'from': '/foo/waldo', 'path': '/qux/thud'}],
+     {'foo': {'bar': 'baz'}, 'qux': {'corge': 'grault', 'thud': 'fred'}}),
+    ({'foo': ['all', 'grass', 'cows', 'eat']},
+     [{'op': 'move', 'from': '/foo/1', 'path': '/foo/3'}],
+     {'foo': ['all', 'cows', 'eat', 'grass']}),
+    ({'foo': 'bar'},
+     [{'op': 'add', 'path': '/child', 'value': {'grandchild': {}}}],
+     {'foo': 'bar', 'child': {'grandchild': {}}}),
+    ({'foo': ['bar']},
+     [{'op': 'add', 'path': '/foo/-', 'value': ['abc', 'def']}],
+     {'foo': ['bar', ['abc', 'def']]}),
+    ({'/': 9, '~1': 10},
+     [{'op': 'test', 'path': '/~01', 'value': 10},
+      {'op': 'copy', 'from': '/~1', 'path': '/a'}],
+     {'/': 9, '~1': 10, 'a': 9}),
+])
+def test_json_patch(doc, ops, exp):
+    before = repr(doc)
+    assert patch.Patch(ops).apply(doc) == exp
+    assert repr(doc) == before  # Original is untouched
+
+
+@pytest.mark.parametrize('doc,ops', [
+    ({'baz': 'qux', 'foo': ['a', 2, 'c']},
+     [{'op': 'test', 'path': '/baz', 'value': 'bar'}]),
+    ({'foo': 'bar'}, [{'op': 'add', 'path': '/baz/bat', 'value': 'qux'}]),
+    ({'foo': 'bar'}, [{'op': 'remove', 'path': '/nope'}]),
+    ({'foo': [1]}, [{'op': 'add', 'path': '/foo/01', 'value': 2}]),
+    ({'foo': [1]}, [{'op': 'add', 'path': '/foo/1', 'value': 2},
+                    {'op': 'test', 'path': '/foo/0', 'value': 2}]),
+])
+def test_json_patch_errors(doc, ops):
+    before = repr(doc)
+    with pytest.raises(PatchError):
+        patch.Patch(ops).apply(doc)
+    assert repr(doc) == before
+
+
+@pytest.mark.parametrize('ops', [
+    [{'op': 'frobnicate', 'path': '/a'}],
+    [{'op': 'add', 'value': 1}],
+    [{'op': 'add', 'path': 'a', 'value': 1}],
+    [{'op': 'move', 'path': '/a/b'}],
+    [{'op': 'move', 'from': '/a', 'path': '/a/b'}],
+])
+def test_compile_errors(ops):
+    with pytest.raises(PatchError):
+        patch.Patch(ops)
+
+
+# Examples from RFC 7386, Appendix A
+@pytest.mark.parametrize('target,merge,exp', [
+    ({'a': 'b'}, {'a': 'c'}, {'a': 'c'}),
+    ({'a': 'b'}, {'b': 'c'}, {'a': 'b', 'b': 'c'}),
+    ({'a': 'b'}, {'a': None}, {}),
+    ({'a': 'b', 'b': 'c'}, {'a': None}, {'b': 'c'}),
+    ({'a': ['b']}, {'a': 'c'}, {'a': 'c'}),
+    ({'a': {'b': 'c'}}, {'a': {'b': 'd', 'c': None}}, {'a': {'b': 'd'}}),
+    ({'a': [{'b': 'c'}]}, {'a': [1]}, {'a': [1]}),
+    ({'e': None}, {'a': 1}, {'e': None, 'a': 1}),
+    ({}, {'a': {'bb': {'ccc': None}}}, {'a': {'bb': {}}}),
+])
+def test_merge_patch(target, merge, exp):
+    assert patch.merge_patch(target, merge) == exp
+    assert patch.Patch(merge=merge).apply(target) == exp
+
+
+def test_diff():
+    doc = {'uid': 1, 'name': 'a', 'gone': 1, 'nested': {'x': 1, 'y': 2}}
+    p = patch.Patch([{'op': 'add', 'path': '/nested/z', 'value': 3}],
+                    merge={'name': 'b', 'gone': None, 'new': True})
+    new, changes = p.apply_with_diff(doc)
+    assert new == {'uid': 1, 'name': 'b', 'new': True,
+                   'nested': {'x': 1, 'y': 2, 'z': 3}}
+    assert changes == [
+        {'op': 'remove', 'path': '/gone'},
+        {'op': 'replace', 'path': '/name', 'value': 'b'},
+        {'op': 'add', 'path': '/nested/z', 'value': 3},
+        {'op': 'add', 'path': '/new', 'value': True},
+    ]
+    assert p.keys == {'name', 'gone', 'nested', 'new'}
+    assert patch.diff(doc, doc) == []
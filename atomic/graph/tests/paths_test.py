@@ -0,0 +1,85 @@
+import random
+
+import networkx as nx
+import pytest
+
+from atomic.darkmatter import fileapi
+from atomic.errors import NotFoundError
+from atomic.graph import paths, store
+
+
+def random_graph(seed, n=40, m=120):
+    rand = random.Random(seed)
+    G, H = store.Graph(), nx.DiGraph()
+    for uid in range(1, n + 1):
+        G.add_node(uid, uid=uid)
+        H.add_node(uid)
+    for _ in range(m):
+        u, v = rand.sample(range(1, n + 1), 2)
+        kind = rand.choice(('parent', 'related'))
+        capacity = rand.randint(1, 9)
+        G.add_edge(u, v, type=kind, capacity=capacity)
+        if kind == 'parent':
+            H.add_edge(u, v, capacity=capacity)
+    return rand, G, H
+
+
+def test_shortest():
+    for seed in range(5):
+        rand, G, H = random_graph(seed)
+        for _ in range(30):
+            u, v = rand.sample(range(1, 41), 2)
+            found = paths.shortest(G, u, v, ['parent'])
+            if nx.has_path(H, u, v):
+                assert len(found) == nx.shortest_path_length(H, u, v) + 1
+                assert found[0] == u and found[-1] == v
+                assert all(H.has_edge(a, b) for a, b in zip(found,
+                                                            found[1:]))
+            else:
+                assert found is None
+    assert paths.shortest(G, 3, 3) == [3]
+
+
+def test_max_flow():
+    for seed in range(5):
+        rand, G, H = random_graph(seed)
+        for _ in range(10):
+            u, v = rand.sample(range(1, 41), 2)
+            flow = paths.max_flow(G, u, v, ['parent'])
+            assert flow.value == nx.maximum_flow_value(H, u, v)
+            assert sum(G.edge[a][b]['parent']['capacity']
+                       for a, b in flow.cut) == flow.value
+    with pytest.raises(ValueError):
+        paths.max_flow(G, 1, 1)
+
+
+def test_longest():
+    G = store.Graph()
+    for uid, estimate in enumerate(('1h', '2h', '30m', '4h', None), 1):
+        G.add_node(uid, uid=uid, time_estd=estimate)
+    for u, v in ((1, 2), (2, 4), (1, 3), (3, 4), (4, 5)):
+        G.add_edge(u, v, type='precedes')
+    G.add_edge(5, 1, type='related')
+    assert paths.longest(G) == ([1, 2, 4], 7 * 3600)  # 5 adds nothing
+    assert paths.longest(G, src=3) == ([3, 4], 4.5 * 3600)
+    assert paths.longest(G, dst=3) == ([1, 3], 1.5 * 3600)
+    assert paths.longest(G, src=2, dst=3) == (None, 0)
+    with pytest.raises(ValueError):
+        paths.longest(G, edge_types=None)  # The related edge closes a cycle
+
+
+def test_api(G):
+    api = fileapi.FileAPI(G)
+    api.Edge.create(4, 5, type='related', capacity=2)
+    assert api.Graph.path('shortest', src='1', dst='7') == [1, 3, 6, 7]
+    assert api.Graph.path('shortest', src=1, dst=5, type='related,parent') \
+        == [1, 2, 5]
+    with pytest.raises(NotFoundError):
+        api.Graph.path('shortest', src=7, dst=1)
+    with pytest.raises(NotFoundError):
+        api.Graph.path('widest', src=7, dst=1)
+    assert api.Graph.path('longest', type='parent', weight='uid') == {
+        'path': [1, 3, 6, 8], 'length': 18}
+    assert api.Graph.path('maxflow', src=2, dst=5) == {
+        'value': 2, 'flows': [(2, 4, 1), (2, 5, 1), (4, 5, 1)],
+        'cut': [(2, 4), (2, 5)]}
@@ -0,0 +1,52 @@
+import random
+
+import networkx as nx
+import pytest
+
+from atomic.darkmatter import fileapi
+from atomic.graph import rank
+
+pytest.importorskip('scipy')
+
+
+def test_matches_networkx():
+    rand = random.Random(0)
+    api = fileapi.FileAPI()
+    H = nx.DiGraph()
+    for _ in range(60):
+        H.add_node(api.Node.create())
+    for _ in range(150):
+        src, dst = rand.sample(sorted(api.G), 2)
+        kind = rand.choice(('precedes', 'related', 'parent'))
+        if api.Edge.get(src, dst, kind) is not None:
+            continue
+        api.Edge.create(src, dst, type=kind)
+        if kind != 'parent':  # Importance flows back along the edge
+            H.add_edge(dst, src, weight=H.get_edge_data(dst, src, {}).get(
+                'weight', 0) + 1)
+        if kind == 'related':
+            H.add_edge(src, dst, weight=H.get_edge_data(src, dst, {}).get(
+                'weight', 0) + 1)
+    expected = nx.pagerank(H, tol=1e-12, max_iter=1000)
+    index = api.add_index(rank.RankIndex(iterations=1000))
+    for uid, score in index.scores().items():
+        assert score == pytest.approx(expected[uid] * len(H))
+    assert index.score(index.ranked()[0]) == max(index.scores().values())
+
+
+def test_refresh():
+    api = fileapi.FileAPI()
+    a, b, c = api.Node.create(), api.Node.create(), api.Node.create()
+    api.Edge.create(a, b, type='precedes')
+    api.Edge.create(b, c, type='precedes')
+    index = rank.RankIndex(tolerance=0.5)
+    api.add_index(index)
+    assert index.ranked() == [a, b, c]
+    before = index.scores()
+    d = api.Node.create()  # One change in two edges; kept
+    assert index.scores() is before
+    assert index.score(d) == before[c] == min(before.values())
+    api.Edge.create(d, a, type='precedes')  # Two changes; recomputed
+    assert index.ranked() == [d, a, b, c]
+    api.Node.delete(d)
+    assert d not in index.scores()
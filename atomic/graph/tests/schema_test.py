@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from atomic.errors import ValidationError
+from atomic.graph import schema
+
+
+@pytest.mark.parametrize('coercer,value,exp', [
+    (schema.to_int, '3', 3),
+    (schema.to_int, 4.0, 4),
+    (schema.to_bool, '', True),
+    (schema.to_bool, 'No', False),
+    (schema.to_bool, 0, False),
+    (schema.to_datetime, '2016 Oct 16', datetime(2016, 10, 16)),
+    (schema.to_datetime, '2016-10-16T08:52:00', datetime(2016, 10, 16, 8, 52)),
+    (schema.to_interval, '1h30m', timedelta(minutes=90)),
+    (schema.to_interval, 60, timedelta(minutes=1)),
+    (schema.to_list, 'a, b', ['a', 'b']),
+])
+def test_coercers(coercer, value, exp):
+    assert coercer(value) == exp
+    assert coercer(exp) == exp  # Idempotent
+
+
+def test_coerce():
+    attrs = {'type': 'action', 'name': 'a', 'priority': '2',
+             'time_estd': '2h', 'done': '', 'due': None, 'extra': '3'}
+    assert schema.coerce(attrs) == {
+        'type': 'action', 'name': 'a', 'priority': 2,
+        'time_estd': timedelta(hours=2), 'done': True, 'due': None,
+        'extra': '3'}
+    assert attrs['priority'] == '2'  # Untouched
+    untyped = {'priority': '2'}
+    assert schema.coerce(untyped) is untyped
+    assert schema.coerce({'type': 'Todo', 'tags': 'a,b'})['tags'] == \
+        ['a', 'b']
+
+
+@pytest.mark.parametrize('attrs', [
+    {'type': 'Action', 'priority': 'high'},
+    {'type': 'Action', 'priority': True},
+    {'type': 'Action', 'done': 'maybe'},
+    {'type': 'Action', 'due': 'someday'},
+    {'type': 'Todo', 'timelog': 'forever'},
+])
+def test_coerce_errors(attrs):
+    with pytest.raises(ValidationError):
+        schema.coerce(attrs)
+
+
+def test_encode_round_trip():
+    attrs = {'type': 'Action', 'due': datetime(2016, 10, 16, 8, 52),
+             'time_spent': timedelta(minutes=5)}
+    encoded = {k: schema.encode(v) if k != 'type' else v
+               for k, v in attrs.items()}
+    assert encoded == {'type': 'Action', 'due': '2016-10-16T08:52:00',
+                       'time_spent': 300}
+    assert schema.coerce(encoded) == attrs
@@ -1,6 +1,6 @@
 import pytest
 
-from atomic import graph
+from atomic.graph import graph
 
 
 @pytest.mark.xfail(reason="Things have changed.")
@@ -31,3 +31,16 @@ def test_dfs_depth(G):
     }
     obs = set(graph.hierarchy(G))
     assert obs == exp
+
+
+def test_neighborhood(G):
+    G.add_edge(5, 3, 'related', type='related')
+    assert graph.neighborhood(G, 2) == {2: 0, 1: 1, 4: 1, 5: 1}
+    assert graph.neighborhood(G, 2, hops=2) == {
+        2: 0, 1: 1, 4: 1, 5: 1, 3: 2}
+    assert graph.neighborhood(G, 3, 2, direction='in') == {3: 0, 1: 1, 5: 1,
+                                                           2: 2}
+    assert graph.neighborhood(G, 3, 2, ['related'], 'in') == {3: 0, 5: 1}
+    assert graph.neighborhood(G, 3, 0) == {3: 0}
+    with pytest.raises(ValueError):
+        graph.neighborhood(G, 3, direction='up')
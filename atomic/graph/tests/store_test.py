@@ -0,0 +1,102 @@
+import copy
+import json
+import random
+
+import networkx as nx
+import pytest
+from networkx.readwrite import json_graph
+
+from atomic.graph import graph, store
+
+
+def state(G):
+    return (sorted(G.nodes(data=True)),
+            sorted(G.edges(keys=True, data=True)),
+            {n: sorted(G.pred[n]) for n in G},
+            {n: sorted((m, dict(keys)) for m, keys in G.succ[n].items())
+             for n in G})
+
+
+def test_matches_networkx():
+    rand = random.Random(0)
+    G, H = store.Graph(), nx.MultiDiGraph()
+    for i in range(3000):
+        op = rand.randrange(7)
+        u, v = rand.randrange(30), rand.randrange(30)
+        kind = rand.choice(('parent', 'related', 'precedes'))
+        for g in (G, H):
+            if op == 0:
+                g.add_node(u, attr_dict={'uid': u}, i=i)
+            elif op == 1 and u in g:
+                g.remove_node(u)
+            elif op in (2, 3):
+                g.add_edge(u, v, kind, type=kind)
+            elif op == 4 and g.has_edge(u, v, kind):
+                g.remove_edge(u, v, kind)
+            elif op == 5 and g.has_edge(u, v):
+                g.remove_edge(u, v)  # The latest
+            elif op == 6 and g.has_edge(u, v, kind):
+                g.edge[u][v][kind]['weight'] = i
+        assert len(G) == len(H)
+        assert G.number_of_edges() == H.number_of_edges()
+        assert G.number_of_edges(u, v) == H.number_of_edges(u, v)
+        assert G.get_edge_data(u, v, kind) == H.get_edge_data(u, v, kind)
+    assert state(G) == state(H)
+    for n in G:
+        assert sorted(G.in_edges(n, keys=True)) == \
+            sorted(H.in_edges(n, keys=True))
+        assert sorted(G.out_edges(n, keys=True, data=True)) == \
+            sorted(H.out_edges(n, keys=True, data=True))
+    assert list(graph.hierarchy(G)) == list(graph.hierarchy(H))
+
+
+def test_errors():
+    G = store.Graph()
+    G.add_edge(1, 2)
+    with pytest.raises(KeyError):
+        G.edge[3]
+    with pytest.raises(KeyError):
+        G.edge[2][1]
+    with pytest.raises(KeyError):
+        G.edge[1][2]['parent']
+    with pytest.raises(nx.NetworkXError):
+        G.remove_edge(2, 1)
+    with pytest.raises(nx.NetworkXError):
+        G.remove_edge(1, 2, 'parent')
+    with pytest.raises(nx.NetworkXError):
+        G.remove_node(3)
+    assert 2 in G.pred and 1 in G.pred[2] and 2 not in G.pred[1]
+    with pytest.raises(TypeError):
+        G.succ[2][3] = {}  # Shared by nodes without successors
+
+
+def test_copy():
+    G = store.Graph()
+    G.add_edge(1, 2, type='parent')
+    G.add_node(3)
+    H = nx.MultiDiGraph()
+    H.add_edge(1, 2, 'parent', type='parent')
+    H.add_node(3)
+    assert copy.deepcopy((G.node, G.succ, G.pred)) == (H.node, H.succ, H.pred)
+
+
+def test_node_link():
+    G = store.Graph(name='g')
+    G.add_node(1, name='a')
+    G.add_edge(1, 2, type='parent')
+    data = json.loads(json.dumps(json_graph.node_link_data(G)))
+    assert state(store.Graph.from_node_link(data)) == state(G)
+    assert state(json_graph.node_link_graph(data)) == state(G)
+
+
+def test_to_networkx():
+    G = store.Graph()
+    G.add_edge(1, 2, type='parent')
+    view = G.to_networkx()
+    assert G.to_networkx() is view
+    G.edge[1][2]['parent']['w'] = 1  # Attributes are shared
+    assert view.edge[1][2] == {'parent': {'type': 'parent', 'w': 1}}
+    G.add_edge(2, 3)
+    assert G.to_networkx() is not view
+    assert list(nx.topological_sort(G.to_networkx())) == [1, 2, 3]
+    assert store.as_networkx(view) is view
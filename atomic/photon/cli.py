@@ -7,12 +7,14 @@ Command line interface.
 """
 import argparse
 import inspect
+import json
+import os
 import sys
 
-from atomic.darkmatter import fileapi
+from atomic.darkmatter import fileapi, server
 from atomic.errors import AtomicError
-from atomic.graph import graph
-from atomic.utils import log, display, parse
+from atomic.graph import graph, merge, schema
+from atomic.utils import log, display, export, parse
 
 
 class Reactor:
@@ -123,10 +125,8 @@ class Reactor:
                 exist.
         """
         attrs = self._parse_name_kvs(args)
-        uid = self.api.Node.create(**attrs)
+        uid = self.api.Node.create(parent, **attrs)
         self._print("Added node %d " % uid)
-        if parent:
-            self.api.Edge.create(uid, parent, type=graph.EdgeTypes.parent.name)
         return uid
 
     def _parse_name_kvs(self, args):
@@ -143,9 +143,7 @@ class Reactor:
             dict: Dictionary containing a 'name' key, if present, and a any and
                 all parsed key-values and tags.
         """
-        line = ' '.join(args)  # Rejoin args for regex parsing
-        name = parse.parse_non_kv(line)
-        kvs = parse.parse_key_values(line[len(name):])
+        name, kvs = parse.parse_name_kvs(args)
         if name:
             kvs.setdefault('name', name)
         return kvs
@@ -155,16 +153,24 @@ class Reactor:
 
         Examples:
             atomic show <nodeID>
+            atomic show <nodeID> --fields name,due
+            atomic show <nodeID> --at "2016 Oct 16 08:52"
         """
         p_show = subparser.add_parser('show', help=self.show_cmd.__doc__)
         p_show.add_argument('uid', help='Node to show', type=int)
+        p_show.add_argument('-f', '--fields', help='Comma-separated fields',
+                            type=parse.parse_csv)
+        p_show.add_argument('--at', help='Show the node as it was then')
         p_show.set_defaults(func=self.show)
 
-    def show(self, uid: int, **kwargs):
+    def show(self, uid: int, fields=None, at=None, **kwargs):
         """Show details about a Node in the graph.
 
         Arguments:
             uid (int): ID of the node.
+            fields (list[str], optional): Attributes to retrieve; all if None.
+            at (str, optional): Time to show the node as of, from its
+                history; shorthand like 'Oct 16' is filled in from today.
             **kwargs: Spillover keywords arguments from the passed
                 :class:`.argparse.Namespace` object.
 
@@ -172,9 +178,19 @@ class Reactor:
             dict: The retrieved node.
 
         Raises:
-            AtomicError: If the node doesn't exist.
+            AtomicError: If the node doesn't exist, or didn't at that time.
         """
-        n = self.api.Node.get(uid)
+        if at is None:
+            n = self.api.Node.get(uid, fields=fields)
+        else:
+            if self.api.history is None:
+                raise AtomicError("The graph has no history")
+            try:
+                when = parse.smart_date(at, schema.DATETIME_FORMATS)
+            except ValueError as e:
+                raise AtomicError("Unrecognized time '%s'" % at) from e
+            G = self.api.history.as_of(when)
+            n = graph.project(G.node.get(uid), fields)
         if n is None:
             raise AtomicError("Node %d not found" % uid)
         self._print(graph.Node(**n))  # Convert to Node object for display
@@ -187,14 +203,34 @@ class Reactor:
             atomic list
             atomic list key=value
             atomic list q=Lucene||Solr, haven't decided
+            atomic list --sort importance
         """
         p_list = subparser.add_parser(
             'list', help=self.list_cmd.__doc__, aliases=['ls'])
+        p_list.add_argument('--sort', choices=['importance'],
+                            help='List flat, highest first, rather than as '
+                            'a tree')
         p_list.set_defaults(func=self.list)
 
-    def list(self, **kwargs):
+    def list(self, sort=None, **kwargs):
+        """List nodes as a tree, or sorted by a computed attribute.
+
+        Arguments:
+            sort (str, optional): 'importance' lists nodes most important
+                first, each with its score; see
+                :class:`~atomic.graph.rank.RankIndex`.
+
+        Returns:
+            list: (node, depth) pairs, as listed.
+        """
         self.logger.debug("Listing nodes")
         nodes = list(self.api.Node.get())  # Grab all nodes
+        if sort == 'importance' and nodes:
+            scores = self.api.importance.scores()
+            # Copies, so the scores aren't stored with the nodes
+            nodes = [(dict(n, importance=round(scores[n['uid']], 3)), 0)
+                     for n, _ in nodes]
+            nodes.sort(key=lambda item: -item[0]['importance'])
         if not nodes:
             print("Nothing was found. Perhaps all is lost?")
             return []
@@ -255,7 +291,7 @@ class Reactor:
 
         Examples:
             atomic link node1 node2 parent [key=value,...]
-            atomic link --delete node1 node2
+            atomic link --delete node1 node2 parent
             atomic link node1 node2
         """
         p_link = subparser.add_parser(
@@ -273,11 +309,226 @@ class Reactor:
     def link(self, src, dst, type, args, delete=False, **kwargs):
         """Create, replace, or delete a link."""
         if delete:
-            self.api.Edge.delete(src, dst)
+            self.api.Edge.delete(src, dst, type)
         else:
-            key_values = parse.parse_key_values(' '.join(args))
+            _, key_values = parse.parse_name_kvs(args)
             return self.api.Edge.create(src, dst, type=type, **key_values)
 
+    def import_cmd(self, subparser):
+        """Import a markdown outline; list items become nodes.
+
+        Examples:
+            atomic import notes.md
+        """
+        p_import = subparser.add_parser('import', help=self.import_cmd.__doc__)
+        p_import.add_argument('path', help='Markdown file')
+        p_import.set_defaults(func=self.import_file)
+
+    def import_file(self, path, **kwargs):
+        """Import a markdown file, returning the created node ids.
+
+        Nested list items are linked to their parents, and headers become
+        tags; see :func:`~atomic.utils.parse.import_markdown`.
+        """
+        try:
+            with open(path) as f:
+                uids = parse.import_markdown(self.api, f)
+        except OSError as e:
+            raise AtomicError("Unable to read %s: %s" % (path, e)) from e
+        self._print("Imported %d nodes" % len(uids))
+        return uids
+
+    def export_cmd(self, subparser):
+        """Export the graph as a markdown outline.
+
+        Examples:
+            atomic export notes.md
+            atomic export notes.md --fields due priority --full
+        """
+        p_export = subparser.add_parser('export', help=self.export_cmd.__doc__)
+        p_export.add_argument('path', help='Markdown file')
+        p_export.add_argument('--fields', nargs='+',
+                              help='Attributes to list after names')
+        p_export.add_argument('--full', action='store_false',
+                              dest='incremental',
+                              help='Rewrite every section')
+        p_export.set_defaults(func=self.export_file)
+
+    def export_file(self, path, fields=None, incremental=True, **kwargs):
+        """Export the graph to a markdown file.
+
+        Sections unchanged since an earlier export to the same file are
+        kept as they were; see :func:`~atomic.utils.export.export_file`.
+        """
+        try:
+            counts = export.export_file(self.api.G, path, fields=fields,
+                                        incremental=incremental,
+                                        digest=self.api.merkle.digest)
+        except OSError as e:
+            raise AtomicError("Unable to write %s: %s" % (path, e)) from e
+        self._print("Wrote {written} sections; kept {kept}, removed "
+                    "{removed}".format(**counts))
+        return counts
+
+    def diff_cmd(self, subparser):
+        """Compare two graph files.
+
+        Examples:
+            atomic diff old.json
+            atomic diff old.json new.json
+        """
+        p_diff = subparser.add_parser('diff', help=self.diff_cmd.__doc__)
+        p_diff.add_argument('old', help='Earlier graph file')
+        p_diff.add_argument('new', nargs='?',
+                            help='Later graph file; the current graph if '
+                            'omitted')
+        p_diff.set_defaults(func=self.diff)
+
+    def diff(self, old, new=None, **kwargs):
+        """Print the nodes and edges added, removed and changed.
+
+        Returns:
+            (:class:`~atomic.graph.merge.Diff`,
+            :class:`~atomic.graph.merge.Diff`): Node and edge differences.
+        """
+        old_G = self._load_snapshot(old)
+        if new is None:
+            self.api.touch()
+            new_G = self.api.G
+        else:
+            new_G = self._load_snapshot(new)
+        nodes, edges = merge.diff(old_G, new_G)
+        for kind, delta in (('node', nodes), ('edge', edges)):
+            for key in delta.added:
+                self._print('+ ' + _label(new_G, kind, key))
+            for key in delta.removed:
+                self._print('- ' + _label(old_G, kind, key))
+            for key in delta.changed:
+                self._print('~ ' + _label(new_G, kind, key))
+                for op in merge.changes(old_G, new_G, key, kind):
+                    value = json.dumps(op['value'], default=str) \
+                        if 'value' in op else ''
+                    self._print('    %s %s %s' % (op['op'], op['path'], value))
+        return nodes, edges
+
+    def merge_cmd(self, subparser):
+        """Three-way merge another copy of the graph into this one.
+
+        Examples:
+            atomic merge base.json theirs.json
+        """
+        p_merge = subparser.add_parser('merge', help=self.merge_cmd.__doc__)
+        p_merge.add_argument('base', help='Graph file both copies started as')
+        p_merge.add_argument('theirs', help='Graph file to merge in')
+        p_merge.set_defaults(func=self.merge)
+
+    def merge(self, base, theirs, **kwargs):
+        """Merge changes made to another copy of the graph into this one.
+
+        Where both copies changed the same thing, this copy's change is kept
+        and the conflict printed; see :func:`~atomic.graph.merge.merge3`.
+
+        Returns:
+            list[:class:`~atomic.graph.merge.Conflict`]: Conflicts.
+        """
+        self.api.touch()
+        merged, conflicts = merge.merge3(self._load_snapshot(base), self.api.G,
+                                         self._load_snapshot(theirs))
+        self.api.reset(merged)
+        self._print("Merged; %d nodes and %d edges" % (
+            len(merged), merged.number_of_edges()))
+        for c in conflicts:
+            label = _label(merged, c.kind, c.key)
+            if c.field is None:
+                self._print("Conflict: %s deleted on one side; kept" % label)
+            else:
+                self._print("Conflict: %s %s: kept %r over %r" % (
+                    label, c.field, c.ours, c.theirs))
+        return conflicts
+
+    def _load_snapshot(self, path):
+        if not os.path.exists(path):
+            raise AtomicError("Graph file %s not found" % path)
+        try:
+            return fileapi._load(path)
+        except ValueError as e:
+            raise AtomicError("Unable to read %s: %s" % (path, e)) from e
+
+    def stats_cmd(self, subparser):
+        """Aggregate node attributes.
+
+        Examples:
+            atomic stats
+            atomic stats time_estd --undone --by tag
+            atomic stats priority --func mean --tag work
+            atomic stats time_spent --under 12
+        """
+        p_stats = subparser.add_parser('stats', help=self.stats_cmd.__doc__)
+        p_stats.add_argument('column', nargs='?', default=None,
+                             help='Attribute to aggregate; counts if omitted')
+        p_stats.add_argument('--func', dest='agg', default=None,
+                             help='sum, mean, count, min or max')
+        p_stats.add_argument('--by', help='Group by tag, done or priority')
+        p_stats.add_argument('--tag', help='Only nodes with this tag')
+        p_stats.add_argument('--under', type=int,
+                             help='Only this node and those below it')
+        done = p_stats.add_mutually_exclusive_group()
+        done.add_argument('--done', action='store_true', default=None,
+                          help='Only done nodes')
+        done.add_argument('--undone', action='store_false', dest='done',
+                          help='Only undone nodes')
+        p_stats.set_defaults(func=self.stats)
+
+    def stats(self, column=None, agg=None, by=None, tag=None, done=None,
+              under=None, **kwargs):
+        """Aggregate a node attribute, optionally grouped.
+
+        Intervals (``time_estd``, ``time_spent``) are reported in hours.
+        If ``under`` is given, only it and its descendants are included.
+
+        Returns:
+            float, or dict of group to float if ``by`` is given.
+        """
+        func = agg or ('sum' if column else 'count')
+        uids = None
+        if under is not None:
+            uids = [under] + self.api.Graph.descendants(under)
+        columns = self.api.columns
+        result = columns.aggregate(column, func=func, by=by,
+                                   where=columns.where(done=done, tag=tag,
+                                                       uids=uids))
+        scale = 3600 if column in ('time_estd', 'time_spent') and \
+            func != 'count' else 1
+        label = '%s(%s)' % (func, column or 'nodes')
+        if scale != 1:
+            label += ' hours'
+        if by is None:
+            self._print('%s: %g' % (label, result / scale))
+            return result
+        self._print('%s by %s:' % (label, by))
+        for group, value in sorted(result.items(), key=lambda kv: str(kv[0])):
+            self._print('  %s: %g' % (group, value / scale))
+        return result
+
+    def serve_cmd(self, subparser):
+        """Serve the graph over HTTP.
+
+        Examples:
+            atomic serve
+            atomic serve --host 0.0.0.0 --port 8000
+        """
+        p_serve = subparser.add_parser('serve', help=self.serve_cmd.__doc__)
+        p_serve.add_argument('--host', help='Interface to bind',
+                             default='127.0.0.1')
+        p_serve.add_argument('--port', help='Port to bind', type=int,
+                             default=8080)
+        p_serve.set_defaults(func=self.serve)
+
+    def serve(self, host='127.0.0.1', port=8080, **kwargs):
+        """Serve the backing API over HTTP until interrupted."""
+        self._print("Serving on http://%s:%d" % (host, port))
+        server.Server(self.api, host=host, port=port).run()
+
     def _print(self, *args, **kwargs):
         """Print to the instance's ``out`` attribute."""
         if "file" in kwargs:
@@ -285,6 +536,13 @@ class Reactor:
         print(*args, file=self.out, **kwargs)
 
 
+def _label(G, kind, key):
+    """Describe a node, by uid and name, or an edge."""
+    if kind == 'node':
+        return 'node %d %s' % (key, G.node.get(key, {}).get('name', ''))
+    return 'edge %d -> %d (%s)' % key
+
+
 def main():
     api = fileapi.FileAPI(persist=True)
     cli = Reactor(api).setup()
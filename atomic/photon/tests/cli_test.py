@@ -1,15 +1,19 @@
 import io
+import os
 import shlex
+import tempfile
 import unittest
 from collections import namedtuple
+from datetime import datetime
 from functools import partial
 from unittest.mock import patch
 
 import networkx as nx
 
-from atomic.darkmatter import fileapi
+from atomic.darkmatter import fileapi, history
 from atomic.photon import cli
 from atomic.errors import AtomicError
+from atomic.graph import columnar, rank
 
 
 def assert_dict_in_dict(a, b):
@@ -38,7 +42,7 @@ class ReactorTestCase(unittest.TestCase):
         cls.reactor = cli.Reactor(None).setup()
 
     def setUp(self):
-        self.G = nx.DiGraph()
+        self.G = nx.MultiDiGraph()
         self.api = fileapi.FileAPI(self.G)
         self.reactor.api = self.api
 
@@ -193,6 +197,15 @@ class ReactorTestCase(unittest.TestCase):
             exp={'uid': 1, 'name': 'basic'},
             err=None,
         ),
+        ShowTestCase(
+            name='fields',
+            history=[partial(fileapi.FileNodeAPI.create, name='fields',
+                             body='A long body')],
+            cli_args='show 1 --fields name',
+            func_kwargs={'uid': 1, 'fields': ['name']},
+            exp={'uid': 1, 'name': 'fields'},
+            err=None,
+        ),
     )
 
     def test_show_cmd(self):
@@ -220,6 +233,7 @@ class ReactorTestCase(unittest.TestCase):
             if isinstance(tc.err, SystemExit):
                 continue  # Skip tests for invalid CLI input
 
+            self.reset()
             for fn in tc.history:
                 fn(self.api.Node)
 
@@ -294,6 +308,23 @@ class ReactorTestCase(unittest.TestCase):
                         except SystemExit as e:  # Catches SystemExit
                             self.fail("Parser choked on: " % e)
 
+    @unittest.skipIf(rank.np is None, "Requires numpy and scipy")
+    def test_list_by_importance(self):
+        a, b, c = (self.api.Node.create(name=name) for name in 'abc')
+        self.api.Edge.create(c, b, type='precedes')
+        self.api.Edge.create(b, a, type='precedes')
+        self.reactor.out = io.StringIO()
+        try:
+            self.reactor.process(shlex.split('list --sort importance'))
+            nodes = self.reactor.list(sort='importance')
+        finally:
+            self.reactor.out = cli.sys.stdout
+        self.assertEqual([(n['name'], depth) for n, depth in nodes],
+                         [('c', 0), ('b', 0), ('a', 0)])
+        self.assertGreater(nodes[0][0]['importance'],
+                           nodes[1][0]['importance'])
+        self.assertNotIn('importance', self.G.node[c])
+
     def test_list(self):
         for tc in self.listTestCases:
             if isinstance(tc.err, SystemExit):
@@ -585,3 +616,79 @@ class ReactorTestCase(unittest.TestCase):
                 else:
                     self.assertEqual(
                         tc.exp, self.reactor.link(**tc.func_kwargs))
+
+    def test_export(self):
+        self.api.Node.create(name='a', work='')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'out.md')
+            self.reactor.process(['export', path])
+            self.assertEqual(
+                self.reactor.export_file(path, fields=['work']),
+                {'written': 1, 'kept': 0, 'removed': 0})
+            self.assertEqual(self.reactor.export_file(path, fields=['work']),
+                             {'written': 0, 'kept': 1, 'removed': 0})
+
+    def test_show_at(self):
+        with self.assertRaises(AtomicError):
+            self.reactor.show(1, at='2016 Oct 16')
+        with tempfile.TemporaryDirectory() as tmp:
+            start = int(datetime(2016, 10, 16, 7, 59).timestamp())
+            times = iter(range(start, start + 3600, 60))
+            self.api.history = self.api.add_index(history.History(
+                os.path.join(tmp, 'graph.json'), clock=lambda: next(times)))
+            self.api.Node.create(name='a')  # At 08:00, after a checkpoint
+            self.api.Node.patch(1, name='b')
+            self.assertEqual(self.reactor.show(1, at='2016 Oct 16 08:00'),
+                             {'uid': 1, 'name': 'a'})
+            with self.assertRaises(AtomicError):
+                self.reactor.show(1, at='2016 Oct 15')
+            with self.assertRaises(AtomicError):
+                self.reactor.show(1, at='whenever')
+
+    def test_diff_merge(self):
+        self.api.Node.create(name='a')
+        self.api.Node.create(name='b')
+        with tempfile.TemporaryDirectory() as tmp:
+            base, theirs = (os.path.join(tmp, f) for f in ('base', 'theirs'))
+            fileapi._save(self.G, base)
+            self.api.Node.patch(1, name='A')
+            other = fileapi._load(base)
+            other.node[2]['name'] = 'B'
+            other.add_node(3, uid=3, name='c')
+            fileapi._save(other, theirs)
+
+            self.reactor.out = io.StringIO()
+            try:
+                nodes, _ = self.reactor.diff(base, theirs)
+                self.assertEqual(nodes.added, [3])
+                self.assertEqual(
+                    self.reactor.out.getvalue(),
+                    '+ node 3 c\n~ node 2 B\n    replace /name "B"\n')
+                self.assertEqual(self.reactor.merge(base, theirs), [])
+            finally:
+                self.reactor.out = cli.sys.stdout
+        self.assertEqual([self.G.node[n]['name'] for n in sorted(self.G)],
+                         ['A', 'B', 'c'])
+        self.assertEqual(self.api.Node.create(name='d'), 4)
+        with self.assertRaises(AtomicError):
+            self.reactor.diff('missing.json')
+
+    @unittest.skipIf(columnar.np is None, "Requires numpy")
+    def test_stats(self):
+        self.api.Node.create(name='a', time_estd='2h', work='')
+        self.api.Node.create(name='b', time_estd='1h', work='', done='')
+        self.api.Node.create(name='c', time_estd='30m', home='')
+        self.reactor.out = io.StringIO()
+        try:
+            self.reactor.process(
+                shlex.split('stats time_estd --undone --by tag'))
+            self.assertEqual(self.reactor.out.getvalue(),
+                             'sum(time_estd) hours by tag:\n'
+                             '  home: 0.5\n'
+                             '  work: 2\n')
+            self.assertEqual(self.reactor.stats(), 3)
+            self.api.Node.create(1, name='d', time_estd='4h')
+            self.assertEqual(self.reactor.stats('time_estd', under=1),
+                             6 * 3600)
+        finally:
+            self.reactor.out = cli.sys.stdout
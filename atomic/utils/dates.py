@@ -0,0 +1,330 @@
+"""
+dates
+=====
+Date and time parsing for shorthand input, like due dates.
+
+Rather than trying every format with :func:`datetime.strptime` until one
+doesn't raise, the input's *shape* (runs of digits and letters, and the
+punctuation between them) selects the candidate formats directly. Formats
+are compiled once into regexes with integer conversions, and results are
+memoized, so importing thousands of repeated due dates is cheap.
+
+Example::
+
+    >>> parse_datetime('2015 Oct 16 08:52')
+    datetime.datetime(2015, 10, 16, 8, 52)
+    >>> smart_date('14:02', base=datetime(2016, 10, 16))
+    datetime.datetime(2016, 10, 16, 14, 2)
+"""
+import re
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+
+TIMESTAMP_FORMATS = (
+    "%d",               # Day: 16
+    "%b %d",            # Month day: Oct 16
+    "%H:%M",            # Clock time: 14:02
+    "%I:%M %p",         # 12-hour clock time: 2:02 PM
+    "%Y %b %d",         # 2015 Oct 16
+    "%Y %b %d %H:%M",   # 2015 Oct 16 08:52
+)
+MONTHS = ('jan', 'feb', 'mar', 'apr', 'may', 'jun',
+          'jul', 'aug', 'sep', 'oct', 'nov', 'dec')
+MONTH_NAMES = ('january', 'february', 'march', 'april', 'may', 'june', 'july',
+               'august', 'september', 'october', 'november', 'december')
+
+# Directive => (regex, field); fields are converted by _build
+DIRECTIVES = {
+    'Y': (r'\d{4}', 'year'),
+    'm': (r'\d{1,2}', 'month'),
+    'd': (r'\d{1,2}', 'day'),
+    'H': (r'\d{1,2}', 'hour'),
+    'I': (r'\d{1,2}', 'hour12'),
+    'M': (r'\d{1,2}', 'minute'),
+    'S': (r'\d{1,2}', 'second'),
+    'f': (r'\d{1,6}', 'microsecond'),
+    'b': (r'[a-zA-Z]{3}', 'month_abbr'),
+    'B': (r'[a-zA-Z]+', 'month_name'),
+    'p': (r'[aApP][mM]', 'ampm'),
+}
+# Fields each directive supplies, for filling in the rest from a base date
+DATE_FIELDS = {'Y': 'year', 'm': 'month', 'b': 'month', 'B': 'month',
+               'd': 'day'}
+SHAPE_RE = re.compile(r'\d+|[^\W\d_]+|\s+')
+SAMPLE = datetime(2015, 11, 16, 14, 2, 3, 456789)
+
+
+def shape(s):
+    """Fingerprint a string: digit runs become 'N', letters 'A', whitespace
+    a single space, and punctuation is kept.
+
+    >>> shape('2015 Oct 16 08:52')
+    'N A N N:N'
+    """
+    return SHAPE_RE.sub(_shape_token, s)
+
+
+def _shape_token(m):
+    c = m.group()[0]
+    if c.isdigit():
+        return 'N'
+    if c.isspace():
+        return ' '
+    return 'A'
+
+
+class Format:
+    """A :func:`~datetime.datetime.strptime` format, compiled to a regex.
+
+    Attributes:
+        fmt (str): The format.
+        shape (str): The :func:`shape` of values it produces.
+        fields (set[str]): Date fields it supplies; of year, month and day.
+        has_time (bool): Whether it supplies a time of day.
+    """
+
+    def __init__(self, fmt):
+        self.fmt = fmt
+        self.shape = shape(SAMPLE.strftime(fmt))
+        self.fields, self.has_time = set(), False
+        pattern, pos, groups = [], 0, []
+        for m in re.finditer(r'%(.)', fmt):
+            pattern.append(_literal(fmt[pos:m.start()]))
+            pos = m.end()
+            directive = m.group(1)
+            if directive == '%':
+                pattern.append('%')
+                continue
+            try:
+                regex, field = DIRECTIVES[directive]
+            except KeyError:  # Leave it to strptime
+                self._regex = None
+                break
+            pattern.append('(%s)' % regex)
+            groups.append(field)
+            if directive in DATE_FIELDS:
+                self.fields.add(DATE_FIELDS[directive])
+            else:
+                self.has_time = True
+        else:
+            pattern.append(_literal(fmt[pos:]))
+            self._regex = re.compile(''.join(pattern) + r'\Z', re.I)
+        self._groups = groups
+
+    def __repr__(self):
+        return "Format(%r)" % self.fmt
+
+    def parse(self, s):
+        """Parse a string, as :func:`~datetime.datetime.strptime` would.
+
+        Raises:
+            ValueError: If the string doesn't match, or isn't a valid date.
+        """
+        if self._regex is None:
+            return datetime.strptime(s, self.fmt)
+        m = self._regex.match(s)
+        if m is None:
+            raise ValueError("'%s' does not match format '%s'" % (s, self.fmt))
+        return _build(zip(self._groups, m.groups()))
+
+
+def _literal(text):
+    # As with strptime, whitespace in a format matches any amount of it
+    return r'\s+'.join(re.escape(part) for part in text.split(' '))
+
+
+def _build(pairs):
+    """Build a datetime from (field, text) pairs, as strptime defaults."""
+    values = {'year': 1900, 'month': 1, 'day': 1}
+    hour12 = ampm = None
+    for field, text in pairs:
+        if field == 'month_abbr':
+            values['month'] = _month(text, MONTHS)
+        elif field == 'month_name':
+            values['month'] = _month(text, MONTH_NAMES)
+        elif field == 'hour12':
+            hour12 = int(text)
+        elif field == 'ampm':
+            ampm = text.lower()
+        elif field == 'microsecond':
+            values[field] = int(text.ljust(6, '0'))
+        else:
+            values[field] = int(text)
+    if hour12 is not None:
+        if not 1 <= hour12 <= 12:
+            raise ValueError("hour must be in 1..12")
+        values['hour'] = hour12 % 12 + (12 if ampm == 'pm' else 0)
+    return datetime(**values)
+
+
+def _month(text, names):
+    try:
+        return names.index(text.lower()) + 1
+    except ValueError:
+        raise ValueError("Unknown month '%s'" % text) from None
+
+
+@lru_cache(maxsize=64)
+def compile_formats(formats):
+    """Compile formats, grouping them by the shape of what they produce.
+
+    Returns:
+        (tuple[Format], dict): The compiled formats, in order, and a mapping
+            of shape to the formats producing it.
+    """
+    compiled = tuple(Format(fmt) for fmt in formats)
+    by_shape = defaultdict(list)
+    for f in compiled:
+        by_shape[f.shape].append(f)
+    return compiled, dict(by_shape)
+
+
+def match(line, formats=TIMESTAMP_FORMATS):
+    """Parse a string, returning the datetime and the format that matched.
+
+    Formats with the same shape as ``line`` are tried first, in order; the
+    rest only if none of those match.
+
+    Returns:
+        (:class:`~datetime.datetime`, :class:`Format`)
+
+    Raises:
+        ValueError: If no format matches.
+    """
+    return _match(line, tuple(formats))
+
+
+@lru_cache(maxsize=4096)
+def _match(line, formats):
+    compiled, by_shape = compile_formats(formats)
+    likely = by_shape.get(shape(line), ())
+    for f in likely:
+        try:
+            return f.parse(line), f
+        except ValueError:
+            pass
+    for f in compiled:
+        if f not in likely:
+            try:
+                return f.parse(line), f
+            except ValueError:
+                pass
+    raise ValueError("Unable to parse '{}'".format(line))
+
+
+def parse_datetime(line, formats=TIMESTAMP_FORMATS):
+    """Parses a timestamp from a string from a list of acceptable formats.
+
+    Unspecified fields default as with :func:`~datetime.datetime.strptime`;
+    see :func:`smart_date` to fill them in from today.
+
+    Raises:
+        ValueError: If no format matches.
+    """
+    return match(line, formats)[0]
+
+
+def starting_date():
+    """Return today, at midnight."""
+    return datetime.combine(date.today(), time())
+
+
+def smart_date(dt, formats=TIMESTAMP_FORMATS, base=None, future=False):
+    """Combine a parsed date, time or datetime with the current date, to allow
+    for shorthand entry.
+
+    Fields the input didn't specify are taken from ``base``: '16' is the 16th
+    of this month, 'Oct 16' is this year's, and '14:02' is today's. A date
+    without a time is at midnight.
+
+    Args:
+        dt (str, :class:`~datetime.datetime`, :class:`~datetime.date` or
+            :class:`~datetime.time`): Input; strings are parsed with
+            ``formats``. Complete datetimes are returned as-is.
+        formats (tuple[str]): Formats for parsing strings.
+        base (:class:`~datetime.datetime`): Reference point; defaults to
+            :func:`starting_date`.
+        future (bool): Roll partial dates that fall before ``base`` forward to
+            their next occurrence, as for due dates: tomorrow for a time, next
+            month for a day, or next year for a month and day.
+
+    Raises:
+        ValueError: If a string can't be parsed, or the result isn't a date,
+            like February 30th.
+    """
+    base = base or starting_date()
+    if isinstance(dt, str):
+        dt, f = match(dt, formats)
+        fields, has_time = f.fields, f.has_time
+    elif isinstance(dt, datetime):
+        return dt
+    elif isinstance(dt, date):
+        return datetime.combine(dt, time())
+    elif isinstance(dt, time):
+        dt, fields, has_time = datetime.combine(SAMPLE, dt), set(), True
+    else:
+        raise TypeError("Can't make a date from %r" % (dt,))
+    if 'year' in fields:
+        return dt if has_time else datetime.combine(dt.date(), time())
+    result = _combine(dt, fields, has_time, base)
+    if future and result < base:
+        if 'month' in fields:
+            result = _combine(dt, fields, has_time,
+                              base.replace(year=base.year + 1, month=1, day=1))
+        elif 'day' in fields:
+            first = base.replace(day=1)
+            result = _combine(dt, fields, has_time,
+                              (first + timedelta(days=32)).replace(day=1))
+        else:
+            result += timedelta(days=1)
+    return result
+
+
+def _combine(dt, fields, has_time, base):
+    """Take the unspecified date fields from ``base``."""
+    day = date(base.year,
+               dt.month if 'month' in fields else base.month,
+               dt.day if 'day' in fields else base.day)
+    return datetime.combine(day, dt.time() if has_time else time())
+
+
+def parse_many(lines, formats=TIMESTAMP_FORMATS, smart=False, base=None,
+               errors='raise'):
+    """Parse many strings, as for an import.
+
+    Each distinct string is parsed once, and formats are compiled once.
+
+    Args:
+        lines (iterable[str]): Strings to parse.
+        formats (tuple[str]): Acceptable formats.
+        smart (bool): Fill in unspecified fields with :func:`smart_date`.
+        base (:class:`~datetime.datetime`): Reference point for ``smart``.
+        errors (str): 'raise' on the first unparseable string, or 'coerce'
+            it to None.
+
+    Returns:
+        list[:class:`~datetime.datetime`]: In the order of ``lines``.
+    """
+    if errors not in ('raise', 'coerce'):
+        raise ValueError("errors must be 'raise' or 'coerce'")
+    formats = tuple(formats)
+    base = base or starting_date()
+    seen, results = {}, []
+    for line in lines:
+        try:
+            dt = seen[line]
+        except KeyError:
+            try:
+                if smart:
+                    dt = smart_date(line, formats, base=base)
+                else:
+                    dt = _match(line, formats)[0]
+            except ValueError:
+                if errors == 'raise':
+                    raise
+                dt = None
+            seen[line] = dt
+        results.append(dt)
+    return results
@@ -1,7 +1,7 @@
 import sys
 from io import StringIO
 
-from atomic.graph.graph import Node
+from atomic.graph.graph import format_node
 
 
 last_child = "└─"
@@ -19,5 +19,5 @@ def print_tree(nodes, file=sys.stdout):
             pre = descend
         else:
             pre = backbone + " " * 4 * (depth - 2) + descend
-        sio.write("{}{}\n".format(pre, str(Node(n))))
+        sio.write("{}{}\n".format(pre, format_node(n)))
     print(sio.getvalue().rstrip("\n"), file=file)
@@ -0,0 +1,243 @@
+"""
+export
+======
+Write the graph back out as a markdown outline.
+
+The output mirrors what :func:`~atomic.utils.parse.import_markdown` reads:
+top-level nodes are grouped into sections by their tags, which become
+headers, and ``parent`` edges become nested lists beneath them.
+
+Each section is preceded by a marker comment holding a hash of everything
+that goes into it. Re-exporting over an earlier file only renders sections
+whose hash changed; the text of the others is copied across as-is::
+
+    <!-- atomic:section 5d41402abc 7c211433f0 -->
+    # Work
+    * Write report
+      * Outline
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+from collections import OrderedDict
+
+from atomic.graph import graph
+from atomic.utils import parse
+
+
+logger = logging.getLogger(__name__)
+
+MAX_DEPTH = 6  # Markdown header levels
+INDENT = '  '
+MARKER = '<!-- atomic:section {} {} -->\n'
+MARKER_RE = re.compile(r'<!-- atomic:section (\w+) (\w+) -->$')
+NON_TAGS = frozenset(('name', 'done'))
+
+
+def tags_of(attrs):
+    """Return a node's header tags: its valueless keys, in order.
+
+    Only the first six are kept, as markdown has no deeper headers.
+    """
+    return tuple(k for k, v in attrs.items()
+                 if (v is None or v == '') and k not in NON_TAGS)[:MAX_DEPTH]
+
+
+def _hash(*parts):
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(repr(part).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()[:16]
+
+
+def subtree_digests(G, fields=None):
+    """Build a function hashing a node's rendering along with its subtree.
+
+    Digests are memoized for the life of the returned function, so shared
+    subtrees are only walked once per export.
+    """
+    memo = {}
+
+    def digest(n, path=()):
+        try:
+            return memo[n]
+        except KeyError:
+            pass
+        path += (n,)
+        kids = tuple(digest(c, path) for c in graph.children(G, n)
+                     if c not in path)
+        memo[n] = _hash(_item(G.node[n], fields), kids)
+        return memo[n]
+
+    return digest
+
+
+def sections(G, fields=None, digest=None):
+    """Group top-level nodes into sections by their tags.
+
+    Untagged nodes come first, so that no header applies to them; then
+    sections follow in order of their first node.
+
+    Args:
+        G (:class:`networkx.MultiDiGraph`): Graph.
+        fields (list[str]): Attributes to render alongside names.
+        digest (callable): Hashes a node's subtree, given its id; defaults
+            to walking it with :func:`subtree_digests`. An index kept in sync
+            with the graph can answer this without the walk.
+
+    Returns:
+        list[(str, str, tuple[str], list[int])]: Each section's key and
+            content hash, its tags, and its top-level nodes.
+    """
+    digest = digest or subtree_digests(G, fields)
+    groups = OrderedDict([((), [])])
+    for n in graph.roots(G):
+        groups.setdefault(tags_of(G.node[n]), []).append(n)
+    if not groups[()]:
+        del groups[()]
+    result, prev = [], ()
+    for tags, nodes in groups.items():
+        key = _hash(tags)[:10]
+        content = _hash(prev, tags, fields, [digest(n) for n in nodes])
+        result.append((key, content[:10], tags, nodes))
+        prev = tags
+    return result
+
+
+def _headers(prev, tags):
+    """Yield the header lines moving from one section's tags to the next."""
+    common = 0
+    for a, b in zip(prev, tags):
+        if a != b:
+            break
+        common += 1
+    if common == len(tags) and tags:
+        common -= 1  # Repeat the last header, to close deeper ones
+    for depth in range(common, len(tags)):
+        yield '%s %s\n' % ('#' * (depth + 1), tags[depth])
+
+
+def _item(attrs, fields=None):
+    text = str(attrs.get('name', ''))
+    for field in fields or ():
+        value = attrs.get(field)
+        if value is not None:
+            text += ' %s=%s' % (field, parse._quote(str(value)))
+    return text
+
+
+def _render(G, prev, section, fields=None):
+    """Yield a section's lines, marker included."""
+    key, content, tags, nodes = section
+    yield MARKER.format(key, content)
+    headers = list(_headers(prev, tags))
+    yield from headers
+    if headers:
+        yield '\n'
+    stack = [(n, 0, ()) for n in reversed(nodes)]
+    while stack:
+        n, depth, path = stack.pop()
+        yield '%s* %s\n' % (INDENT * depth, _item(G.node[n], fields))
+        path += (n,)
+        stack.extend((c, depth + 1, path)
+                     for c in reversed(graph.children(G, n)) if c not in path)
+    yield '\n'
+
+
+def export_markdown(G, out, fields=None):
+    """Stream the graph to a file-like object as a markdown outline.
+
+    Nodes that only have parents within a cycle are left out, as there's no
+    top-level node to list them under.
+
+    Args:
+        G (:class:`networkx.MultiDiGraph`): Graph.
+        out (:obj:file): Writable, text file-like object.
+        fields (list[str]): Attributes to render alongside names.
+
+    Returns:
+        int: Number of sections written.
+    """
+    prev, count = (), 0
+    for section in sections(G, fields):
+        out.writelines(_render(G, prev, section, fields))
+        prev, count = section[2], count + 1
+    return count
+
+
+def read_sections(lines):
+    """Split a previous export into its preamble and marked sections.
+
+    Returns:
+        (str, dict): Text before the first marker, and a mapping of section
+            key to (content hash, text).
+    """
+    preamble, found = [], {}
+    chunk = preamble
+    for line in lines:
+        m = MARKER_RE.match(line.rstrip('\r\n'))
+        if m is not None:
+            chunk = [line]
+            found[m.group(1)] = m.group(2), chunk
+        else:
+            chunk.append(line)
+    return ''.join(preamble), {k: (h, ''.join(text))
+                               for k, (h, text) in found.items()}
+
+
+def export_file(G, path, fields=None, incremental=True, digest=None):
+    """Export the graph to a markdown file, reusing an earlier export.
+
+    With ``incremental``, sections whose hash is unchanged since the file
+    was written are copied from it rather than rendered, and any text before
+    the first section is kept. The file is replaced atomically.
+
+    Args:
+        G (:class:`networkx.MultiDiGraph`): Graph.
+        path (str): Output file.
+        fields (list[str]): Attributes to render alongside names.
+        incremental (bool): Reuse unchanged sections of an existing file.
+        digest (callable): Subtree hash; see :func:`sections`.
+
+    Returns:
+        dict: Counts of sections ``written``, ``kept`` as they were, and
+            ``removed``.
+    """
+    preamble, old = '', {}
+    if incremental:
+        try:
+            with open(path) as f:
+                preamble, old = read_sections(f)
+        except FileNotFoundError:
+            pass
+    counts = {'written': 0, 'kept': 0, 'removed': 0}
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile('w', dir=directory, delete=False,
+                                     prefix='.atomic-export-') as f:
+        try:
+            f.write(preamble)
+            prev = ()
+            for section in sections(G, fields, digest):
+                key, content = section[:2]
+                if old.get(key, (None,))[0] == content:
+                    f.write(old.pop(key)[1])
+                    counts['kept'] += 1
+                else:
+                    old.pop(key, None)
+                    f.writelines(_render(G, prev, section, fields))
+                    counts['written'] += 1
+                prev = section[2]
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    if os.path.exists(path):
+        shutil.copymode(path, f.name)
+    os.replace(f.name, path)
+    counts['removed'] = len(old)
+    logger.debug("Exported %s: %s", path, counts)
+    return counts
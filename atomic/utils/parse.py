@@ -5,18 +5,28 @@ Responsible for providing string-parsing functions and regexes for
 extracting REPL shell and CLI arguments into function arguments.
 """
 import re
-from datetime import datetime, date, time
-
-import bs4
-import mistune
-from bs4 import BeautifulSoup
 
+from atomic.graph import graph, patch
+from atomic.utils import dates
 from atomic.utils.log import get_logger
 
 
-# key1=string key2=multi-word string...
-PARSE_KEY_VALUE_RE = re.compile(
-    r'\b([^\s]+)\s*=\s*([^=]*)(?=\s+\w+\s*=|$)')
+# Finds the keys of a 'name key=value tag=' line, skipping over quoted strings
+# (which only start a word or value) and escapes. Keys start a word and are
+# matched atomically, via a lookahead, so scanning is linear.
+KV_KEY_RE = re.compile(r"""
+    (?<![^\s=])"[^"\\]*(?:\\.[^"\\]*)*"
+  | (?<![^\s=])'[^'\\]*(?:\\.[^'\\]*)*'
+  | \\[='"\\]
+  | (?<!\S)(?=(?P<key>[^\s='"\\][^\s=\\]*))(?P=key)\s*=
+""", re.VERBOSE | re.DOTALL)
+KV_UNQUOTE_RE = re.compile(r"""
+    (?<![^\s=])"(?P<dq>[^"\\]*(?:\\.[^"\\]*)*)"
+  | (?<![^\s=])'(?P<sq>[^'\\]*(?:\\.[^'\\]*)*)'
+  | \\(?P<esc>[='"\\])
+""", re.VERBOSE | re.DOTALL)
+KV_ESCAPE_RE = re.compile(r'\\([\'"\\])')
+KV_SPECIAL_RE = re.compile(r'[\s=\'"\\]')
 # <src> <dest> <type> [key=value]...
 PARSE_LINK_ARGS_RE = re.compile(
     r'(?P<src>\d+)\s+(?P<dest>\d+)\s+(?:type=)?(?P<type>\w+)\s*(?P<kwargs>.*)')
@@ -24,18 +34,138 @@ PARSE_LINK_ARGS_RE = re.compile(
 logger = get_logger('atomic')
 
 
+def _unquote_match(m):
+    if m.lastgroup == 'esc':
+        return m.group('esc')
+    return KV_ESCAPE_RE.sub(r'\1', m.group(m.lastgroup))
+
+
+def _unquote(s):
+    """Strip ``s`` and remove its quotes and escapes."""
+    s = s.strip()
+    if '"' in s or "'" in s or '\\' in s:
+        return KV_UNQUOTE_RE.sub(_unquote_match, s)
+    return s
+
+
+def _quote(s):
+    if KV_SPECIAL_RE.search(s) is None:
+        return s
+    return '"%s"' % s.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _quote_args(args):
+    """Join already shell-split arguments into a line, so quoting is final.
+
+    Each argument stays one word, or one ``key=value`` pair.
+    """
+    words = []
+    for arg in args:
+        m = KV_KEY_RE.match(arg)
+        if arg.startswith('='):  # As in 'key = value'
+            words.append('=' + _quote(arg[1:]))
+        elif m is not None and m.group('key') is not None:
+            words.append(arg[:m.end()] + _quote(arg[m.end():]))
+        else:
+            words.append(_quote(arg))
+    return ' '.join(words)
+
+
+def _scan_keys(line):
+    """Yield (key, start, value start) for each key, honoring quotes."""
+    for m in KV_KEY_RE.finditer(line):
+        if m.group('key') is not None:
+            yield m.group('key'), m.start(), m.end()
+
+
+def _is_plain(line):
+    """Whether a line has no opening quotes or backslashes.
+
+    Uses substring searches, as a regex would visit every character.
+    """
+    if '\\' in line:
+        return False
+    for quote in ('"', "'"):
+        i = line.find(quote)
+        while i >= 0:
+            if i == 0 or line[i - 1].isspace() or line[i - 1] == '=':
+                return False
+            i = line.find(quote, i + 1)
+    return True
+
+
+def _find_keys(line):
+    """Yield (key, start, value start) for each key of an unquoted line.
+
+    Only the '=' characters are visited: a key is the word before one, if
+    that word starts after whitespace. Keys can't hold '=', so each search
+    starts after the last.
+    """
+    lo, i = 0, line.find('=')
+    while i >= 0:
+        head = line[lo:i].rstrip()
+        word = head.rsplit(None, 1)[-1] if head else ''
+        start = lo + len(head) - len(word)
+        if word and (start == 0 or line[start - 1].isspace()):
+            yield word, start, i + 1
+        lo = i + 1
+        i = line.find('=', lo)
+
+
+def parse_name_kvs(line):
+    """Parse 'name key1=value one key2=value two tag= ...' in a single pass.
+
+    The name is everything before the first key. A value runs until the next
+    key, and may be quoted, or escape '=' (``\\=``), to hold text which would
+    otherwise start a key. Whitespace around '=' is allowed, as in
+    ``key = value``. Unless the line has quotes or escapes, only its '='
+    characters are examined, so long names and values are cheap.
+
+    Args:
+        line (str or list[str]): A line, or arguments already split by a
+            shell, as per :func:`shlex.split`, whose quoting is then final.
+
+    Returns:
+        (str, dict): The name, and the key-values; keys repeated later win.
+
+    Examples:
+        >>> parse_name_kvs('Buy milk due=tomorrow body="2% or skim" urgent=')
+        ('Buy milk', {'due': 'tomorrow', 'body': '2% or skim', 'urgent': ''})
+    """
+    if not isinstance(line, str):
+        line = _quote_args(line)
+    if _is_plain(line):
+        keys, clean = _find_keys(line), str.strip
+    else:
+        keys, clean = _scan_keys(line), _unquote
+    name, kvs, key, start = '', {}, None, 0
+    for k, k_start, v_start in keys:
+        value = clean(line[start:k_start])
+        if key is None:
+            name = value
+        else:
+            kvs[key] = value
+        key, start = k, v_start
+    value = clean(line[start:])
+    if key is None:
+        return value, kvs
+    kvs[key] = value
+    return name, kvs
+
+
 def parse_key_values(s):
     """Parse key-value pairs from 'key1=string key2=multi-word string ...'"""
-    return {m.group(1): m.group(2)
-            for m in PARSE_KEY_VALUE_RE.finditer(s)}
+    return parse_name_kvs(s)[1]
 
 
 def parse_non_kv(s):
     """Parse _up_ to the first key=value; 'cats k=v' returns 'cats'."""
-    m = PARSE_KEY_VALUE_RE.search(s)
-    if m is None:
-        return s
-    return s[:m.start()].strip()
+    return parse_name_kvs(s)[0]
+
+
+def parse_csv(s):
+    """Parse 'a, b,c' into ['a', 'b', 'c'], dropping empty values."""
+    return [v.strip() for v in s.split(',') if v.strip()]
 
 
 def parse_link_args(s):
@@ -54,38 +184,19 @@ def input_bool(msg='Are you sure?', truths=('y', 'yes')):
     return b in truths
 
 
-# Date & Time functions
-timestamp_formats = (
-    "%d",               # Day: 16
-    "%b %d",            # Month day: Oct 16
-    "%H:%M",            # Clock time: 14:02
-    "%I:%M %p",         # 12-hour clock time: 2:02 PM
-    "%Y %b %d",         # 2015 Oct 16
-    "%Y %b %d %H:%M",   # 2015 Oct 16 08:52
-)
+# Date & Time functions; see :mod:`atomic.utils.dates`
+timestamp_formats = dates.TIMESTAMP_FORMATS
+parse_datetime = dates.parse_datetime
+starting_date = dates.starting_date
+smart_date = dates.smart_date
 
 
-def parse_datetime(line, formats=timestamp_formats):
-    """Parses a timestamp from a string from a list of acceptable formats."""
-    err = None
-    for fmt in formats:
-        try:
-            return datetime.strptime(line, fmt)
-        except ValueError as ve:
-            err = ve
-    if err:
-        raise ValueError("Unable to parse '{}'".format(line))
-
-
-def starting_date():
-    # Use current year/month/day, and zero values for hours/min/ms
-    return datetime.combine(date.today(), time())
-
-
-def smart_date(dt):
-    """Combine the parsed date/time/datetime with the current date to allow for
-    shorthand date entry."""
-    pass
+# Markdown outlines
+MD_ATX_RE = re.compile(r'(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$')
+MD_SETEXT_RE = re.compile(r' {0,3}(?:=+|-+)[ \t]*$')
+MD_BREAK_RE = re.compile(r' {0,3}(?:([*_-])[ \t]*){3,}$')
+MD_ITEM_RE = re.compile(r'([ \t]*)(?:[*+-]|\d{1,9}[.)])[ \t]+(.*?)[ \t]*$')
+MD_FENCE_RE = re.compile(r' {0,3}(`{3,}|~{3,})')
 
 
 def import_markdown(api, s):
@@ -94,15 +205,81 @@ def import_markdown(api, s):
     Only headers and list objects are used; the remainder is skipped.
     List items are created as nodes. Nested lists are interpreted as a parental
     hierarchy. Headers are attached to all following nodes as tags.
+
+    Args:
+        api: Backing API.
+        s (str or iterable[str]): Document, or its lines, such as an open file.
+
+    Returns:
+        list[int]: The created nodes' ids, in document order.
     """
-    soup = _markdown_to_soup(s)
-    stream = _recursive_parse(soup.contents, MarkdownContext())
-    _import_tuple_stream(api, stream)
+    return _import_tuple_stream(api, parse_markdown(s))
+
 
+def parse_markdown(lines):
+    """Stream (parents, name, tags) tuples from a markdown outline, line by
+    line.
 
-def _markdown_to_soup(s):
-    md = mistune.markdown(s)
-    return BeautifulSoup(md, 'html.parser')
+    ``parents`` holds the names of the enclosing list items, outermost first,
+    so it's empty at the top level. ``tags`` maps the headers in effect to
+    None. Fenced code is
+    skipped, as are paragraphs, except where they form setext headers.
+
+    Args:
+        lines (str or iterable[str]): Document, or its lines.
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    ctx = MarkdownContext()
+    tags = ctx.get()
+    items = []  # (indent, path) of the list items enclosing the next one
+    para = None  # Last paragraph line, which '===' or '---' makes a header
+    fence = None
+    blank = True
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if fence is not None:
+            if line.lstrip().startswith(fence):
+                fence = None
+            continue
+        first = line.lstrip()[:1]  # Most patterns only start with a few
+        if not first:
+            para, blank = None, True
+            continue
+        header = None
+        if para is not None and first in '=-' and MD_SETEXT_RE.match(line):
+            header = (1 if first == '=' else 2), para
+        elif line.startswith('#'):
+            m = MD_ATX_RE.match(line)
+            if m is not None:
+                header = len(m.group(1)), m.group(2) or ''
+        if header is not None:
+            ctx.insert(*header)
+            tags = ctx.get()
+            items, para, blank = [], None, False
+            continue
+        m = MD_FENCE_RE.match(line) if first in '`~' else None
+        if m is not None:
+            fence = m.group(1)
+            continue
+        if first in '*_-' and MD_BREAK_RE.match(line):
+            items, para, blank = [], None, False
+            continue
+        m = MD_ITEM_RE.match(line)
+        if m is not None and m.group(2):
+            indent = len(m.group(1).expandtabs(4))
+            while items and items[-1][0] >= indent:
+                items.pop()
+            name = m.group(2)
+            parents = items[-1][1] if items else ()
+            yield parents, name, tags
+            items.append((indent, parents + (name,)))
+            para = None
+        elif blank and not line[0].isspace():  # A paragraph ends any list
+            items, para = [], line.strip()
+        elif not items:
+            para = line.strip()
+        blank = False
 
 
 class MarkdownContext:
@@ -130,56 +307,66 @@ class MarkdownContext:
         self._arr[idx:] = [None] * (self.size - idx)
 
     def insert(self, idx, val):
-        print("CONTEXT.INSERT: [%d]%s; %s" % (idx, val, str(self._arr)))
         self._arr[idx - 1] = val
         self.clear(idx)
 
     def get(self, idx=None):
         if idx:
             return self._arr[idx - 1]
-        return {x: None for x in self._arr if x is not None}
-
-
-def _recursive_parse(tags, ctx, parent=None):
-    """Parse a :class:``bs4.BeautifulSoup`` document into a stream of (parent,
-    node, attributes) tuples."""
-    last = None
-    for t in tags:
-        if isinstance(t, bs4.element.NavigableString):
-            if t.string == '\n':
-                continue
-            _print_update('ADD', parent, t)
-            yield (parent.string if parent else None, t.string, ctx.get())
-            last = t
-        elif t.name.startswith('h'):  # Save as tag
-            idx = int(t.name[1:])  # Extract header depth from tag
-            ctx.insert(idx,  t.string)
-        elif t.name == 'ul' or t.name == 'ol':
-            _print_update('RECUR', parent, t)
-            yield from _recursive_parse(t.children, ctx, last)
-        elif t.name == 'li':
-            _print_update('RECUR', parent, t)
-            yield from _recursive_parse(t.children, ctx, parent)
-        else:
-            print("WARNING: tag=%s parent=%s" %
-                  (t.name, parent.name if parent is not None else 'None'))
+        return {x: None for x in self._arr if x}
 
 
-def _print_update(action, parent, tag):
-    print("{action:>5} ({parent}) <{tag.name}>{tag.string}".format(
-        action=action,
-        parent=parent.string if parent is not None else 'None',
-        tag=tag))
+def _import_tuple_stream(api, stream):
+    """Converts a stream of (parents, name, tags) tuples into nodes and parent
+    edges in the Graph, using the API.
 
+    Items are matched to existing nodes by their path of names, through the
+    API's :class:`~atomic.graph.names.NameIndex`: the n-th item with a path
+    is the n-th node with it. Matched nodes gain any new tags; the rest are
+    created in one batch, then linked in another. Importing the same outline
+    twice thus leaves the graph as it was.
 
-def _import_tuple_stream(api, stream):
-    """Converts a stream of tuples into nodes and edges in the Graph, using the
-    API."""
-    d = {}  # Holds mapping of node names => ids
-    for parent, name, kwargs in stream:
-        p = d.get(parent, None)  # Convert parent name to node id
-        kwargs['name'] = name
-        if name in d:
-            logger.warning("%s already seen in stream; will be overwritten",
-                           name)
-        d[name] = api.Node.create(p, **kwargs)
+    Returns:
+        list[int]: The created or matched nodes' ids, in order.
+    """
+    index = getattr(api, 'names', None)
+    if index is not None and hasattr(api, 'touch'):
+        api.touch()  # Names are matched across the whole graph
+    uids, items, parents = [], [], []  # Parents are positions in uids
+    latest, seen = {}, {}  # Paths => position of their last item, count
+    updates = {}  # New tags => matched ids
+    for names, name, tags in stream:
+        names = tuple(names)
+        path = names + (name,)
+        n = seen[path] = seen.get(path, 0) + 1
+        existing = index.get(path) if index is not None else ()
+        if n <= len(existing):
+            uid = existing[n - 1]
+            new = tuple(t for t in tags if t not in api.Node.get(uid))
+            if new:
+                updates.setdefault(new, []).append(uid)
+        else:
+            uid = None
+            attrs = dict(tags)
+            attrs['name'] = name
+            items.append((len(uids), attrs))
+            parent = latest.get(names)
+            if names and parent is None:
+                logger.warning("Parent %s of %s not found", names[-1], name)
+            parents.append(parent)
+        latest[path] = len(uids)
+        uids.append(uid)
+
+    created = api.Node.create_many(attrs for _, attrs in items)
+    for (i, _), uid in zip(items, created):
+        uids[i] = uid
+    edges = [(uids[parent], uids[i], {'type': graph.EdgeTypes.parent.name})
+             for (i, _), parent in zip(items, parents) if parent is not None]
+    api.Edge.create_many(edges)
+    for tags, matched in updates.items():
+        api.Node.patch_many(matched, *({'op': 'add', 'value': None,
+                                        'path': patch.format_pointer((t,))}
+                                       for t in tags))
+    logger.debug("Imported %d nodes and %d edges; updated %d", len(created),
+                 len(edges), sum(len(m) for m in updates.values()))
+    return uids
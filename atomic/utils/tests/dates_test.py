@@ -0,0 +1,82 @@
+import random
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from atomic.utils import dates
+
+
+FORMATS = dates.TIMESTAMP_FORMATS + (
+    '%Y-%m-%dT%H:%M:%S.%f', '%d %B %Y', '%m/%d/%y')  # %y falls back
+
+
+def test_matches_strptime():
+    rand = random.Random(0)
+    start = datetime(1990, 1, 1)
+    for _ in range(1000):
+        dt = start + timedelta(seconds=rand.randrange(2 ** 31))
+        for fmt in FORMATS:
+            s = dt.strftime(fmt)
+            try:
+                exp = datetime.strptime(s, fmt)
+            except ValueError:  # Like Feb 29, in 1900
+                with pytest.raises(ValueError):
+                    dates.Format(fmt).parse(s)
+            else:
+                assert dates.Format(fmt).parse(s) == exp, (s, fmt)
+
+
+@pytest.mark.parametrize('s,fmt', [
+    ('32', '%d'), ('0', '%d'), ('Feb 30', '%b %d'), ('24:00', '%H:%M'),
+    ('13:00 PM', '%I:%M %p'), ('2015 Foo 16', '%Y %b %d'), ('16 ', '%d'),
+])
+def test_invalid(s, fmt):
+    with pytest.raises(ValueError):
+        datetime.strptime(s, fmt)
+    with pytest.raises(ValueError):
+        dates.Format(fmt).parse(s)
+
+
+@pytest.mark.parametrize('s,exp', [
+    ('14', datetime(1900, 1, 14)),
+    ('dec 14', datetime(1900, 12, 14)),
+    ('2:02 pm', datetime(1900, 1, 1, 14, 2)),
+    ('12:30 AM', datetime(1900, 1, 1, 0, 30)),
+    ('2015 Dec 14  14:02', datetime(2015, 12, 14, 14, 2)),
+])
+def test_parse_datetime(s, exp):
+    assert dates.parse_datetime(s) == exp
+    assert dates.shape('2015 Dec 14 14:02') == 'N A N N:N'
+
+
+def test_parse_datetime_errors():
+    with pytest.raises(ValueError):
+        dates.parse_datetime('someday')
+
+
+BASE = datetime(2016, 10, 16, 9, 30)
+
+
+@pytest.mark.parametrize('value,exp,future', [
+    ('20', datetime(2016, 10, 20), datetime(2016, 10, 20)),
+    ('3', datetime(2016, 10, 3), datetime(2016, 11, 3)),
+    ('Oct 1', datetime(2016, 10, 1), datetime(2017, 10, 1)),
+    ('14:02', datetime(2016, 10, 16, 14, 2), datetime(2016, 10, 16, 14, 2)),
+    ('8:00 am', datetime(2016, 10, 16, 8), datetime(2016, 10, 17, 8)),
+    ('2015 Oct 1', datetime(2015, 10, 1), datetime(2015, 10, 1)),
+    (time(8), datetime(2016, 10, 16, 8), datetime(2016, 10, 17, 8)),
+    (date(2016, 1, 2), datetime(2016, 1, 2), datetime(2016, 1, 2)),
+])
+def test_smart_date(value, exp, future):
+    assert dates.smart_date(value, base=BASE) == exp
+    assert dates.smart_date(value, base=BASE, future=True) == future
+
+
+def test_parse_many():
+    lines = ['Oct 16', 'nope', '14:02', 'Oct 16']
+    assert dates.parse_many(lines, smart=True, base=BASE,
+                            errors='coerce') == [
+        datetime(2016, 10, 16), None, datetime(2016, 10, 16, 14, 2),
+        datetime(2016, 10, 16)]
+    with pytest.raises(ValueError):
+        dates.parse_many(lines)
@@ -0,0 +1,107 @@
+import io
+import re
+import textwrap
+
+import networkx as nx
+
+from atomic.darkmatter import fileapi
+from atomic.utils import export, parse
+
+
+OUTLINE = textwrap.dedent("""\
+    * loose
+
+    # Work
+    ## Report
+
+    * write
+      * outline
+      * draft
+
+    ## Reviews
+
+    * review
+    """)
+
+
+def imported(text=OUTLINE):
+    api = fileapi.FileAPI(nx.MultiDiGraph())
+    parse.import_markdown(api, text)
+    return api
+
+
+def names(text):
+    return [(parent, name, sorted(tags))
+            for parent, name, tags in parse.parse_markdown(text)]
+
+
+def unmarked(text):
+    return re.sub(r'<!-- atomic:section \w+ \w+ -->', '', text)
+
+
+def test_round_trip():
+    api = imported()
+    out = io.StringIO()
+    assert export.export_markdown(api.G, out) == 3
+    assert names(out.getvalue()) == names(OUTLINE)
+    assert '#### ' not in out.getvalue()
+
+
+def test_headers():
+    def headers(prev, tags):
+        return ''.join(export._headers(prev, tags))
+    assert headers((), ('a', 'b')) == '# a\n## b\n'
+    assert headers(('a', 'b'), ('a', 'c')) == '## c\n'
+    assert headers(('a', 'b'), ('a',)) == '# a\n'
+
+
+def test_fields():
+    api = fileapi.FileAPI(nx.MultiDiGraph())
+    api.Node.create(name='a', due='Oct 16', priority=1)
+    out = io.StringIO()
+    export.export_markdown(api.G, out, fields=['due', 'priority', 'x'])
+    assert '* a due="Oct 16" priority=1\n' in out.getvalue()
+
+
+def test_cycle():
+    api = imported('* a\n  * b\n')
+    api.Edge.create(2, 1, type='parent')  # Now neither is top-level
+    api.Node.create(name='c')
+    api.Edge.create(3, 1, type='parent')
+    out = io.StringIO()
+    export.export_markdown(api.G, out)
+    assert [n for _, n, _ in parse.parse_markdown(out.getvalue())] == \
+        ['c', 'a', 'b']
+
+
+def test_incremental(tmpdir):
+    path = str(tmpdir.join('out.md'))
+    with open(path, 'w') as f:
+        f.write('Exported notes\n\n')
+    api = imported()
+    assert export.export_file(api.G, path) == \
+        {'written': 3, 'kept': 0, 'removed': 0}
+    with open(path) as f:
+        first = f.read()
+    assert first.startswith('Exported notes\n\n<!-- atomic:section ')
+    assert export.export_file(api.G, path) == \
+        {'written': 0, 'kept': 3, 'removed': 0}
+    with open(path) as f:
+        assert f.read() == first
+
+    # Only the section holding the changed subtree is rendered
+    api.Node.update(3, name='outline v2')
+    assert export.export_file(api.G, path) == \
+        {'written': 1, 'kept': 2, 'removed': 0}
+    with open(path) as f:
+        text = f.read()
+    assert unmarked(text) == \
+        unmarked(first).replace('* outline\n', '* outline v2\n')
+
+    api.Node.delete(5)
+    assert export.export_file(api.G, path) == \
+        {'written': 0, 'kept': 2, 'removed': 1}
+    assert export.export_file(api.G, path, incremental=False) == \
+        {'written': 2, 'kept': 0, 'removed': 0}
+    with open(path) as f:
+        assert not f.read().startswith('Exported')
@@ -1,7 +1,12 @@
+import copy
+import io
+import random
+import re
 import textwrap
 from collections import namedtuple
 
 import networkx as nx
+import pytest
 
 from atomic.utils import parse
 from atomic.darkmatter import fileapi
@@ -41,6 +46,55 @@ def test_parse_key_values():
         assert case.out == obs
 
 
+# The regex parse_name_kvs replaced, kept as a reference implementation
+LEGACY_KEY_VALUE_RE = re.compile(
+    r'\b([^\s]+)\s*=\s*([^=]*)(?=\s+\w+\s*=|$)')
+
+
+def legacy_parse_name_kvs(line):
+    m = LEGACY_KEY_VALUE_RE.search(line)
+    name = line if m is None else line[:m.start()].strip()
+    return name, {m.group(1): m.group(2)
+                  for m in LEGACY_KEY_VALUE_RE.finditer(line[len(name):])}
+
+
+def random_line(rand):
+    """Build a line within the grammar both parsers agree on."""
+    def words(lo, hi):
+        return ' '.join(
+            rand.choice(('todo', "don't", 'x', 'a.b', '2%', '14:02', 'Ünï'))
+            for _ in range(rand.randint(lo, hi)))
+    parts = [words(0, 3)]
+    for _ in range(rand.randint(0, 4)):
+        key = rand.choice(('k', 'key_1', 'due', 'tag'))
+        parts.append(key + rand.choice(('=', ' = ', '= ')) + words(0, 3))
+    return ' '.join(p for p in parts if p).strip()
+
+
+def test_parse_name_kvs_matches_legacy():
+    rand = random.Random(0)
+    for _ in range(2000):
+        line = random_line(rand)
+        assert parse.parse_name_kvs(line) == legacy_parse_name_kvs(line), line
+        # The fast path agrees with the quote-aware scan
+        assert list(parse._find_keys(line)) == list(parse._scan_keys(line))
+
+
+@pytest.mark.parametrize('line,exp', [
+    ('key="a b=c" tag=', ('', {'key': 'a b=c', 'tag': ''})),
+    ("key='say \\'hi\\''", ('', {'key': "say 'hi'"})),
+    ('see a\\=b k=v', ('see a=b', {'k': 'v'})),
+    ('url=http://x/?a=b', ('', {'url': 'http://x/?a=b'})),
+    ('name  with   gaps k=v  w', ('name  with   gaps', {'k': 'v  w'})),
+    ('k=1 k=2', ('', {'k': '2'})),
+    ("it's 'unclosed", ("it's 'unclosed", {})),
+    (['Buy', 'milk', 'body=a b=c', 'x='],
+     ('Buy milk', {'body': 'a b=c', 'x': ''})),
+])
+def test_parse_name_kvs(line, exp):
+    assert parse.parse_name_kvs(line) == exp
+
+
 def test_parse_link_args():
     TestData = namedtuple('TestData', ['input', 'out'])
     testcases = (
@@ -77,8 +131,8 @@ __markdownTestCases = (
           * t11
         """,
         tuples=(
-            (None, 't1', {}),
-            ('t1', 't11', {})
+            ((), 't1', {}),
+            (('t1',), 't11', {})
         ),
         nodes=(
             (1, 't1'),  # (uid, name)
@@ -97,10 +151,10 @@ __markdownTestCases = (
                     * t121
                  """,
         tuples=(
-            (None, 't1', {}),
-            ('t1', 't11', {}),
-            ('t1', 't12', {}),
-            ('t12', 't121', {}),
+            ((), 't1', {}),
+            (('t1',), 't11', {}),
+            (('t1',), 't12', {}),
+            (('t1', 't12'), 't121', {}),
         ),
         nodes=(
             (1, 't1'),
@@ -132,12 +186,12 @@ __markdownTestCases = (
                      * t22
                  """,
         tuples=(
-            (None, 't1', {'Header 1': None, 'Header 2': None}),
-            (None, 't2', {'Header 1': None, 'Header 3': None}),
-            ('t2', 't21', {'Header 1': None, 'Header 3': None}),
-            ('t21', 't211', {'Header 1': None, 'Header 3': None}),
-            ('t21', 't212', {'Header 1': None, 'Header 3': None}),
-            ('t2', 't22', {'Header 1': None, 'Header 3': None}),
+            ((), 't1', {'Header 1': None, 'Header 2': None}),
+            ((), 't2', {'Header 1': None, 'Header 3': None}),
+            (('t2',), 't21', {'Header 1': None, 'Header 3': None}),
+            (('t2', 't21'), 't211', {'Header 1': None, 'Header 3': None}),
+            (('t2', 't21'), 't212', {'Header 1': None, 'Header 3': None}),
+            (('t2',), 't22', {'Header 1': None, 'Header 3': None}),
         ),
         nodes=(
             (1, 't1'),
@@ -157,20 +211,42 @@ __markdownTestCases = (
 )
 
 
-def test_recursive_parse():
+def test_parse_markdown():
     for testcase in __markdownTestCases:
         s = textwrap.dedent(testcase.markdown).strip()
-        soup = parse._markdown_to_soup(s)
-        ctx = parse.MarkdownContext()
-        stream = parse._recursive_parse(soup.contents, ctx)
-        for obs, exp in zip(stream, testcase.tuples):
-            # print("Comparing %s v. %s" % (str(obs), str(exp)))
-            assert obs == exp
+        assert tuple(parse.parse_markdown(s)) == testcase.tuples
+
+
+def test_parse_markdown_blocks():
+    s = textwrap.dedent("""
+        Notes, which aren't imported.
+
+        # Work #
+        1. a
+           2) b
+        ```
+        * not an item
+        ```
+        * c
+        - - -
+        Paragraph
+        ---
+        * d
+        #tag
+          * e
+        """)
+    assert list(parse.parse_markdown(io.StringIO(s))) == [
+        ((), 'a', {'Work': None}),
+        (('a',), 'b', {'Work': None}),
+        ((), 'c', {'Work': None}),
+        ((), 'd', {'Work': None, 'Paragraph': None}),
+        (('d',), 'e', {'Work': None, 'Paragraph': None}),
+    ]
 
 
 def test_import_tuple_stream():
     for testcase in __markdownTestCases:
-        G = nx.DiGraph()
+        G = nx.MultiDiGraph()
         api = fileapi.FileAPI(G)
         parse._import_tuple_stream(api, testcase.tuples)
         for uid, name in testcase.nodes:
@@ -184,7 +260,7 @@ def test_import_tuple_stream():
 def test_import_markdown():
     """Component test that black-boxes the subroutines."""
     for testcase in __markdownTestCases:
-        G = nx.DiGraph()
+        G = nx.MultiDiGraph()
         api = fileapi.FileAPI(G)
         s = textwrap.dedent(testcase.markdown).strip()
         parse.import_markdown(api, s)
@@ -194,3 +270,41 @@ def test_import_markdown():
         for src, dest in testcase.edges:
             assert src in G
             assert dest in G.edge[src]
+
+
+def test_import_duplicate_names():
+    G = nx.MultiDiGraph()
+    api = fileapi.FileAPI(G)
+    s = textwrap.dedent("""
+        * a
+          * b
+            * a
+          * c
+        * a
+          * d
+        """)
+    assert parse.import_markdown(api, s) == [1, 2, 3, 4, 5, 6]
+    assert sorted(G.edges()) == [(1, 2), (1, 4), (2, 3), (5, 6)]
+    assert api.names.get(('a',)) == [1, 5]
+    assert api.names.path(3) == ('a', 'b', 'a')
+
+
+def test_import_upserts():
+    G = nx.MultiDiGraph()
+    api = fileapi.FileAPI(G)
+    s = textwrap.dedent("""
+        # Work
+        * a
+          * b
+        * a
+        """)
+    uids = parse.import_markdown(api, s)
+    before = copy.deepcopy((G.node, G.edge))
+    assert parse.import_markdown(api, s) == uids
+    assert (G.node, G.edge) == before
+
+    # New items are added beneath matched ones, which gain new tags
+    s = s.replace('# Work', '# Work\n## Today') + '  * c\n* e\n'
+    assert parse.import_markdown(api, s) == uids + [4, 5]
+    assert G.node[1] == {'uid': 1, 'name': 'a', 'Work': None, 'Today': None}
+    assert sorted(G.edges()) == [(1, 2), (3, 4)]
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+graph_store
+===========
+Memory and traversal speed of :class:`atomic.graph.store.Graph` against a
+networkx MultiDiGraph, for a hierarchy of ``--nodes`` nodes. The last row walks
+the hierarchy through an :class:`~atomic.graph.adjacency.TypeIndex`, whose
+memory is counted with the graph's.
+
+    python benchmarks/graph_store.py --nodes 200000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import networkx as nx
+
+from atomic.graph import adjacency, graph, store
+
+
+def build(factory, n):
+    G = factory()
+    for uid in range(1, n + 1):
+        G.add_node(uid, attr_dict={'uid': uid})
+        if uid > 1:
+            G.add_edge(uid // 4 or 1, uid, 'parent', type='parent',
+                       src=uid // 4 or 1, dst=uid)
+    return G
+
+
+def measure(factory, n, indexed=False):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    G = build(factory, n)
+    index = None
+    if indexed:
+        index = adjacency.TypeIndex()
+        index.rebuild(G)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    start = time.perf_counter()
+    count = sum(1 for _ in graph.hierarchy(G, 'parent', adjacency=index))
+    elapsed = time.perf_counter() - start
+    assert count == n
+    return size / n, elapsed
+
+
+def main(args):
+    print("{:<10} {:>12} {:>12}  ({:,} nodes)".format(
+        'graph', 'bytes/node', 'hierarchy', args.nodes))
+    for name, factory, indexed in (('networkx', nx.MultiDiGraph, False),
+                                   ('store', store.Graph, False),
+                                   ('indexed', store.Graph, True)):
+        size, elapsed = measure(factory, args.nodes, indexed)
+        print("{:<10} {:>12.1f} {:>11.2f}s".format(name, size, elapsed))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--nodes', type=int, default=200000)
+    main(parser.parse_args())
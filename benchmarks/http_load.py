@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+http_load
+=========
+Load benchmark for :mod:`atomic.darkmatter.server`.
+
+Serves an in-memory graph and drives it with concurrent keep-alive clients,
+reporting throughput and latency for single-node GETs, conditional GETs and
+streamed listings.
+
+    python benchmarks/http_load.py --nodes 10000 --clients 32 --requests 200
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+
+import networkx as nx
+
+from atomic.darkmatter import fileapi, server
+
+
+def build_api(n):
+    G = nx.MultiDiGraph()
+    for uid in range(1, n + 1):
+        G.add_node(uid, {'uid': uid, 'name': 'node %d' % uid,
+                         'body': 'x' * 256, 'priority': uid % 10})
+    return fileapi.FileAPI(G)
+
+
+async def worker(host, port, targets, headers, latencies):
+    client = server.Client(host, port)
+    try:
+        for target in targets:
+            start = time.perf_counter()
+            status, _, _ = await client.request('GET', target, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            assert status in (200, 304), status
+    finally:
+        client.close()
+
+
+async def scenario(srv, name, targets, clients, headers=None):
+    latencies = []
+    per_client = [targets[i::clients] for i in range(clients)]
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(srv.host, srv.port, t, headers, latencies)
+                           for t in per_client))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1,
+                             int(p * len(latencies)))] * 1e3
+    print("{:<22} {:>8} req {:>10.0f} req/s  p50 {:6.2f}ms  p99 {:6.2f}ms"
+          .format(name, len(latencies), len(latencies) / elapsed,
+                  pct(0.50), pct(0.99)))
+
+
+async def main(args):
+    srv = server.Server(build_api(args.nodes), port=0)
+    await srv.start()
+    rand = random.Random(args.seed)
+    total = args.clients * args.requests
+    uids = [rand.randint(1, args.nodes) for _ in range(total)]
+    try:
+        await scenario(srv, 'GET /nodes/{id}',
+                       ['/nodes/%d' % u for u in uids], args.clients)
+        await scenario(srv, 'GET ?fields=name',
+                       ['/nodes/%d?fields=name' % u for u in uids],
+                       args.clients)
+        # Every client asks for the same node with a matching ETag
+        client = server.Client(srv.host, srv.port)
+        _, headers, _ = await client.request('GET', '/nodes/1')
+        client.close()
+        await scenario(srv, 'GET If-None-Match',
+                       ['/nodes/1'] * total, args.clients,
+                       headers={'If-None-Match': headers['etag']})
+        await scenario(srv, 'GET /nodes (stream)',
+                       ['/nodes?fields=name'] * args.clients, args.clients)
+    finally:
+        await srv.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--nodes', type=int, default=10000)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Requests per client')
+    parser.add_argument('--seed', type=int, default=0)
+    logging.getLogger('atomic').setLevel(logging.WARNING)
+    asyncio.get_event_loop().run_until_complete(main(parser.parse_args()))
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+import_markdown
+===============
+Import speed of :func:`atomic.utils.parse.import_markdown`.
+
+Generates an outline of ``--lines`` list items, nested up to four deep under
+a few levels of headers, and imports it into an in-memory graph.
+
+    python benchmarks/import_markdown.py --lines 100000
+"""
+import argparse
+import logging
+import time
+
+import networkx as nx
+
+from atomic.darkmatter import fileapi
+from atomic.utils import parse
+
+
+def outline(n):
+    """Yield the lines of an outline with ``n`` list items."""
+    for i in range(n):
+        if i % 1000 == 0:
+            yield '# Project %d' % (i // 1000)
+        if i % 100 == 0:
+            yield '## Milestone %d' % (i // 100)
+            yield ''
+        yield '%s* task %d due=2016 Oct %d' % ('  ' * (i % 4), i, i % 28 + 1)
+
+
+def main(args):
+    logging.disable(logging.DEBUG)
+    lines = list(outline(args.lines))
+    start = time.perf_counter()
+    count = sum(1 for _ in parse.parse_markdown(lines))
+    parsed = time.perf_counter() - start
+
+    api = fileapi.FileAPI(nx.MultiDiGraph())
+    start = time.perf_counter()
+    uids = parse.import_markdown(api, lines)
+    imported = time.perf_counter() - start
+    assert len(uids) == count == args.lines
+    print("{:,} lines: parsed in {:.2f}s, imported {:,} nodes and {:,} edges "
+          "in {:.2f}s".format(len(lines), parsed, len(api.G),
+                              api.G.number_of_edges(), imported))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--lines', type=int, default=100000)
+    main(parser.parse_args())
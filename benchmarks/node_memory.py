@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+node_memory
+===========
+Memory per node for the model classes in :mod:`atomic.graph.graph`.
+
+Compares the previous ``__dict__`` based Node against the slotted classes,
+building ``--nodes`` instances with the attributes listed in ``Atoms.md``.
+
+    python benchmarks/node_memory.py --nodes 1000000
+"""
+import argparse
+import gc
+import tracemalloc
+
+from atomic.graph.graph import Action, Node
+
+
+class DictNode:
+    """The previous Node implementation: attributes in ``__dict__``."""
+
+    def __init__(self, uid, *args, **kwargs):
+        self.uid = uid
+        for k, v in kwargs.items():
+            setattr(self, k, v)
+
+
+class DictAction(DictNode):
+
+    def __init__(self, *args, name=None, body=None, time_estd=None,
+                 time_spent=None, done=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.name = name
+        self.body = body
+        self.time_estd = time_estd
+        self.time_spent = time_spent
+        self.done = done
+
+
+def attrs(uid):
+    # Values are shared between representations, so only the containers
+    # holding them are measured.
+    return {'name': NAMES[uid % len(NAMES)], 'due': '2016 Oct 16',
+            'priority': uid % 10, 'time_estd': 3600, 'status': 'pending',
+            'work': ''}
+
+
+NAMES = ['task %d' % i for i in range(1000)]
+
+
+def measure(factory, n):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = [factory(uid, **attrs(uid)) for uid in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return (after - before) / n
+
+
+def main(args):
+    rows = (
+        ('dict', lambda uid, **kw: dict(kw, uid=uid)),
+        ('DictNode (before)', DictNode),
+        ('Node', Node),
+        ('DictAction (before)', DictAction),
+        ('Action', Action),
+    )
+    print("{:<20} {:>12}  ({:,} nodes)".format('class', 'bytes/node',
+                                               args.nodes))
+    for name, factory in rows:
+        print("{:<20} {:>12.1f}".format(name, measure(factory, args.nodes)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--nodes', type=int, default=1000000)
+    main(parser.parse_args())
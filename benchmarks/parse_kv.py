@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+parse_kv
+========
+Parsing speed of 'name key=value tag=' lines, as entered at the CLI.
+
+Compares :func:`atomic.utils.parse.parse_name_kvs` against the regex it
+replaced, over lines whose text grows to ``--size`` bytes: prose, and dotted
+text (paths, URLs, version strings), where the regex retries every word
+boundary and goes super-linear, and a quoted body, which takes the full
+quote-aware scan (and which the regex can't parse).
+
+    python benchmarks/parse_kv.py --size 16384
+"""
+import argparse
+import re
+import timeit
+
+from atomic.utils import parse
+
+
+LEGACY_KEY_VALUE_RE = re.compile(
+    r'\b([^\s]+)\s*=\s*([^=]*)(?=\s+\w+\s*=|$)')
+
+
+def legacy(line):
+    m = LEGACY_KEY_VALUE_RE.search(line)
+    name = line if m is None else line[:m.start()].strip()
+    return name, {m.group(1): m.group(2)
+                  for m in LEGACY_KEY_VALUE_RE.finditer(line[len(name):])}
+
+
+def prose(size):
+    """A name, a long multi-word body, and a few short keys and tags."""
+    body = ' '.join('word%d' % i for i in range(size // 6))[:size].strip()
+    return 'Write the report body=%s due=2016 Oct 16 work= priority=1' % body
+
+
+def dotted(size):
+    """A long dotted name, then a few short keys and tags."""
+    return 'a.' * (size // 2) + ' due=2016 Oct 16 work= priority=1'
+
+
+def quoted(size):
+    """A quoted body holding '=', then a few short keys and tags."""
+    body = ' '.join('x%d=y' % i for i in range(size // 6))[:size].strip()
+    return 'Write the report body="%s" due=2016 Oct 16 work=' % body
+
+
+def main(args):
+    print("{:<8} {:>8} {:>14} {:>14}".format(
+        'input', 'bytes', 'legacy (us)', 'single (us)'))
+    for build in (prose, dotted, quoted):
+        size = 64
+        while size <= args.size:
+            line = build(size)
+            if build is not quoted:
+                assert legacy(line) == parse.parse_name_kvs(line)
+            number = max(1, args.number * 64 // size)
+            new = timeit.timeit(lambda: parse.parse_name_kvs(line),
+                                number=number) / number
+            if build is dotted and size > args.legacy_limit:
+                old = float('nan')  # Too slow to wait for
+            else:
+                old = timeit.timeit(lambda: legacy(line),
+                                    number=number) / number
+            print("{:<8} {:>8} {:>14.1f} {:>14.1f}".format(
+                build.__name__, size, old * 1e6, new * 1e6))
+            size *= 4
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=int, default=16384,
+                        help='Largest body, in bytes')
+    parser.add_argument('--number', type=int, default=2000,
+                        help='Iterations at the smallest size')
+    parser.add_argument('--legacy-limit', type=int, default=4096,
+                        help='Largest dotted input given to the legacy regex')
+    main(parser.parse_args())
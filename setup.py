@@ -27,6 +27,8 @@ setup(
     install_requires=install_requires,
     tests_require=tests_require,
     extras_require={
+        'columnar': ['numpy'],
+        'rank': ['numpy', 'scipy'],
         'test': tests_require,
     },
     entry_points={